@@ -0,0 +1,66 @@
+#  ***** GPL LICENSE BLOCK *****
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#  All rights reserved.
+#  ***** GPL LICENSE BLOCK *****
+
+# <pep8 compliant>
+
+# Tests for the NumPy only kernels, run with pytest outside of Blender
+# Tests for the bpy side helpers. These only run where bpy can be imported, such as
+# Blender's Python or the bpy module from PyPI
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+bpy = pytest.importorskip("bpy")
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from vertex_color_master import vcm_helpers as h
+
+
+@pytest.fixture
+def mesh():
+    mesh = bpy.data.meshes.new("VCM_Test")
+    mesh.from_pydata([(0, 0, 0), (1, 0, 0), (1, 1, 0), (0, 1, 0)], [], [(0, 1, 2, 3)])
+    yield mesh
+    bpy.data.meshes.remove(mesh)
+
+
+@pytest.mark.skipif('color_attributes' not in bpy.types.Mesh.bl_rna.properties, reason="needs color attributes")
+def test_copy_byte_to_float_keeps_color(mesh):
+    byte_vcol = h.new_color_layer(mesh, 'Byte', 'BYTE_COLOR', 'CORNER')
+    float_vcol = h.new_color_layer(mesh, 'Float', 'FLOAT_COLOR', 'CORNER')
+    values = np.array([0.0, 0.2, 0.5, 1.0], dtype=np.float32)
+    colors = np.ones((4, 4), dtype=np.float32)
+    colors[:, 0] = values
+    colors[:, 3] = values
+    h.set_color_array(byte_vcol, colors)
+    byte_vcol = h.get_color_layers(mesh)['Byte']
+    float_vcol = h.get_color_layers(mesh)['Float']
+
+    # the float layer gets the same color as the byte layer, so the same values as
+    # Blender's own linear color property of the byte layer
+    h.copy_channel(mesh, byte_vcol, float_vcol, 0, 1)
+    h.copy_channel(mesh, byte_vcol, float_vcol, 3, 3)
+    linear = np.empty(16, dtype=np.float32)
+    byte_vcol.data.foreach_get('color', linear)
+    result = h.get_color_array(float_vcol)
+    np.testing.assert_allclose(result[:, 1], linear.reshape(-1, 4)[:, 0], atol=1e-3)
+    # alpha is not color managed
+    np.testing.assert_allclose(result[:, 3], h.get_color_array(byte_vcol)[:, 3], atol=1e-6)
@@ -0,0 +1,206 @@
+#  ***** GPL LICENSE BLOCK *****
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#  All rights reserved.
+#  ***** GPL LICENSE BLOCK *****
+
+# <pep8 compliant>
+
+# Tests for the NumPy only kernels, run with pytest outside of Blender
+
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir, "vertex_color_master"))
+
+import vcm_kernels as k
+
+
+def triangle_with_loose_vertex():
+    return k.build_vertex_adjacency(4, np.array([(0, 1), (1, 2), (2, 0)]))
+
+
+def test_smooth_trailing_loose_vertex():
+    adjacency = triangle_with_loose_vertex()
+    values = np.array([0.0, 1.0, 0.0, 0.5])
+    result = k.smooth_vertex_values(adjacency, values, factor=1.0)
+    np.testing.assert_allclose(result, [0.5, 0.0, 0.5, 0.5])
+
+
+def test_smooth_expand_trailing_loose_vertex():
+    adjacency = triangle_with_loose_vertex()
+    values = np.array([[0.0, 1.0], [1.0, 0.0], [0.0, 1.0], [0.5, 0.5]])
+    result = k.smooth_vertex_values(adjacency, values, factor=1.0, expand=0.5)
+    # both neighbours of the last connected vertex must count, as for the first vertex
+    np.testing.assert_allclose(result[0], result[2])
+    np.testing.assert_allclose(result[3], [0.5, 0.5])
+
+
+def test_smooth_masked_vertices():
+    adjacency = k.build_vertex_adjacency(3, np.array([(0, 1), (1, 2)]))
+    values = np.array([0.0, 1.0, 0.0])
+    mask = np.array([True, False, True])
+    result = k.smooth_vertex_values(adjacency, values, factor=1.0, vertex_mask=mask)
+    np.testing.assert_allclose(result, [1.0, 1.0, 1.0])
+
+
+def test_smooth_channels_match_single_channel():
+    adjacency = k.build_vertex_adjacency(4, np.array([(0, 1), (1, 2), (2, 3)]))
+    values = np.random.default_rng(0).random((4, 3))
+    result = k.smooth_vertex_values(adjacency, values, factor=0.5, iterations=3)
+    for i in range(3):
+        np.testing.assert_allclose(result[:, i], k.smooth_vertex_values(adjacency, values[:, i], 0.5, 3))
+
+
+def reference_smooth_expand(adjacency, values, factor, expand):
+    # one iteration of the vertex group smooth with expand, per vertex
+    indptr, indices = adjacency
+    result = values.copy()
+    for v in range(len(indptr) - 1):
+        weight = weight_tot = 0.0
+        for other in values[indices[indptr[v]:indptr[v + 1]]]:
+            biased = other < values[v] if expand > 0.0 else other > values[v]
+            if biased:
+                other = values[v] * abs(expand) + other * (1.0 - abs(expand))
+                weight += other * (1.0 - abs(expand))
+                weight_tot += 1.0 - abs(expand)
+            else:
+                weight += other
+                weight_tot += 1.0
+        if weight_tot != 0.0:
+            result[v] = min(max(values[v] * (1.0 - factor) + weight / weight_tot * factor, 0.0), 1.0)
+    return result
+
+
+def test_smooth_expand_matches_reference():
+    rng = np.random.default_rng(3)
+    edges = np.unique(np.sort(rng.integers(0, 40, (120, 2)), axis=1), axis=0)
+    edges = edges[edges[:, 0] != edges[:, 1]]
+    adjacency = k.build_vertex_adjacency(42, edges)
+    values = rng.random(42)
+    for expand in (0.5, -0.3, 1.0):
+        np.testing.assert_allclose(k.smooth_vertex_values(adjacency, values, 0.7, 1, expand),
+                                   reference_smooth_expand(adjacency, values, 0.7, expand))
+
+
+def test_label_components():
+    labels = k.label_components(7, np.array([5, 1, 3, 6]), np.array([6, 2, 1, 5]))
+    np.testing.assert_array_equal(labels, [0, 1, 1, 1, 4, 5, 5])
+
+
+def test_label_face_islands():
+    # two quads sharing vertex 3, then a separate triangle
+    face_verts = np.array([0, 1, 2, 3, 3, 4, 5, 6, 7, 8, 9])
+    loop_faces = np.array([0, 0, 0, 0, 1, 1, 1, 1, 2, 2, 2])
+    islands, count = k.label_face_islands(10, face_verts, loop_faces, 3)
+    np.testing.assert_array_equal(islands, [0, 0, 1])
+    assert count == 2
+
+
+def test_blend_formulas():
+    src = np.array([0.0, 0.25, 0.5, 1.0])
+    dst = np.array([0.5, 0.5, 0.25, 0.0])
+    np.testing.assert_allclose(k.blend_add(src, dst), [0.5, 0.75, 0.75, 1.0])
+    np.testing.assert_allclose(k.blend_sub(src, dst), [0.0, 0.0, 0.25, 1.0])
+    np.testing.assert_allclose(k.blend_mul(src, dst), [0.0, 0.125, 0.125, 0.0])
+    np.testing.assert_allclose(k.blend_div(src, dst), [0.0, 0.5, 2.0, 1.0])
+    np.testing.assert_allclose(k.blend_screen(src, dst), [0.5, 0.625, 0.625, 1.0])
+    np.testing.assert_allclose(k.blend_overlay(src, dst), [0.0, 0.25, 0.25, 0.0])
+    np.testing.assert_allclose(k.blend_difference(src, dst), [0.5, 0.25, 0.25, 1.0])
+    np.testing.assert_allclose(k.blend_exclusion(src, dst), [0.5, 0.5, 0.5, 1.0])
+    np.testing.assert_allclose(k.blend_color_dodge(src, dst), [0.5, 2.0 / 3.0, 0.5, 1.0])
+    np.testing.assert_allclose(k.blend_color_burn(src, dst), [0.0, 0.0, 0.0, 0.0])
+
+
+def test_blend_values_factor():
+    src = np.array([1.0, 0.0])
+    dst = np.array([0.2, 0.6])
+    np.testing.assert_allclose(k.blend_values(src, dst, 'MIX', 0.25), [0.4, 0.45])
+    assert k.blend_values(src, dst, 'UNKNOWN') is None
+
+
+def test_hsv_round_trip():
+    import colorsys
+    rgb = np.random.default_rng(1).random((64, 3))
+    rgb[0] = 0.0
+    rgb[1] = (0.5, 0.5, 0.5)
+    hsv = k.rgb_to_hsv_array(rgb)
+    expected = np.array([colorsys.rgb_to_hsv(*c) for c in rgb])
+    np.testing.assert_allclose(hsv, expected, atol=1e-12)
+    np.testing.assert_allclose(k.hsv_to_rgb_array(hsv), rgb, atol=1e-12)
+
+
+def test_srgb_transfer():
+    # byte values survive a round trip through linear, as when copied to a float layer
+    values = np.arange(256) / 255.0
+    linear = k.srgb_to_linear(values)
+    np.testing.assert_allclose(k.linear_to_srgb(linear), values, atol=1e-9)
+    np.testing.assert_allclose(linear[[0, 255]], [0.0, 1.0])
+    assert abs(k.srgb_to_linear(np.array([0.5]))[0] - 0.21404) < 1e-5
+    assert np.all(np.diff(linear) > 0.0)
+
+
+def reference_distances(vertex_count, edge_verts, coords, seeds):
+    import heapq
+    neighbours = [[] for i in range(vertex_count)]
+    for a, b in edge_verts:
+        length = np.linalg.norm(coords[a] - coords[b])
+        neighbours[a].append((b, length))
+        neighbours[b].append((a, length))
+    distances = [np.inf] * vertex_count
+    heap = [(0.0, s) for s in seeds]
+    for s in seeds:
+        distances[s] = 0.0
+    while heap:
+        d, v = heapq.heappop(heap)
+        if d > distances[v]:
+            continue
+        for w, length in neighbours[v]:
+            if d + length < distances[w]:
+                distances[w] = d + length
+                heapq.heappush(heap, (d + length, w))
+    return np.array(distances)
+
+
+def test_edge_distances_match_dijkstra():
+    rng = np.random.default_rng(2)
+    size = 12
+    coords = np.zeros((size * size + 1, 3))
+    coords[:-1, :2] = np.stack(np.meshgrid(np.arange(size), np.arange(size)), axis=-1).reshape(-1, 2)
+    coords[:-1] += rng.random((size * size, 3)) * 0.4
+    grid = np.arange(size * size).reshape(size, size)
+    edges = np.concatenate((np.stack((grid[:, :-1].ravel(), grid[:, 1:].ravel()), axis=1),
+                            np.stack((grid[:-1].ravel(), grid[1:].ravel()), axis=1),
+                            np.stack((grid[:-1, :-1].ravel(), grid[1:, 1:].ravel()), axis=1)))
+    seeds = np.array([0, 77, 140])
+    distances = k.get_edge_distances(k.build_vertex_adjacency(len(coords), edges), coords, seeds)
+    expected = reference_distances(len(coords), edges, coords, seeds)
+    np.testing.assert_allclose(distances, expected)
+    # the last vertex is loose and can't be reached
+    assert np.isinf(distances[-1])
+
+
+def test_dihedral_angle_signs():
+    # face 0 lies in the XY plane, faces 1 and 2 fold down and up from its +X edge
+    angle = np.pi / 4
+    face_normals = np.array([(0.0, 0.0, 1.0),
+                             (np.sin(angle), 0.0, np.cos(angle)),
+                             (-np.sin(angle), 0.0, np.cos(angle))])
+    face_centers = np.array([(-0.5, 0.0, 0.0),
+                             (0.5 * np.cos(angle), 0.0, -0.5 * np.sin(angle)),
+                             (0.5 * np.cos(angle), 0.0, 0.5 * np.sin(angle))])
+    angles = k.get_dihedral_angles(face_normals, face_centers, np.array([(0, 1), (0, 2)]))
+    np.testing.assert_allclose(angles, [angle, -angle])
@@ -21,17 +21,20 @@
 if "bpy" in locals():
     import importlib
     importlib.reload(vcm_globals)
+    importlib.reload(vcm_kernels)
     importlib.reload(vcm_helpers)
     importlib.reload(vcm_main)
     importlib.reload(vcm_menus)
     importlib.reload(vcm_ops)
 
 import bpy
+from bpy.app.handlers import persistent
 from . import vcm_main
 from . import vcm_menus
 from . import vcm_ops
 # not used in this file
 from . import vcm_globals
+from . import vcm_kernels
 from . import vcm_helpers
 
 bl_info = {
@@ -48,12 +51,17 @@ bl_info = {
 }
 
 classes = (
+    vcm_main.VertexColorMasterPipelineStep,
+    vcm_main.VertexColorMasterPipeline,
     vcm_main.VertexColorMasterProperties,
     vcm_ops.VERTEXCOLORMASTER_OT_QuickFill,
     vcm_ops.VERTEXCOLORMASTER_OT_Fill,
     vcm_ops.VERTEXCOLORMASTER_OT_Invert,
     vcm_ops.VERTEXCOLORMASTER_OT_Posterize,
     vcm_ops.VERTEXCOLORMASTER_OT_Remap,
+    vcm_ops.VERTEXCOLORMASTER_OT_AdjustHSV,
+    vcm_ops.VERTEXCOLORMASTER_OT_RunPipeline,
+    vcm_ops.VERTEXCOLORMASTER_OT_EditPipeline,
     vcm_ops.VERTEXCOLORMASTER_OT_CopyChannel,
     vcm_ops.VERTEXCOLORMASTER_OT_RgbToGrayscale,
     vcm_ops.VERTEXCOLORMASTER_OT_BlendChannels,
@@ -71,6 +79,9 @@ classes = (
     vcm_ops.VERTEXCOLORMASTER_OT_FlipBrushColors,
     vcm_ops.VERTEXCOLORMASTER_OT_Gradient,
     vcm_ops.VERTEXCOLORMASTER_OT_BlurChannel,
+    vcm_ops.VERTEXCOLORMASTER_OT_BakeAmbientOcclusion,
+    vcm_ops.VERTEXCOLORMASTER_OT_BakeCurvature,
+    vcm_ops.VERTEXCOLORMASTER_OT_SelectionDistanceGradient,
     vcm_menus.VERTEXCOLORMASTER_PT_MainPanel,
     vcm_menus.VERTEXCOLORMASTER_MT_PieMain,
 )
@@ -78,6 +89,33 @@ classes = (
 # used to unregister bound shortcuts when the addon is disabled / removed
 addon_keymaps = []
 
+
+# cached selection masks are not checked against the loops, so they are dropped
+# when the topology may have changed without the element counts changing
+@persistent
+def depsgraph_update_post(*args):
+    vcm_helpers.update_selection_mask_cache(bpy.context.mode)
+
+
+@persistent
+def undo_post(*args):
+    vcm_helpers.clear_selection_mask_cache()
+
+
+# mesh pointers may be reused by the meshes of another file
+@persistent
+def load_post(*args):
+    vcm_helpers.clear_mesh_caches()
+
+
+# handler list : function
+app_handlers = (
+    (bpy.app.handlers.depsgraph_update_post, depsgraph_update_post),
+    (bpy.app.handlers.undo_post, undo_post),
+    (bpy.app.handlers.redo_post, undo_post),
+    (bpy.app.handlers.load_post, load_post),
+)
+
 def register():
     # fix issue with default brush name changing between 2.80 > 2.81
     if bpy.app.version >= (2, 81, 0):
@@ -91,6 +129,10 @@ def register():
     bpy.types.Scene.vertex_color_master_settings = bpy.props.PointerProperty(
         type=vcm_main.VertexColorMasterProperties)
 
+    # keep the mesh caches in step with the mesh data
+    for handlers, handler in app_handlers:
+        handlers.append(handler)
+
     # register shortcuts
     wm = bpy.context.window_manager
     if wm.keyconfigs.addon:
@@ -113,6 +155,14 @@ def unregister():
     # unregister properties
     del bpy.types.Scene.vertex_color_master_settings
 
+    for handlers, handler in app_handlers:
+        if handler in handlers:
+            handlers.remove(handler)
+
+    # release cached mesh data and gradient shaders
+    vcm_helpers.clear_mesh_caches()
+    vcm_ops.gradient_shaders.clear()
+
     # unregister shortcuts
     wm = bpy.context.window_manager
     if wm.keyconfigs.addon:
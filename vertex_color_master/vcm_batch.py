@@ -0,0 +1,508 @@
+#  ***** GPL LICENSE BLOCK *****
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#  All rights reserved.
+#  ***** GPL LICENSE BLOCK *****
+
+# <pep8 compliant>
+
+# Headless batch processing of .blend files with VCM recipes.
+#
+# The controller runs with any Python 3 (no bpy needed) and starts several background
+# Blender processes, each of which opens and processes files from a shared queue:
+#
+#   python vertex_color_master/vcm_batch.py recipe.json "assets/**/*.blend" -j 8 --report report.json
+#
+# A recipe lists the operations applied to every mesh of each file, in order:
+#
+#   {
+#     "layer": "Col",             color layer to write (created if missing, default active)
+#     "objects": ["SM_*"],        object name patterns (default all mesh objects)
+#     "steps": [
+#       {"op": "WEIGHTS_TO_COLOR", "group": "Mask", "channel": "G"},
+#       {"op": "REMAP", "channels": "A", "min0": 0.2, "max0": 0.8},
+#       {"op": "POSTERIZE", "channels": "A", "steps": 4}
+#     ]
+#   }
+#
+# Consecutive channel ops (FILL, INVERT, POSTERIZE, REMAP) are fused into a single
+# pipeline pass. Nothing here depends on the UI context or the add-on settings.
+
+import argparse
+import glob
+import importlib
+import json
+import os
+import queue
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import types
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from fnmatch import fnmatch
+
+
+pipeline_ops = {'FILL', 'INVERT', 'POSTERIZE', 'REMAP'}
+
+
+def load_recipe(path):
+    if path.endswith('.toml'):
+        try:
+            import tomllib
+        except ImportError:
+            raise RuntimeError("TOML recipes require Python 3.11 or newer, use JSON instead.")
+        with open(path, 'rb') as f:
+            return tomllib.load(f)
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def validate_recipe(recipe):
+    steps = recipe.get('steps')
+    if not isinstance(steps, list) or not steps:
+        raise ValueError("Recipe has no steps.")
+    for index, step in enumerate(steps):
+        op = step.get('op')
+        if op not in pipeline_ops and op not in recipe_step_handlers:
+            raise ValueError("Recipe step {0} has an unknown op '{1}'.".format(index, op))
+
+
+def expand_files(patterns):
+    files = []
+    seen = set()
+    for pattern in patterns:
+        matches = glob.glob(pattern, recursive=True) if glob.has_magic(pattern) else [pattern]
+        for path in sorted(matches):
+            path = os.path.abspath(path)
+            if path not in seen and path.endswith('.blend'):
+                seen.add(path)
+                files.append(path)
+    return files
+
+
+# Controller
+
+# prefix of the line a worker prints for each processed file, followed by its result
+# as JSON. Everything else Blender prints is kept as the log of the file
+result_marker = 'VCM_BATCH_RESULT '
+# lines of a worker's log kept for error messages
+log_lines = 50
+
+
+class WorkerError(Exception):
+    pass
+
+
+class WorkerProcess:
+    # a background Blender that processes the files it is sent one at a time, so
+    # startup and imports happen once per process instead of once per file
+
+    def __init__(self, blender, recipe_path):
+        args = [blender, '--background', '--factory-startup',
+                '--python', os.path.abspath(__file__), '--python-exit-code', '1',
+                '--', '--worker', recipe_path]
+        self.process = subprocess.Popen(args, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                        stderr=subprocess.STDOUT, encoding='utf-8', errors='replace',
+                                        bufsize=1)
+        self.lines = queue.Queue()
+        self.log = deque(maxlen=log_lines)
+        self.files = 0
+        threading.Thread(target=self.read_output, daemon=True).start()
+
+    def read_output(self):
+        for line in self.process.stdout:
+            self.lines.put(line)
+        self.lines.put(None)
+
+    def process_file(self, blend_path, output_path=None, timeout=None):
+        # returns the worker's result for the file, or raises WorkerError if the
+        # worker exits or runs out of time
+        self.files += 1
+        self.log.clear()
+        try:
+            self.process.stdin.write(json.dumps({'file': blend_path, 'output': output_path}) + '\n')
+            self.process.stdin.flush()
+        except OSError:
+            raise WorkerError(self.get_exit_error())
+
+        deadline = None if timeout is None else time.perf_counter() + timeout
+        while True:
+            remaining = None if deadline is None else deadline - time.perf_counter()
+            try:
+                if remaining is not None and remaining <= 0.0:
+                    raise queue.Empty
+                line = self.lines.get(timeout=remaining)
+            except queue.Empty:
+                raise WorkerError("Timed out after {0} seconds.".format(timeout))
+            if line is None:
+                raise WorkerError(self.get_exit_error())
+            if line.startswith(result_marker):
+                return json.loads(line[len(result_marker):])
+            self.log.append(line)
+
+    def get_exit_error(self):
+        # the worker didn't get as far as reporting a result, keep the end of its log
+        code = self.process.wait()
+        return "Blender exited with code {0}: {1}".format(code, ''.join(self.log)[-2000:].strip())
+
+    def close(self, kill=False):
+        if not kill:
+            try:
+                self.process.stdin.close()
+                self.process.wait(timeout=60)
+            except (OSError, subprocess.TimeoutExpired):
+                kill = True
+        if kill:
+            self.process.kill()
+            self.process.wait()
+
+
+def run_worker(worker, blend_path, output_path=None, timeout=None):
+    # process one file in a worker, returning its entry for the report. Returns
+    # whether the worker can still be used
+    entry = {'file': blend_path, 'ok': False, 'seconds': 0.0, 'error': None}
+    start = time.perf_counter()
+    usable = True
+    try:
+        entry.update(worker.process_file(blend_path, output_path, timeout))
+    except WorkerError as e:
+        entry['error'] = str(e)
+        usable = False
+    except ValueError as e:
+        entry['error'] = str(e)
+    finally:
+        entry['seconds'] = time.perf_counter() - start
+    return entry, usable
+
+
+def run_batch(recipe_path, patterns, blender='blender', jobs=None, output_dir=None,
+              timeout=None, report_path=None, files_per_process=50):
+    recipe = load_recipe(recipe_path)
+    validate_recipe(recipe)
+    files = expand_files(patterns)
+    jobs = jobs or os.cpu_count() or 1
+
+    # workers always get the recipe as JSON, so TOML is only parsed here
+    fd, worker_recipe_path = tempfile.mkstemp(suffix='.json', prefix='vcm_recipe_')
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        json.dump(recipe, f)
+
+    # each of the jobs keeps a Blender process and takes files from the queue until it
+    # is empty. The process is restarted after files_per_process files (so memory
+    # doesn't build up over long runs), or if it fails
+    pending = queue.Queue()
+    for index, blend_path in enumerate(files):
+        pending.put((index, blend_path))
+    entries = [None] * len(files)
+
+    def process_files():
+        worker = None
+        try:
+            while True:
+                try:
+                    index, blend_path = pending.get_nowait()
+                except queue.Empty:
+                    break
+                output_path = None
+                if output_dir is not None:
+                    output_path = os.path.join(os.path.abspath(output_dir), os.path.basename(blend_path))
+
+                if worker is None:
+                    try:
+                        worker = WorkerProcess(blender, worker_recipe_path)
+                    except OSError as e:
+                        entry = {'file': blend_path, 'ok': False, 'seconds': 0.0, 'error': str(e)}
+                if worker is not None:
+                    entry, usable = run_worker(worker, blend_path, output_path, timeout)
+                    if not usable or (files_per_process and worker.files >= files_per_process):
+                        worker.close(kill=not usable)
+                        worker = None
+
+                entries[index] = entry
+                status = "ok" if entry['ok'] else "FAILED: {0}".format(entry['error'])
+                print("{0:8.2f}s {1} {2}".format(entry['seconds'], blend_path, status), flush=True)
+        finally:
+            if worker is not None:
+                worker.close()
+
+    start = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=jobs) as pool:
+            for future in [pool.submit(process_files) for i in range(min(jobs, len(files)))]:
+                future.result()
+    finally:
+        os.remove(worker_recipe_path)
+
+    summary = {
+        'recipe': os.path.abspath(recipe_path),
+        'jobs': jobs,
+        'files': len(entries),
+        'succeeded': sum(1 for entry in entries if entry['ok']),
+        'failed': sum(1 for entry in entries if not entry['ok']),
+        'seconds': time.perf_counter() - start,
+        'results': entries,
+    }
+    if report_path is not None:
+        with open(report_path, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=2)
+    return summary
+
+
+# Worker (runs inside Blender)
+
+def import_helpers():
+    # this file may be run directly by Blender, so import the helpers by package name.
+    # Unless the add-on is already loaded, the package is an empty module, so that its
+    # __init__ (which imports the operators and UI) doesn't run in the worker
+    package_dir = os.path.dirname(os.path.abspath(__file__))
+    package_name = os.path.basename(package_dir)
+    if package_name not in sys.modules:
+        package = types.ModuleType(package_name)
+        package.__path__ = [package_dir]
+        sys.modules[package_name] = package
+    return importlib.import_module(package_name + '.vcm_helpers')
+
+
+def get_channel_idx(h, step, key='channel', default='R'):
+    return h.channel_id_to_idx(step.get(key, default))
+
+
+def get_step_layer(h, mesh, step, key, vcol):
+    # a named source layer, or the recipe's target layer
+    name = step.get(key)
+    if name is None:
+        return vcol
+    layer = h.get_color_layers(mesh).get(name)
+    if layer is None:
+        raise ValueError("Mesh '{0}' has no color layer named '{1}'.".format(mesh.name, name))
+    return layer
+
+
+def get_vertex_group_idx(obj, name, create=False):
+    group = obj.vertex_groups.get(name)
+    if group is None:
+        if not create:
+            raise ValueError("Object '{0}' has no vertex group named '{1}'.".format(obj.name, name))
+        group = obj.vertex_groups.new(name=name)
+    return group.index
+
+
+def get_uv_layer(mesh, step):
+    name = step.get('uv')
+    uv = mesh.uv_layers.active if name is None else mesh.uv_layers.get(name)
+    if uv is None:
+        raise ValueError("Mesh '{0}' has no UV layer '{1}'.".format(mesh.name, name or ''))
+    return uv
+
+
+def step_weights_to_color(h, obj, vcol, step):
+    group_idx = get_vertex_group_idx(obj, step['group'])
+    h.weights_to_color(obj.data, group_idx, vcol, get_channel_idx(h, step), step.get('all_channels', False))
+
+
+def step_color_to_weights(h, obj, vcol, step):
+    group_idx = get_vertex_group_idx(obj, step['group'], create=True)
+    h.color_to_weights(obj, vcol, get_channel_idx(h, step), group_idx)
+
+
+def step_uvs_to_color(h, obj, vcol, step):
+    h.uvs_to_color(obj.data, get_uv_layer(obj.data, step), vcol, get_channel_idx(h, step, 'u_channel', 'R'),
+                   get_channel_idx(h, step, 'v_channel', 'G'), step.get('wrap_mode', 'WRAP'))
+
+
+def step_color_to_uvs(h, obj, vcol, step):
+    h.color_to_uvs(obj.data, vcol, get_uv_layer(obj.data, step), get_channel_idx(h, step, 'u_channel', 'R'),
+                   get_channel_idx(h, step, 'v_channel', 'G'))
+
+
+def step_normals_to_color(h, obj, vcol, step):
+    h.normals_to_color(obj.data, h.get_custom_normals(obj), vcol)
+
+
+def step_copy_channel(h, obj, vcol, step):
+    src_vcol = get_step_layer(h, obj.data, step, 'src_layer', vcol)
+    h.copy_channel(obj.data, src_vcol, vcol, get_channel_idx(h, step, 'src_channel'),
+                   get_channel_idx(h, step, 'dst_channel'), step.get('swap', False),
+                   step.get('all_channels', False))
+
+
+def step_blend_channels(h, obj, vcol, step):
+    src_vcol = get_step_layer(h, obj.data, step, 'src_layer', vcol)
+    dst_channel_idx = get_channel_idx(h, step, 'dst_channel')
+    result_channel_idx = get_channel_idx(h, step, 'result_channel', step.get('dst_channel', 'R'))
+    h.blend_channels(obj.data, src_vcol, vcol, get_channel_idx(h, step, 'src_channel'), dst_channel_idx,
+                     result_channel_idx, step.get('blend_mode', 'ADD'), step.get('factor', 1.0))
+
+
+def step_rgb_to_grayscale(h, obj, vcol, step):
+    src_vcol = get_step_layer(h, obj.data, step, 'src_layer', vcol)
+    h.convert_rgb_to_luminosity(obj.data, src_vcol, vcol, get_channel_idx(h, step),
+                                step.get('all_channels', True))
+
+
+def step_blur(h, obj, vcol, step):
+    rgba_mask = h.get_active_channel_mask(step.get('channels', 'RGB'))
+    h.blur_channels(obj.data, vcol, rgba_mask, step.get('factor', 0.5), step.get('iterations', 1),
+                    step.get('expand', 0.0), step.get('keep_seams', False))
+
+
+def step_adjust_hsv(h, obj, vcol, step):
+    h.adjust_hsv(obj.data, vcol, step.get('hue', 0.0), step.get('saturation', 0.0),
+                 step.get('value', 0.0), step.get('colorize', False))
+
+
+# op : handler(helpers, obj, vcol, step)
+recipe_step_handlers = {
+    'WEIGHTS_TO_COLOR': step_weights_to_color,
+    'COLOR_TO_WEIGHTS': step_color_to_weights,
+    'UVS_TO_COLOR': step_uvs_to_color,
+    'COLOR_TO_UVS': step_color_to_uvs,
+    'NORMALS_TO_COLOR': step_normals_to_color,
+    'COPY_CHANNEL': step_copy_channel,
+    'BLEND_CHANNELS': step_blend_channels,
+    'RGB_TO_GRAYSCALE': step_rgb_to_grayscale,
+    'BLUR': step_blur,
+    'ADJUST_HSV': step_adjust_hsv,
+}
+
+
+def get_recipe_layer(h, mesh, recipe):
+    name = recipe.get('layer')
+    if name is None:
+        return h.get_or_create_active_color_layer(mesh)
+    vcol = h.get_color_layers(mesh).get(name)
+    if vcol is None:
+        vcol = h.new_color_layer(mesh, name, recipe.get('data_type', 'BYTE_COLOR'),
+                                 recipe.get('domain', 'CORNER'))
+        h.set_active_color_layer(mesh, vcol)
+    return vcol
+
+
+def apply_recipe(h, obj, recipe):
+    mesh = obj.data
+    layer_name = get_recipe_layer(h, mesh, recipe).name
+
+    # recipes apply to whole meshes unless asked to keep the paint mask
+    mask_flags = (mesh.use_paint_mask, mesh.use_paint_mask_vertex)
+    if not recipe.get('use_paint_mask', False):
+        mesh.use_paint_mask = False
+        mesh.use_paint_mask_vertex = False
+
+    try:
+        pending = []
+        for step in recipe['steps'] + [None]:
+            # layers are looked up again for every step, as adding layers (or groups)
+            # can invalidate references to existing ones
+            vcol = h.get_color_layers(mesh)[layer_name]
+            if step is not None and step['op'] in pipeline_ops:
+                pending.append(dict(step, channels=set(step.get('channels', 'RGB'))))
+                continue
+            if pending:
+                h.run_pipeline(mesh, vcol, pending)
+                pending = []
+            if step is not None:
+                recipe_step_handlers[step['op']](h, obj, vcol, step)
+    finally:
+        mesh.use_paint_mask, mesh.use_paint_mask_vertex = mask_flags
+
+
+def process_file(recipe, output_path=None):
+    import bpy
+    h = import_helpers()
+
+    patterns = recipe.get('objects', ['*'])
+    if isinstance(patterns, str):
+        patterns = [patterns]
+
+    objects = 0
+    seen_meshes = set()
+    for obj in bpy.data.objects:
+        if obj.type != 'MESH' or obj.data.library is not None:
+            continue
+        if not any(fnmatch(obj.name, pattern) for pattern in patterns):
+            continue
+        # objects sharing a mesh only need it processed once
+        key = obj.data.as_pointer()
+        if key in seen_meshes:
+            continue
+        seen_meshes.add(key)
+        apply_recipe(h, obj, recipe)
+        objects += 1
+
+    if recipe.get('save', True):
+        if output_path is None:
+            bpy.ops.wm.save_mainfile()
+        else:
+            os.makedirs(os.path.dirname(output_path), exist_ok=True)
+            bpy.ops.wm.save_as_mainfile(filepath=output_path, copy=True)
+
+    return {'meshes': objects}
+
+
+def worker_main(argv):
+    # process the files sent on stdin, one JSON job per line, until stdin is closed
+    import bpy
+    with open(argv[0], 'r', encoding='utf-8') as f:
+        recipe = json.load(f)
+    h = import_helpers()
+
+    for line in sys.stdin:
+        job = json.loads(line)
+        result = {'ok': False, 'error': None}
+        start = time.perf_counter()
+        try:
+            bpy.ops.wm.open_mainfile(filepath=job['file'], load_ui=False)
+            result.update(process_file(recipe, job.get('output')))
+            result['ok'] = True
+        except Exception as e:
+            result['error'] = "{0}: {1}".format(type(e).__name__, e)
+        finally:
+            # the meshes of the next file may reuse the same pointers
+            h.clear_mesh_caches()
+        result['process_seconds'] = time.perf_counter() - start
+        print(result_marker + json.dumps(result), flush=True)
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    # Blender passes its own arguments before '--'
+    if '--' in argv:
+        argv = argv[argv.index('--') + 1:]
+    if argv and argv[0] == '--worker':
+        return worker_main(argv[1:])
+
+    parser = argparse.ArgumentParser(description="Apply a Vertex Color Master recipe to .blend files.")
+    parser.add_argument('recipe', help="JSON or TOML recipe file")
+    parser.add_argument('files', nargs='+', help=".blend files or glob patterns (** is recursive)")
+    parser.add_argument('--blender', default='blender', help="Blender executable (default: blender)")
+    parser.add_argument('-j', '--jobs', type=int, default=None, help="Number of Blender processes (default: cpu count)")
+    parser.add_argument('--output-dir', default=None, help="Save results here instead of overwriting the files")
+    parser.add_argument('--timeout', type=float, default=None, help="Time limit per file in seconds")
+    parser.add_argument('--files-per-process', type=int, default=50,
+                        help="Restart each Blender process after this many files, 0 to never restart (default: 50)")
+    parser.add_argument('--report', default=None, help="Write a JSON summary report to this path")
+    args = parser.parse_args(argv)
+
+    summary = run_batch(args.recipe, args.files, args.blender, args.jobs, args.output_dir,
+                        args.timeout, args.report, args.files_per_process)
+    print("{0} of {1} files processed in {2:.2f}s".format(
+        summary['succeeded'], summary['files'], summary['seconds']))
+    return 0 if summary['failed'] == 0 else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
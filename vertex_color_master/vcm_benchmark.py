@@ -0,0 +1,587 @@
+#  ***** GPL LICENSE BLOCK *****
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#  All rights reserved.
+#  ***** GPL LICENSE BLOCK *****
+
+# <pep8 compliant>
+
+# Benchmarks of the VCM helpers on synthetic meshes.
+#
+# With plain Python (only numpy needed), the NumPy kernels are timed on the mesh arrays:
+#
+#   python vertex_color_master/vcm_benchmark.py --output results.json
+#
+# Inside Blender, real meshes are built and the helpers are timed, including the
+# transfers to and from the mesh (--kernels times the kernels there too):
+#
+#   blender --background --factory-startup --python vertex_color_master/vcm_benchmark.py -- --output results.json
+#
+# Meshes are grids, many small islands and high valence fans, at each of --sizes
+# (number of loops). Every benchmark is run with and without a selection mask, where
+# the helper supports one. A results file can be used as the --baseline of a later
+# run, which then reports the benchmarks that got slower by more than --threshold
+# and exits with 1 if there are any.
+#
+# The ambient occlusion bake casts rays through Blender, so it's only run when asked
+# for, such as on a 500k vertex grid:
+#
+#   blender --background --factory-startup --python vertex_color_master/vcm_benchmark.py -- \
+#       --shapes grid --sizes 2m --benchmarks ambient_occlusion
+
+import argparse
+import importlib
+import importlib.util
+import json
+import math
+import os
+import platform
+import sys
+import time
+import tracemalloc
+import types
+
+import numpy as np
+
+
+mesh_shapes = ('GRID', 'ISLANDS', 'FANS')
+default_sizes = ('10k', '100k', '1m', '10m')
+fan_valence = 256
+# timings below this are too noisy to be reported as regressions
+regression_min_seconds = 0.0005
+
+
+def parse_size(text):
+    multipliers = {'k': 1000, 'm': 1000000}
+    text = text.strip().lower()
+    if text[-1:] in multipliers:
+        return int(float(text[:-1]) * multipliers[text[-1]])
+    return int(text)
+
+
+def import_kernels():
+    # the kernels don't depend on bpy, so they are imported directly from the package
+    # directory. Importing the package itself would register the add-on
+    package_dir = os.path.dirname(os.path.abspath(__file__))
+    if package_dir not in sys.path:
+        sys.path.insert(0, package_dir)
+    return importlib.import_module('vcm_kernels')
+
+
+def import_helpers():
+    # import the helpers by package name. Unless the add-on is already loaded, the
+    # package is an empty module, so that its __init__ (which imports the operators
+    # and UI) doesn't run, the same as in the batch worker
+    package_dir = os.path.dirname(os.path.abspath(__file__))
+    package_name = os.path.basename(package_dir)
+    if package_name not in sys.modules:
+        package = types.ModuleType(package_name)
+        package.__path__ = [package_dir]
+        sys.modules[package_name] = package
+    return importlib.import_module(package_name + '.vcm_helpers')
+
+
+# Synthetic meshes
+#
+# Meshes are described by arrays in the same layout as the RNA data: vertex
+# coordinates (V, 3), the loop_start and loop_total of each face and the vertex of
+# each loop. Coordinates are in the 0-1 range in x and y.
+
+def make_grid(loop_count):
+    # a single island of quads, with low bumps that occlude each other
+    n = max(1, int(round(math.sqrt(loop_count / 4.0))))
+    x, y = np.meshgrid(np.linspace(0.0, 1.0, n + 1), np.linspace(0.0, 1.0, n + 1))
+    z = 0.03 * np.sin(x * 60.0) * np.cos(y * 50.0)
+    co = np.stack((x.ravel(), y.ravel(), z.ravel()), axis=1)
+
+    corners = (np.arange(n)[:, np.newaxis] * (n + 1) + np.arange(n)).ravel()
+    loop_verts = np.stack((corners, corners + 1, corners + n + 2, corners + n + 1), axis=1)
+    return co, np.full(n * n, 4), loop_verts.ravel()
+
+
+def make_islands(loop_count):
+    # separate quads, each one its own island
+    face_count = max(1, loop_count // 4)
+    n = int(math.ceil(math.sqrt(face_count)))
+    cell = np.arange(face_count)
+    origins = np.stack((cell % n, cell // n), axis=1) / float(n)
+    quad = np.array(((0.1, 0.1), (0.9, 0.1), (0.9, 0.9), (0.1, 0.9))) / n
+
+    co = np.zeros((face_count * 4, 3))
+    co[:, :2] = (origins[:, np.newaxis, :] + quad).reshape(-1, 2)
+    return co, np.full(face_count, 4), np.arange(face_count * 4)
+
+
+def make_fans(loop_count):
+    # triangle fans around vertices with fan_valence neighbours
+    fan_count = max(1, loop_count // (fan_valence * 3))
+    n = int(math.ceil(math.sqrt(fan_count)))
+    fan = np.arange(fan_count)
+    centers = (np.stack((fan % n, fan // n), axis=1) + 0.5) / float(n)
+    angles = np.linspace(0.0, 2.0 * math.pi, fan_valence, endpoint=False)
+    ring = np.stack((np.cos(angles), np.sin(angles)), axis=1) * (0.45 / n)
+
+    verts_per_fan = fan_valence + 1
+    co = np.zeros((fan_count, verts_per_fan, 3))
+    co[:, 0, :2] = centers
+    co[:, 1:, :2] = centers[:, np.newaxis, :] + ring
+
+    rim = np.arange(fan_valence)
+    triangles = np.stack((np.zeros(fan_valence, dtype=np.int64), rim + 1, (rim + 1) % fan_valence + 1), axis=1)
+    loop_verts = (fan[:, np.newaxis, np.newaxis] * verts_per_fan + triangles).ravel()
+    return co.reshape(-1, 3), np.full(fan_count * fan_valence, 3), loop_verts
+
+
+mesh_makers = {
+    'GRID': make_grid,
+    'ISLANDS': make_islands,
+    'FANS': make_fans,
+}
+
+
+def get_mesh_edges(vertex_count, face_sizes, loop_verts):
+    # (E, 2) unique edges between consecutive loops of each face
+    loop_starts = np.concatenate(([0], np.cumsum(face_sizes)[:-1]))
+    next_loops = np.arange(len(loop_verts)) + 1
+    next_loops[loop_starts + face_sizes - 1] = loop_starts
+    a = loop_verts
+    b = loop_verts[next_loops]
+    keys = np.unique(np.minimum(a, b).astype(np.int64) * vertex_count + np.maximum(a, b))
+    return np.stack((keys // vertex_count, keys % vertex_count), axis=1)
+
+
+def make_mesh_data(shape, loop_count, seed=0):
+    co, face_sizes, loop_verts = mesh_makers[shape](loop_count)
+    rng = np.random.default_rng(seed)
+    face_count = len(face_sizes)
+    loop_faces = np.repeat(np.arange(face_count), face_sizes)
+
+    # every other face is selected for the masked runs
+    face_select = np.arange(face_count) % 2 == 0
+
+    return {
+        'co': co,
+        'face_sizes': face_sizes,
+        'loop_starts': np.concatenate(([0], np.cumsum(face_sizes)[:-1])),
+        'loop_verts': loop_verts,
+        'loop_faces': loop_faces,
+        'edges': get_mesh_edges(len(co), face_sizes, loop_verts),
+        'face_select': face_select,
+        'colors': rng.random((len(loop_verts), 4), dtype=np.float32),
+        'weights': rng.random(len(co), dtype=np.float32),
+    }
+
+
+# maps the 0-1 mesh coordinates to the whole region
+gradient_matrix = ((2.0, 0.0, 0.0, -1.0),
+                   (0.0, 2.0, 0.0, -1.0),
+                   (0.0, 0.0, 1.0, 0.0),
+                   (0.0, 0.0, 0.0, 1.0))
+gradient_region = (1920, 1080)
+gradient_line = ((0.0, 0.0), (1920.0, 1080.0))
+gradient_colors = ((1.0, 0.0, 0.0), (0.0, 0.0, 1.0))
+# samples, distance and smooth iterations, the distance being about the size of the grid bumps
+ambient_occlusion_settings = (8, 0.05, 3)
+
+
+# Kernel benchmarks
+#
+# Each takes the kernel module, the mesh data and the loop selection mask (None when
+# not masked) and does the array work of the helper of the same name.
+
+def kernel_fill_selected(k, data, loop_mask):
+    fill_values = np.array((0.5, 0.25, 1.0), dtype=np.float32)
+    k.apply_channel_op(data['colors'], lambda values: np.broadcast_to(fill_values, values.shape),
+                       [True, True, True, False], loop_mask)
+
+
+def kernel_blend_channels(k, data, loop_mask):
+    colors = data['colors']
+    colors[:, 2] = k.blend_values(colors[:, 0], colors[:, 1], 'OVERLAY', 0.5)
+
+
+def kernel_island_randomize(k, data, loop_mask):
+    face_islands, island_count = k.label_face_islands(len(data['co']), data['loop_verts'],
+                                                      data['loop_faces'], len(data['face_sizes']))
+    loop_islands = face_islands[data['loop_faces']]
+    loop_indices = np.arange(len(loop_islands))
+    if loop_mask is not None:
+        loop_indices = np.flatnonzero(loop_mask)
+        loop_islands = loop_islands[loop_indices]
+    island_colors = np.random.random((island_count, 4)).astype(np.float32)
+    data['colors'][loop_indices, :3] = island_colors[loop_islands, :3]
+
+
+def kernel_blur(k, data, loop_mask):
+    colors = data['colors']
+    loop_verts = data['loop_verts']
+    vertex_count = len(data['co'])
+    values = colors[:, :3].astype(np.float64)
+    vertex_values = k.average_per_vertex(loop_verts, values, vertex_count)
+
+    vertex_mask = None
+    if loop_mask is not None:
+        vertex_mask = np.zeros(vertex_count, dtype=bool)
+        vertex_mask[loop_verts[loop_mask]] = True
+
+    adjacency = k.build_vertex_adjacency(vertex_count, data['edges'])
+    smoothed = k.smooth_vertex_values(adjacency, vertex_values, 0.5, 1, 0.0, vertex_mask)
+    result = smoothed[loop_verts]
+    if loop_mask is None:
+        colors[:, :3] = result
+    else:
+        loop_indices = np.flatnonzero(loop_mask)
+        colors[loop_indices, :3] = result[loop_indices]
+
+
+def kernel_gradient(k, data, loop_mask):
+    points, visible = k.project_to_region(data['co'], gradient_matrix, *gradient_region)
+    loop_verts = data['loop_verts']
+    painted = visible[loop_verts]
+    if loop_mask is not None:
+        painted &= loop_mask
+    loop_indices = np.flatnonzero(painted)
+    verts, loop_points = np.unique(loop_verts[loop_indices], return_inverse=True)
+    k.paint_gradient(data['colors'], points[verts], loop_indices, loop_points.ravel(),
+                     gradient_line[0], gradient_line[1], *gradient_colors)
+
+
+# name : (function, supports a selection mask)
+# copy_channel and weights_to_color are single array assignments in the helpers, with
+# no kernel to time, and the selection mask cache needs a mesh, so these are only
+# benchmarked in Blender
+kernel_benchmarks = {
+    'fill_selected': (kernel_fill_selected, True),
+    'blend_channels': (kernel_blend_channels, False),
+    'island_randomize': (kernel_island_randomize, True),
+    'blur': (kernel_blur, True),
+    'gradient': (kernel_gradient, True),
+}
+
+
+# Blender benchmarks
+#
+# Each takes the helpers module and the object, and calls the helper in the same way
+# as the operator does. The selection mask is enabled on the mesh for masked runs.
+
+def build_blender_object(data, name):
+    import bpy
+    mesh = bpy.data.meshes.new(name)
+    mesh.vertices.add(len(data['co']))
+    mesh.vertices.foreach_set('co', data['co'].astype(np.float32).ravel())
+    mesh.loops.add(len(data['loop_verts']))
+    mesh.loops.foreach_set('vertex_index', data['loop_verts'].astype(np.int32))
+    mesh.polygons.add(len(data['face_sizes']))
+    mesh.polygons.foreach_set('loop_start', data['loop_starts'].astype(np.int32))
+    # loop_total is read only in newer versions, where it is derived from loop_start
+    if not bpy.types.MeshPolygon.bl_rna.properties['loop_total'].is_readonly:
+        mesh.polygons.foreach_set('loop_total', data['face_sizes'].astype(np.int32))
+    mesh.update(calc_edges=True)
+    mesh.polygons.foreach_set('select', data['face_select'])
+
+    obj = bpy.data.objects.new(name, mesh)
+    bpy.context.scene.collection.objects.link(obj)
+    return obj
+
+
+def setup_blender_object(h, obj, data):
+    mesh = obj.data
+    for name in ('Col', 'Src'):
+        vcol = h.new_color_layer(mesh, name)
+        h.set_color_array(vcol, data['colors'])
+    h.set_active_color_layer(mesh, h.get_color_layers(mesh)['Col'])
+    h.set_vertex_group_weights(obj.vertex_groups.new(name='Weights'), data['weights'])
+
+
+def remove_blender_object(obj):
+    import bpy
+    mesh = obj.data
+    bpy.data.objects.remove(obj)
+    bpy.data.meshes.remove(mesh)
+
+
+def blender_fill_selected(h, obj):
+    h.fill_selected(obj.data, h.get_color_layers(obj.data)['Col'], (0.5, 0.25, 1.0), {'R', 'G', 'B'})
+
+
+def blender_blend_channels(h, obj):
+    layers = h.get_color_layers(obj.data)
+    h.blend_channels(obj.data, layers['Src'], layers['Col'], 0, 1, 2, 'OVERLAY', 0.5)
+
+
+def blender_copy_channel(h, obj):
+    layers = h.get_color_layers(obj.data)
+    h.copy_channel(obj.data, layers['Src'], layers['Col'], 0, 1)
+
+
+def blender_weights_to_color(h, obj):
+    h.weights_to_color(obj.data, obj.vertex_groups['Weights'].index, h.get_color_layers(obj.data)['Col'], 0)
+
+
+def blender_island_randomize(h, obj):
+    # topology caches are cleared, so islands are found on every run
+    h.clear_topology_cache()
+    h.set_island_colors_per_channel(obj.data, h.get_color_layers(obj.data)['Col'],
+                                    [True, True, True, False], False, 0.0, 1.0)
+
+
+def blender_blur(h, obj):
+    h.clear_topology_cache()
+    h.blur_channels(obj.data, h.get_color_layers(obj.data)['Col'], [True, True, True, False])
+
+
+def get_vertex_selection_mask(h, mesh, cached):
+    # the vertex paint mask, where rebuilding the mask is a single gather
+    mesh.use_paint_mask_vertex = True
+    try:
+        if not cached:
+            h.clear_selection_mask_cache()
+        h.get_loop_selection_mask(mesh)
+    finally:
+        mesh.use_paint_mask_vertex = False
+
+
+def blender_selection_mask_miss(h, obj):
+    get_vertex_selection_mask(h, obj.data, False)
+
+
+def blender_selection_mask_hit(h, obj):
+    # runs after the miss benchmark, so the mask is cached
+    get_vertex_selection_mask(h, obj.data, True)
+
+
+def blender_ambient_occlusion(h, obj):
+    # the ray tree is rebuilt on every run, as when the mesh was edited
+    h.clear_occlusion_tree_cache()
+    samples, distance, smooth_iterations = ambient_occlusion_settings
+    h.bake_ambient_occlusion(obj, h.get_color_layers(obj.data)['Col'], [True, True, True, False],
+                             samples, distance, smooth_iterations=smooth_iterations)
+
+
+def blender_gradient(h, obj):
+    mesh = obj.data
+    vcol = h.get_color_layers(mesh)['Col']
+    points, loop_indices, loop_points = h.get_gradient_targets(mesh, gradient_matrix, *gradient_region)
+    colors = h.get_color_array(vcol)
+    h.paint_gradient(colors, points, loop_indices, loop_points, gradient_line[0], gradient_line[1],
+                     *gradient_colors)
+    h.set_color_array(vcol, colors)
+    mesh.update()
+
+
+blender_benchmarks = {
+    'fill_selected': (blender_fill_selected, True),
+    'blend_channels': (blender_blend_channels, False),
+    'copy_channel': (blender_copy_channel, False),
+    'weights_to_color': (blender_weights_to_color, False),
+    'island_randomize': (blender_island_randomize, True),
+    'blur': (blender_blur, True),
+    'gradient': (blender_gradient, True),
+    'selection_mask_miss': (blender_selection_mask_miss, False),
+    'selection_mask_hit': (blender_selection_mask_hit, False),
+    'ambient_occlusion': (blender_ambient_occlusion, False),
+}
+# too slow for every size, so only run when named in --benchmarks
+slow_benchmarks = ('ambient_occlusion',)
+
+
+# Runner
+
+def measure(func, repeats):
+    # returns the best and median time of repeats calls, and the peak memory allocated
+    # during an extra call. tracemalloc sees Python and NumPy allocations, not those
+    # made inside Blender
+    func()
+    times = []
+    for i in range(repeats):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        func()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    times.sort()
+    return {'min_seconds': times[0], 'median_seconds': times[len(times) // 2], 'peak_bytes': peak}
+
+
+def get_result_key(result):
+    return "{0}/{1}/{2}/{3}/{4}".format(result['backend'], result['shape'], result['loops'],
+                                        result['benchmark'], 'masked' if result['masked'] else 'all')
+
+
+def run_kernel_benchmarks(shapes, sizes, names, repeats):
+    k = import_kernels()
+    results = []
+    for shape in shapes:
+        for size in sizes:
+            data = make_mesh_data(shape, size)
+            loop_mask = data['face_select'][data['loop_faces']]
+            for name in names:
+                if name not in kernel_benchmarks:
+                    continue
+                func, supports_mask = kernel_benchmarks[name]
+                for masked in ((False, True) if supports_mask else (False,)):
+                    mask = loop_mask if masked else None
+                    result = {'backend': 'kernels', 'shape': shape, 'loops': len(data['loop_verts']),
+                              'benchmark': name, 'masked': masked}
+                    result.update(measure(lambda: func(k, data, mask), repeats))
+                    print_result(result)
+                    results.append(result)
+    return results
+
+
+def measure_register(h, repeats):
+    # the add-on is registered on every Blender launch, so this should stay flat
+    import bpy
+    package = sys.modules[h.__package__]
+    if hasattr(bpy.types.Scene, 'vertex_color_master_settings'):
+        print("Add-on is enabled, not timing register()", flush=True)
+        return None
+    if not hasattr(package, 'register'):
+        # the package was imported without its __init__, which is only needed here
+        spec = importlib.util.spec_from_file_location(package.__name__,
+                                                      os.path.join(package.__path__[0], '__init__.py'))
+        spec.loader.exec_module(package)
+
+    def register():
+        package.register()
+        package.unregister()
+
+    result = {'backend': 'blender', 'shape': 'NONE', 'loops': 0, 'benchmark': 'register', 'masked': False}
+    result.update(measure(register, repeats))
+    print_result(result)
+    return result
+
+
+def run_blender_benchmarks(shapes, sizes, names, repeats):
+    h = import_helpers()
+    results = []
+    register_result = measure_register(h, repeats)
+    if register_result is not None:
+        results.append(register_result)
+    for shape in shapes:
+        for size in sizes:
+            data = make_mesh_data(shape, size)
+            obj = build_blender_object(data, "VCM_Benchmark_{0}_{1}".format(shape, size))
+            try:
+                setup_blender_object(h, obj, data)
+                for name in names:
+                    func, supports_mask = blender_benchmarks[name]
+                    for masked in ((False, True) if supports_mask else (False,)):
+                        obj.data.use_paint_mask = masked
+                        result = {'backend': 'blender', 'shape': shape, 'loops': len(obj.data.loops),
+                                  'benchmark': name, 'masked': masked}
+                        result.update(measure(lambda: func(h, obj), repeats))
+                        print_result(result)
+                        results.append(result)
+            finally:
+                remove_blender_object(obj)
+                h.clear_mesh_caches()
+    return results
+
+
+def print_result(result):
+    print("{0:<48} {1:10.4f}s {2:10.4f}s {3:10.1f} MB".format(
+        get_result_key(result), result['min_seconds'], result['median_seconds'],
+        result['peak_bytes'] / (1024.0 * 1024.0)), flush=True)
+
+
+def compare_to_baseline(results, baseline, threshold):
+    # returns the results whose median time exceeds that of the baseline by more than threshold
+    baseline_times = {get_result_key(result): result['median_seconds'] for result in baseline['results']}
+    regressions = []
+    for result in results:
+        previous = baseline_times.get(get_result_key(result))
+        if previous is None:
+            continue
+        current = result['median_seconds']
+        if current - previous > regression_min_seconds and current > previous * (1.0 + threshold):
+            regressions.append(dict(result, baseline_seconds=previous, ratio=current / max(previous, 1e-12)))
+    return regressions
+
+
+def get_environment(backend):
+    environment = {
+        'backend': backend,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+    }
+    if backend == 'blender':
+        import bpy
+        environment['blender'] = bpy.app.version_string
+    return environment
+
+
+def has_bpy():
+    try:
+        import bpy
+    except ImportError:
+        return False
+    return True
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    # Blender passes its own arguments before '--'
+    if '--' in argv:
+        argv = argv[argv.index('--') + 1:]
+
+    parser = argparse.ArgumentParser(description="Benchmark Vertex Color Master on synthetic meshes.")
+    parser.add_argument('--sizes', nargs='+', default=list(default_sizes),
+                        help="Mesh sizes in loops, such as 10k or 1m (default: 10k 100k 1m 10m)")
+    parser.add_argument('--shapes', nargs='+', default=list(mesh_shapes), choices=mesh_shapes,
+                        type=str.upper, help="Synthetic meshes to use (default: all)")
+    parser.add_argument('--benchmarks', nargs='+', choices=list(blender_benchmarks),
+                        default=[name for name in blender_benchmarks if name not in slow_benchmarks],
+                        help="Benchmarks to run (default: all but ambient_occlusion)")
+    parser.add_argument('--repeats', type=int, default=3, help="Timed runs of each benchmark (default: 3)")
+    parser.add_argument('--kernels', action='store_true', help="Time the NumPy kernels, even inside Blender")
+    parser.add_argument('--output', default=None, help="Write the results as JSON to this path")
+    parser.add_argument('--baseline', default=None, help="Results of an earlier run to compare against")
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help="Slowdown relative to the baseline reported as a regression (default: 0.2)")
+    args = parser.parse_args(argv)
+
+    backend = 'kernels' if args.kernels or not has_bpy() else 'blender'
+    sizes = [parse_size(size) for size in args.sizes]
+    run = run_kernel_benchmarks if backend == 'kernels' else run_blender_benchmarks
+    results = run(args.shapes, sizes, args.benchmarks, max(args.repeats, 1))
+
+    summary = {'environment': get_environment(backend), 'repeats': args.repeats, 'results': results}
+    regressions = []
+    if args.baseline is not None:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare_to_baseline(results, baseline, args.threshold)
+        summary['baseline'] = os.path.abspath(args.baseline)
+        summary['regressions'] = [get_result_key(result) for result in regressions]
+        for result in regressions:
+            print("REGRESSION {0}: {1:.4f}s, was {2:.4f}s ({3:.2f}x)".format(
+                get_result_key(result), result['median_seconds'], result['baseline_seconds'], result['ratio']))
+
+    if args.output is not None:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=2)
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -49,7 +49,60 @@ channel_blend_mode_items = (('ADD', "Add", ""),
                             ('DIV', "Divide", ""),
                             ('LIGHTEN', "Lighten",  ""),
                             ('DARKEN', "Darken", ""),
-                            ('MIX', "Mix", ""))
+                            ('MIX', "Mix", ""),
+                            ('SCREEN', "Screen", ""),
+                            ('OVERLAY', "Overlay", ""),
+                            ('SOFTLIGHT', "Soft Light", ""),
+                            ('HARDLIGHT', "Hard Light", ""),
+                            ('COLORDODGE', "Color Dodge", ""),
+                            ('COLORBURN', "Color Burn", ""),
+                            ('LINEARBURN', "Linear Burn", ""),
+                            ('LINEARLIGHT', "Linear Light", ""),
+                            ('VIVIDLIGHT', "Vivid Light", ""),
+                            ('PINLIGHT', "Pin Light", ""),
+                            ('DIFFERENCE', "Difference", ""),
+                            ('EXCLUSION', "Exclusion", ""))
+
+uv_wrap_mode_items = (('WRAP', "Wrap", "Repeat UVs outside the 0-1 range"),
+                      ('CLAMP', "Clamp", "Clamp UVs to the 0-1 range"),
+                      ('BOUNDS', "Bounds", "Remap the bounding box of the UVs to the 0-1 range"))
+
+# Backend used by helpers that support array processing
+backend_items = (('NUMPY', "NumPy", "Process the whole layer at once using arrays (fast)"),
+                 ('PYTHON', "Python", "Process one loop at a time (slow, original implementation)"))
+
+# Channel operations that can be chained in a pipeline
+pipeline_op_items = (('FILL', "Fill", "Fill the channels with a value"),
+                     ('INVERT', "Invert", "Invert the channels"),
+                     ('POSTERIZE', "Posterize", "Posterize the channels"),
+                     ('REMAP', "Remap", "Remap the channels from the input to the output range"))
+
+pipeline_edit_action_items = (('ADD', "Add Pipeline", ""),
+                              ('REMOVE', "Remove Pipeline", ""),
+                              ('ADD_STEP', "Add Step", ""),
+                              ('REMOVE_STEP', "Remove Step", ""),
+                              ('MOVE_STEP_UP', "Move Step Up", ""),
+                              ('MOVE_STEP_DOWN', "Move Step Down", ""))
+
+# Curvature bake
+curvature_mode_items = (('CONVEXITY', "Convexity", "Average angle between the faces at each edge of the vertex"),
+                        ('MEAN_CURVATURE', "Mean Curvature", "Discrete mean curvature, normalized by the largest values on the mesh"))
+
+curvature_output_items = (('BOTH', "Both", "Concave areas below 0.5, convex areas above"),
+                          ('CONVEX', "Convex", "Convex areas are bright, the rest is black (edge wear)"),
+                          ('CONCAVE', "Concave", "Concave areas are bright, the rest is black (cavity)"))
+
+# Distance from selection gradient
+distance_mode_items = (('EDGES', "Along Edges", "Shortest distance travelling along the edges of the mesh"),
+                       ('EUCLIDEAN', "Straight Line", "Straight line distance, ignoring the mesh surface"))
+
+falloff_items = (('SMOOTH', "Smooth", ""),
+                 ('SPHERE', "Sphere", ""),
+                 ('ROOT', "Root", ""),
+                 ('INVERSE_SQUARE', "Inverse Square", ""),
+                 ('SHARP', "Sharp", ""),
+                 ('LINEAR', "Linear", ""),
+                 ('CONSTANT', "Constant", ""))
 
 default_brush_name = 'Draw' # Changed to Add in 2.81 for some reason
 
@@ -18,22 +18,23 @@
 # <pep8 compliant>
 
 import bpy
-import bmesh
+import json
+import os
 import random
-from math import fmod
-from mathutils import Color, Vector
+import time
+import tracemalloc
+import numpy as np
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import partial
+from itertools import chain, repeat
+from math import fmod, pi
+from mathutils import Color
+from mathutils.bvhtree import BVHTree
+from mathutils.kdtree import KDTree
 from .vcm_globals import *
-
-def posterize(value, steps):
-    return round(value * steps) / steps
-
-
-def remap(value, min0, max0, min1, max1):
-    r0 = max0 - min0
-    if r0 == 0:
-        return min1
-    r1 = max1 - min1
-    return ((value - min0) * r1) / r0 + min1
+from .vcm_kernels import *
 
 
 def channel_id_to_idx(id):
@@ -68,24 +69,21 @@ def get_isolated_channel_ids(vcol):
     return None
 
 
-def rgb_to_luminosity(color):
+def convert_rgb_to_luminosity(mesh, src_vcol, dst_vcol, dst_channel_idx, dst_all_channels=False):
+    src_colors = get_domain_color_array(mesh, src_vcol, get_layer_domain(dst_vcol))
+    src_colors = convert_color_space(src_colors, src_vcol, dst_vcol)
+    dst_colors = src_colors if src_vcol == dst_vcol else get_color_array(dst_vcol)
     # Y = 0.299 R + 0.587 G + 0.114 B
-    return color[0] * 0.299 + color[1] * 0.587 + color[2] * 0.114
-
+    luminosity = src_colors[:, :3] @ np.array([0.299, 0.587, 0.114], dtype=np.float32)
 
-def convert_rgb_to_luminosity(mesh, src_vcol, dst_vcol, dst_channel_idx, dst_all_channels=False):
     if dst_all_channels:
-        for loop_index, loop in enumerate(mesh.loops):
-            c = src_vcol.data[loop_index].color
-            luminosity = rgb_to_luminosity(c)
-            c[0] = luminosity # assigning this way will preserve alpha
-            c[1] = luminosity
-            c[2] = luminosity
-            dst_vcol.data[loop_index].color = c
+        # the alpha of the source is kept
+        dst_colors[:, 3] = src_colors[:, 3]
+        dst_colors[:, :3] = luminosity[:, np.newaxis]
     else:
-        for loop_index, loop in enumerate(mesh.loops):
-            luminosity = rgb_to_luminosity(src_vcol.data[loop_index].color)
-            dst_vcol.data[loop_index].color[dst_channel_idx] = luminosity
+        dst_colors[:, dst_channel_idx] = luminosity
+    set_color_array(dst_vcol, dst_colors)
+    update_mesh(mesh)
 
 
 # alpha_mode
@@ -94,449 +92,1243 @@ def convert_rgb_to_luminosity(mesh, src_vcol, dst_vcol, dst_channel_idx, dst_all
 # 'FILL' - fill alpha with 1.0
 def copy_channel(mesh, src_vcol, dst_vcol, src_channel_idx, dst_channel_idx, swap=False,
                  dst_all_channels=False, alpha_mode='PRESERVE'):
+    # the layers may be in different domains and color spaces, so values are converted
+    # to those of the other layer
+    src_domain = get_layer_domain(src_vcol)
+    dst_domain = get_layer_domain(dst_vcol)
+    same_layer = src_vcol == dst_vcol
+    src_colors = get_color_array(src_vcol)
+    dst_colors = src_colors if same_layer else get_color_array(dst_vcol)
+    src_values = convert_color_space(src_colors, src_vcol, dst_vcol)[:, src_channel_idx]
+    src_values = convert_domain(mesh, src_values, src_domain, dst_domain).copy()
+
     if dst_all_channels:
-        color_size = len(src_vcol.data[0].color) if len(src_vcol.data) > 0 else 3
-        if alpha_mode == 'OVERWRITE' or color_size < 4:
-            for loop_index, loop in enumerate(mesh.loops):
-                src_val = src_vcol.data[loop_index].color[src_channel_idx]
-                dst_vcol.data[loop_index].color = [src_val] * color_size
+        dst_colors[:, :3] = src_values[:, np.newaxis]
+        if alpha_mode == 'OVERWRITE':
+            dst_colors[:, 3] = src_values
         elif alpha_mode == 'FILL':
-            for loop_index, loop in enumerate(mesh.loops):
-                src_val = src_vcol.data[loop_index].color[src_channel_idx]
-                dst_vcol.data[loop_index].color = [src_val, src_val, src_val, 1.0]
-        else: # default to preserve
-            for loop_index, loop in enumerate(mesh.loops):
-                c = src_vcol.data[loop_index].color
-                src_val = c[src_channel_idx]
-                c[0] = src_val
-                c[1] = src_val
-                c[2] = src_val
-                dst_vcol.data[loop_index].color = c
+            dst_colors[:, 3] = 1.0
+    elif swap:
+        dst_values = convert_color_space(dst_colors, dst_vcol, src_vcol)[:, dst_channel_idx]
+        dst_values = convert_domain(mesh, dst_values, dst_domain, src_domain).copy()
+        dst_colors[:, dst_channel_idx] = src_values
+        src_colors[:, src_channel_idx] = dst_values
+        if not same_layer:
+            set_color_array(src_vcol, src_colors)
     else:
-        if swap:
-            for loop_index, loop in enumerate(mesh.loops):
-                src_val = src_vcol.data[loop_index].color[src_channel_idx]
-                dst_val = dst_vcol.data[loop_index].color[dst_channel_idx]
-                dst_vcol.data[loop_index].color[dst_channel_idx] = src_val
-                src_vcol.data[loop_index].color[src_channel_idx] = dst_val
-        else:
-            for loop_index, loop in enumerate(mesh.loops):
-                dst_vcol.data[loop_index].color[dst_channel_idx] = src_vcol.data[loop_index].color[src_channel_idx]
-
-    mesh.update()
-
-
-def blend_channels(mesh, src_vcol, dst_vcol, src_channel_idx, dst_channel_idx, result_channel_idx, operation='ADD'):
-    if operation == 'ADD':
-        for loop_index, loop in enumerate(mesh.loops):
-            val = src_vcol.data[loop_index].color[src_channel_idx] + dst_vcol.data[loop_index].color[dst_channel_idx]
-            dst_vcol.data[loop_index].color[result_channel_idx] = max(0.0, min(val, 1.0))  # clamp
-    elif operation == 'SUB':
-        for loop_index, loop in enumerate(mesh.loops):
-            val = src_vcol.data[loop_index].color[src_channel_idx] - dst_vcol.data[loop_index].color[dst_channel_idx]
-            dst_vcol.data[loop_index].color[result_channel_idx] = max(0.0, min(val, 1.0))  # clamp
-    elif operation == 'MUL':
-        for loop_index, loop in enumerate(mesh.loops):
-            val = src_vcol.data[loop_index].color[src_channel_idx] * dst_vcol.data[loop_index].color[dst_channel_idx]
-            dst_vcol.data[loop_index].color[result_channel_idx] = val
-    elif operation == 'DIV':
-        for loop_index, loop in enumerate(mesh.loops):
-            src = src_vcol.data[loop_index].color[src_channel_idx]
-            dst = dst_vcol.data[loop_index].color[dst_channel_idx]
-            val = 0.0 if src == 0.0 else 1.0 if dst == 0.0 else src / dst
-            dst_vcol.data[loop_index].color[result_channel_idx] = val
-    elif operation == 'LIGHTEN':
-        for loop_index, loop in enumerate(mesh.loops):
-            src = src_vcol.data[loop_index].color[src_channel_idx]
-            dst = dst_vcol.data[loop_index].color[dst_channel_idx]
-            dst_vcol.data[loop_index].color[result_channel_idx] = src if src > dst else dst
-    elif operation == 'DARKEN':
-        for loop_index, loop in enumerate(mesh.loops):
-            src = src_vcol.data[loop_index].color[src_channel_idx]
-            dst = dst_vcol.data[loop_index].color[dst_channel_idx]
-            dst_vcol.data[loop_index].color[result_channel_idx] = src if src < dst else dst
-    elif operation == 'MIX':
-        for loop_index, loop in enumerate(mesh.loops):
-            dst_vcol.data[loop_index].color[result_channel_idx] = src_vcol.data[loop_index].color[src_channel_idx]
+        dst_colors[:, dst_channel_idx] = src_values
+
+    set_color_array(dst_vcol, dst_colors)
+    update_mesh(mesh)
+
+
+# Snapshots of isolated channels, so that applying an isolated channel only writes the
+# values that were edited. Float layers are stored exactly, byte layers as uint8.
+# (mesh pointer, isolated layer name) : snapshot
+isolated_channel_snapshots = {}
+
+
+def clear_isolated_channel_snapshots():
+    isolated_channel_snapshots.clear()
+
+
+def isolate_channel(mesh, src_vcol, iso_vcol, channel_idx):
+    # one read of the source layer: snapshot the channel, then broadcast it into RGB
+    # of the same buffer and write that to the isolated layer
+    colors = get_color_array(src_vcol)
+    exact = get_layer_data_type(src_vcol) == 'FLOAT_COLOR'
+    isolated_channel_snapshots[(mesh.as_pointer(), iso_vcol.name)] = pack_channel(colors[:, channel_idx], exact)
+    colors[:, :3] = colors[:, channel_idx, None]
+    colors[:, 3] = 1.0
+    set_color_array(iso_vcol, colors)
+    update_mesh(mesh)
+
+
+def apply_isolated_channel(mesh, iso_vcol, dst_vcol, channel_idx, discard=False):
+    # write the isolated channel back. Only loops that differ from the snapshot are
+    # written, so untouched values are never requantized. Isolating never writes to
+    # the source layer, so discarding leaves it as it is
+    snapshot = isolated_channel_snapshots.pop((mesh.as_pointer(), iso_vcol.name), None)
+    if discard:
+        return
+
+    colors = get_color_array(dst_vcol)
+    # assuming iso_vcol has only grayscale data, RGB are equal, so copy from R
+    values = get_color_array(iso_vcol)[:, 0]
+    if snapshot is None:
+        changed = slice(None)
     else:
+        changed = np.abs(values - unpack_channel(snapshot)) > get_snapshot_tolerance(snapshot)
+
+    if snapshot is not None and not changed.any():
         return
+    colors[changed, channel_idx] = values[changed]
+    set_color_array(dst_vcol, colors)
+    update_mesh(mesh)
+
 
-    mesh.update()
+def blend_channels(mesh, src_vcol, dst_vcol, src_channel_idx, dst_channel_idx, result_channel_idx,
+                   operation='ADD', factor=1.0):
+    blend_channels_batch([(mesh, src_vcol, dst_vcol)], src_channel_idx, dst_channel_idx,
+                         result_channel_idx, operation, factor)
+
+
+def blend_channels_batch(targets, src_channel_idx, dst_channel_idx, result_channel_idx,
+                         operation='ADD', factor=1.0):
+    # targets is a list of (mesh, src_vcol, dst_vcol)
+    if operation not in blend_kernels:
+        return
 
+    def read(target):
+        mesh, src_vcol, dst_vcol = target
+        dst_colors = get_color_array(dst_vcol)
+        src_colors = dst_colors if src_vcol == dst_vcol else get_color_array(src_vcol)
+        src_colors = convert_color_space(src_colors, src_vcol, dst_vcol)
+        src_values = convert_domain(mesh, src_colors[:, src_channel_idx],
+                                    get_layer_domain(src_vcol), get_layer_domain(dst_vcol))
+        return src_values, dst_colors
 
-def uvs_to_color(mesh, src_uv, dst_vcol, dst_u_idx=0, dst_v_idx=1):
+    def compute(data):
+        src_values, dst_colors = data
+        result = blend_values(src_values, dst_colors[:, dst_channel_idx], operation, factor)
+        dst_colors[:, result_channel_idx] = result
+        return dst_colors
+
+    def write(target, dst_colors):
+        mesh, src_vcol, dst_vcol = target
+        set_color_array(dst_vcol, dst_colors)
+        update_mesh(mesh)
+
+    run_batched(targets, read, compute, write)
+
+
+def get_uv_array(uv_layer):
+    with profile_phase('read'):
+        uvs = np.empty(len(uv_layer.data) * 2, dtype=np.float32)
+        uv_layer.data.foreach_get('uv', uvs)
+    return uvs.reshape(-1, 2)
+
+
+def set_uv_array(uv_layer, uvs):
+    with profile_phase('write'):
+        uv_layer.data.foreach_set('uv', uvs.ravel())
+
+
+def uvs_to_color(mesh, src_uv, dst_vcol, dst_u_idx=0, dst_v_idx=1, wrap_mode='WRAP'):
     # by default copy u->r and v->g
-    # uv range is -inf, inf so use fmod to remap to 0-1
-    for loop_index, loop in enumerate(mesh.loops):
-        c = dst_vcol.data[loop_index].color
-        uv = src_uv.data[loop_index].uv
-        u = fmod(uv[0], 1.0)
-        v = fmod(uv[1], 1.0)
-        c[dst_u_idx] = u + 1.0 if u < 0 else u
-        c[dst_v_idx] = v + 1.0 if v < 0 else v
-        dst_vcol.data[loop_index].color = c
+    # uv range is -inf, inf so remap to 0-1 based on wrap_mode
+    uvs = wrap_uvs(get_uv_array(src_uv), wrap_mode)
+    uvs = convert_domain(mesh, uvs, 'CORNER', get_layer_domain(dst_vcol))
+    colors = get_color_array(dst_vcol)
+    colors[:, dst_u_idx] = uvs[:, 0]
+    colors[:, dst_v_idx] = uvs[:, 1]
+    set_color_array(dst_vcol, colors)
 
-    mesh.update()
+    update_mesh(mesh)
 
 
 def color_to_uvs(mesh, src_vcol, dst_uv, src_u_idx=0, src_v_idx=1):
     # by default copy r->u and g->v
-    for loop_index, loop in enumerate(mesh.loops):
-        c = src_vcol.data[loop_index].color
-        uv = [c[src_u_idx], c[src_v_idx]]
-        dst_uv.data[loop_index].uv = uv
+    colors = get_domain_color_array(mesh, src_vcol, 'CORNER')
+    set_uv_array(dst_uv, colors[:, [src_u_idx, src_v_idx]])
 
-    mesh.update()
+    update_mesh(mesh)
 
 
 def get_custom_normals(obj):
-    # Not entirely sure why this works and [loop.normal for loop in obj.data.loops] doesn't work...
+    # returns an (N, 3) array of the split (corner) normals of the mesh
     # note that these normals are in world space... seems to be a huge pain to get tangent space normals
-    normals = [loop.normal for loop in [obj.data.calc_normals_split(), obj][1].data.loops]
+    mesh = obj.data
+    normals = np.empty(len(mesh.loops) * 3, dtype=np.float32)
+    if hasattr(mesh, 'corner_normals'):
+        # Blender 4.1+ always has up to date corner normals
+        mesh.corner_normals.foreach_get('vector', normals)
+    else:
+        mesh.calc_normals_split()
+        mesh.loops.foreach_get('normal', normals)
 
-    return normals
+    return normals.reshape(-1, 3)
 
 
 def normals_to_color(mesh, normals, dst_vcol):
-    # copy normal xyz to color rgb
-    for loop_index, loop in enumerate(mesh.loops):
-        c = dst_vcol.data[loop_index].color
-        n = normals[loop_index]
-        # remap to values that can be displayed
-        c[0] = remap(n[0], -1.0, 1.0, 0.0, 1.0)
-        c[1] = remap(n[1], -1.0, 1.0, 0.0, 1.0)
-        c[2] = remap(n[2], -1.0, 1.0, 0.0, 1.0)
-        dst_vcol.data[loop_index].color = c
+    # copy normal xyz to color rgb, remapped to values that can be displayed
+    # in the point domain, the normalized average of the vertex's corner normals is used
+    normals = np.asarray(normals, dtype=np.float32)
+    if get_layer_domain(dst_vcol) == 'POINT':
+        normals = convert_domain(mesh, normals, 'CORNER', 'POINT')
+        lengths = np.linalg.norm(normals, axis=1, keepdims=True)
+        np.divide(normals, lengths, out=normals, where=lengths > 0.0)
+    colors = get_color_array(dst_vcol)
+    colors[:, :3] = normals * 0.5 + 0.5
+    set_color_array(dst_vcol, colors)
 
-    mesh.update()
+    update_mesh(mesh)
 
 
 def color_to_normals(mesh, src_vcol):
     # ensure the mesh has empty split normals
     if not mesh.has_custom_normals:
-        mesh.create_normals_split()
-        mesh.use_auto_smooth = True
+        if hasattr(mesh, 'create_normals_split'):
+            mesh.create_normals_split()
+        if hasattr(mesh, 'use_auto_smooth'):
+            mesh.use_auto_smooth = True
+
+    # remap color to normal range and normalize (zero length normals are left as is)
+    normals = get_color_array(src_vcol)[:, :3] * 2.0 - 1.0
+    lengths = np.linalg.norm(normals, axis=1, keepdims=True)
+    np.divide(normals, lengths, out=normals, where=lengths > 0.0)
+
+    if get_layer_domain(src_vcol) == 'POINT':
+        mesh.normals_split_custom_set_from_vertices(normals)
+    else:
+        mesh.normals_split_custom_set(normals)
+    update_mesh(mesh)
 
-    # create a structure that matches the required input of the normals_split_custom_set function
-    clnors = [Vector()] * len(mesh.loops)
 
-    for loop_index, loop in enumerate(mesh.loops):
-        c = src_vcol.data[loop_index].color
-        # remap color to normal range
-        n = Vector([remap(channel, 0.0, 1.0, -1.0, 1.0) for channel in c[0:3]])
-        n.normalize()
-        clnors[loop_index] = n   
+# Weights written by color_to_weights are quantized to this many steps, so that all
+# vertices sharing a weight can be added to the group with a single call
+weight_quantize_steps = 4096
 
-    mesh.normals_split_custom_set(clnors)   
-    mesh.update()  
 
+def get_vertex_group_weights(mesh, vgroup_idx):
+    # RNA has no bulk access to vertex group weights, so this is one pass over the
+    # vertices. Vertices not in the group have a weight of 0
+    weights = np.zeros(len(mesh.vertices), dtype=np.float32)
+    with profile_phase('read'):
+        for i, vert in enumerate(mesh.vertices):
+            for group in vert.groups:
+                if group.group == vgroup_idx:
+                    weights[i] = group.weight
+                    break
+    return weights
 
-def weights_to_color(mesh, src_vgroup_idx, dst_vcol, dst_channel_idx, all_channels=False):
-    vertex_weights = [0.0] * len(mesh.vertices)
 
-    # build list of weights for vertex indices
-    for i, vert in enumerate(mesh.vertices):
-        for group in vert.groups:
-            if group.group == src_vgroup_idx:
-                vertex_weights[i] = group.weight
-                break
+def set_vertex_group_weights(group, weights):
+    # replace the weights of all vertices, adding each distinct weight in one call
+    steps = weight_quantize_steps
+    quantized = np.rint(np.clip(weights, 0.0, 1.0) * steps).astype(np.int32)
+    order = np.argsort(quantized, kind='stable')
+    levels, first = np.unique(quantized[order], return_index=True)
+    vertex_groups = np.split(order, first[1:])
+
+    with profile_phase('write'):
+        for level, indices in zip(levels.tolist(), vertex_groups):
+            group.add(indices.tolist(), level / steps, 'REPLACE')
+
+
+def get_vertex_average(mesh, values):
+    return average_per_vertex(get_loop_vertex_indices(mesh), values, len(mesh.vertices))
+
+
+def weights_to_color(mesh, src_vgroup_idx, dst_vcol, dst_channel_idx, all_channels=False):
+    vertex_weights = get_vertex_group_weights(mesh, src_vgroup_idx)
+    loop_weights = convert_domain(mesh, vertex_weights, 'POINT', get_layer_domain(dst_vcol))
 
     # copy weights to channel of dst color layer
+    colors = get_color_array(dst_vcol)
     if not all_channels:
-        for loop_index, loop in enumerate(mesh.loops):
-            weight = vertex_weights[loop.vertex_index]
-            dst_vcol.data[loop_index].color[dst_channel_idx] = weight
+        colors[:, dst_channel_idx] = loop_weights
     else:
-        for loop_index, loop in enumerate(mesh.loops):
-            weight = vertex_weights[loop.vertex_index]
-            dst_vcol.data[loop_index].color[:3] = [weight]*3
+        colors[:, :3] = loop_weights[:, np.newaxis]
+    set_color_array(dst_vcol, colors)
 
-    mesh.update()
+    update_mesh(mesh)
 
 
 def color_to_weights(obj, src_vcol, src_channel_idx, dst_vgroup_idx):
     mesh = obj.data
 
-    # build 2d array containing sum of color channel value, number of values
-    # used to calculate average for vertex when setting weights
-    vertex_values = [[0.0, 0] for i in range(0, len(mesh.vertices))]
-
-    for loop_index, loop in enumerate(mesh.loops):
-        vi = loop.vertex_index
-        vertex_values[vi][0] += src_vcol.data[loop_index].color[src_channel_idx]
-        vertex_values[vi][1] += 1
+    # average of the color channel values of each vertex's loops
+    colors = get_color_array(src_vcol)
+    vertex_weights = convert_domain(mesh, colors[:, src_channel_idx], get_layer_domain(src_vcol), 'POINT')
 
     # replace weights of the destination group
     group = obj.vertex_groups[dst_vgroup_idx]
-    mode = 'REPLACE'
+    set_vertex_group_weights(group, vertex_weights)
 
-    for i in range(0, len(mesh.vertices)):
-        cnt = vertex_values[i][1]
-        weight = 0.0 if cnt == 0.0 else vertex_values[i][0] / cnt
-        group.add([i], weight, mode)
+    update_mesh(mesh)
 
-    mesh.update()
 
+# Color layers are color attributes (Blender 3.2+) or legacy vertex color layers.
+# Attributes are stored per vertex ('POINT') or per face corner ('CORNER'), as
+# FLOAT_COLOR or BYTE_COLOR, and are always processed in their own domain and type.
+# Note that adding a layer can invalidate references to the other layers of a mesh.
+def get_color_layers(mesh):
+    return mesh.color_attributes if hasattr(mesh, 'color_attributes') else mesh.vertex_colors
 
-# no channel checking. Designed to more efficiently apply a color to mesh
-def quick_fill_selected(mesh, vcol, color):
-    vcol_data = vcol.data
+
+def get_active_color_layer(mesh):
+    if hasattr(mesh, 'color_attributes'):
+        return mesh.color_attributes.active_color
+    return mesh.vertex_colors.active
+
+
+def set_active_color_layer(mesh, vcol):
+    if hasattr(mesh, 'color_attributes'):
+        mesh.color_attributes.active_color = vcol
+    else:
+        mesh.vertex_colors.active = vcol
+
+
+def new_color_layer(mesh, name='Col', data_type='BYTE_COLOR', domain='CORNER'):
+    # legacy vertex color layers are always byte colors per corner
+    if hasattr(mesh, 'color_attributes'):
+        return mesh.color_attributes.new(name, data_type, domain)
+    return mesh.vertex_colors.new(name=name)
+
+
+def remove_color_layer(mesh, vcol):
+    get_color_layers(mesh).remove(vcol)
+
+
+def get_or_create_active_color_layer(mesh):
+    vcol = get_active_color_layer(mesh)
+    if vcol is None:
+        vcol = new_color_layer(mesh)
+        set_active_color_layer(mesh, vcol)
+    return vcol
+
+
+def get_layer_domain(vcol):
+    return getattr(vcol, 'domain', 'CORNER')
+
+
+def get_layer_data_type(vcol):
+    return getattr(vcol, 'data_type', 'BYTE_COLOR')
+
+
+def get_color_property(vcol):
+    # byte colors are read as stored (sRGB), the same as the legacy api, so values
+    # don't change when they are read and written back
+    if getattr(vcol, 'data_type', None) == 'BYTE_COLOR' and bpy.app.version >= (3, 4, 0):
+        return 'color_srgb'
+    return 'color'
+
+
+def get_color_space(vcol):
+    # the space get_color_array reads a layer in: sRGB for byte colors read through
+    # color_srgb and legacy vertex colors, linear otherwise
+    if get_color_property(vcol) == 'color_srgb' or not hasattr(vcol, 'data_type'):
+        return 'SRGB'
+    return 'LINEAR'
+
+
+def convert_color_space(colors, src_vcol, dst_vcol):
+    # colors of src_vcol with RGB converted to the space dst_vcol is read in, so values
+    # moved between byte and float layers keep their color. Alpha is always linear.
+    # Returns colors itself when both layers use the same space
+    src_space = get_color_space(src_vcol)
+    if src_space == get_color_space(dst_vcol):
+        return colors
+    converted = colors.copy()
+    transfer = srgb_to_linear if src_space == 'SRGB' else linear_to_srgb
+    converted[:, :3] = transfer(colors[:, :3])
+    return converted
+
+
+def convert_domain(mesh, values, src_domain, dst_domain):
+    # move per element values, (N,) or (N, channels), between the POINT and CORNER
+    # domains. Corner values are averaged per vertex when moving to points
+    if src_domain == dst_domain:
+        return values
+    if src_domain == 'POINT':
+        return values[get_loop_vertex_indices(mesh)]
+    return get_vertex_average(mesh, values)
+
+
+# Profiling. While a profile is active, the time spent building selection masks,
+# reading layers, writing them back and updating meshes is recorded per phase, and
+# the rest is counted as compute. Phases inside another phase count towards the
+# outer one. Finished records are kept in a rolling log for the session.
+profile_log_size = 50
+profile_log = deque(maxlen=profile_log_size)
+profile_phases = ('selection', 'read', 'compute', 'write', 'update')
+# the record being filled and the meshes it touched (pointer : (loops, vertices))
+profile_state = {'record': None, 'meshes': {}, 'depth': 0}
+
+
+@contextmanager
+def profile_phase(name):
+    record = profile_state['record']
+    if record is None or profile_state['depth'] > 0:
+        yield
+        return
+
+    profile_state['depth'] += 1
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record['phases'][name] += time.perf_counter() - start
+        profile_state['depth'] -= 1
+
+
+@contextmanager
+def profile_operation(name):
+    # record everything done in the block as one entry of profile_log
+    # nested operations are counted as part of the outer one
+    if profile_state['record'] is not None:
+        yield profile_state['record']
+        return
+
+    record = {
+        'operation': name,
+        'file': bpy.data.filepath,
+        'timestamp': time.time(),
+        'seconds': 0.0,
+        'phases': dict.fromkeys(profile_phases, 0.0),
+        'meshes': 0,
+        'loops': 0,
+        'vertices': 0,
+        'loops_per_second': 0.0,
+        'peak_bytes': None,
+    }
+    # peak memory is only known when no one else is tracing. It covers Python and
+    # NumPy allocations, not those made inside Blender
+    trace_memory = not tracemalloc.is_tracing()
+    if trace_memory:
+        tracemalloc.start()
+    profile_state.update(record=record, meshes={}, depth=0)
+    start = time.perf_counter()
+    try:
+        yield record
+    finally:
+        record['seconds'] = time.perf_counter() - start
+        if trace_memory:
+            record['peak_bytes'] = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+        meshes = profile_state['meshes']
+        record['meshes'] = len(meshes)
+        record['loops'] = sum(loops for loops, vertices in meshes.values())
+        record['vertices'] = sum(vertices for loops, vertices in meshes.values())
+        if record['seconds'] > 0.0:
+            record['loops_per_second'] = record['loops'] / record['seconds']
+        phases = record['phases']
+        phases['compute'] = max(record['seconds'] - sum(phases.values()), 0.0)
+
+        profile_state.update(record=None, meshes={}, depth=0)
+        profile_log.append(record)
+
+
+def write_profile_record(path, record):
+    # append a record to a JSON lines file
+    with open(bpy.path.abspath(path), 'a', encoding='utf-8') as f:
+        f.write(json.dumps(record) + '\n')
+
+
+def update_mesh(mesh):
+    if profile_state['record'] is not None:
+        profile_state['meshes'][mesh.as_pointer()] = (len(mesh.loops), len(mesh.vertices))
+    with profile_phase('update'):
+        mesh.update()
+
+
+# Array helpers for the NumPy backend. Color layers are read and written in a
+# single foreach_get / foreach_set call, as an (N, 4) float32 array, where N is
+# the size of the layer's domain.
+def get_color_array(vcol):
+    with profile_phase('read'):
+        colors = np.empty(len(vcol.data) * 4, dtype=np.float32)
+        vcol.data.foreach_get(get_color_property(vcol), colors)
+    return colors.reshape(-1, 4)
+
+
+def set_color_array(vcol, colors):
+    with profile_phase('write'):
+        vcol.data.foreach_set(get_color_property(vcol), colors.ravel())
+
+
+def get_domain_color_array(mesh, vcol, domain):
+    # color array of a layer, converted to the given domain
+    return convert_domain(mesh, get_color_array(vcol), get_layer_domain(vcol), domain)
+
+
+def get_face_loop_indices(mesh):
+    # returns the loop indices of all faces (in face order) and the face index of each
+    face_count = len(mesh.polygons)
+    loop_starts = np.empty(face_count, dtype=np.int32)
+    loop_totals = np.empty(face_count, dtype=np.int32)
+    with profile_phase('read'):
+        mesh.polygons.foreach_get('loop_start', loop_starts)
+        mesh.polygons.foreach_get('loop_total', loop_totals)
+
+    face_offsets = np.cumsum(loop_totals) - loop_totals
+    loop_indices = np.repeat(loop_starts - face_offsets, loop_totals) + np.arange(loop_totals.sum())
+    loop_faces = np.repeat(np.arange(face_count), loop_totals)
+    return loop_indices, loop_faces
+
+
+def get_loop_vertex_indices(mesh):
+    loop_verts = np.empty(len(mesh.loops), dtype=np.int32)
+    with profile_phase('read'):
+        mesh.loops.foreach_get('vertex_index', loop_verts)
+    return loop_verts
+
+
+# Selection masks are cached per mesh and only rebuilt when the selection
+# fingerprint (mask mode, element counts and a hash of the select flags) changes.
+# Loops can be remapped to other vertices without changing the counts (flipped
+# normals, rotated edges), which happens in edit mode or by undo, so the add-on's
+# handlers clear the cache then, instead of each lookup hashing the loops.
+# mesh pointer : (fingerprint, loop mask)
+selection_mask_cache = {}
+# context mode of the last depsgraph update
+selection_mask_state = {'mode': None}
+
+
+def clear_selection_mask_cache():
+    selection_mask_cache.clear()
+
+
+def update_selection_mask_cache(mode):
+    # called after each depsgraph update with the context mode. Masks may no longer
+    # match the loops after edits in edit mode, or when leaving it
+    if mode == 'EDIT_MESH' or selection_mask_state['mode'] == 'EDIT_MESH':
+        clear_selection_mask_cache()
+    selection_mask_state['mode'] = mode
+
+
+def clear_mesh_caches():
+    clear_selection_mask_cache()
+    clear_topology_cache()
+    clear_isolated_channel_snapshots()
+    clear_occlusion_tree_cache()
+    clear_distance_field_cache()
+
+
+def get_selection_state(mesh):
+    # returns the fingerprint of the current paint mask selection and the select flags
+    # it was derived from (face flags in face mask mode, vertex flags in vertex mask mode)
     if mesh.use_paint_mask:
-        selected_faces = [face for face in mesh.polygons if face.select]
-        for face in selected_faces:
-            for loop_index in face.loop_indices:
-                c = vcol_data[loop_index].color
-                c[0] = color[0]
-                c[1] = color[1]
-                c[2] = color[2]
-                vcol_data[loop_index].color = c
+        mode = 'FACE'
+        select = np.empty(len(mesh.polygons), dtype=bool)
+        mesh.polygons.foreach_get('select', select)
     elif mesh.use_paint_mask_vertex:
-        verts = mesh.vertices
-        for loop_index, loop in enumerate(mesh.loops):
-            if verts[loop.vertex_index].select:
-                c = vcol_data[loop_index].color
-                c[0] = color[0]
-                c[1] = color[1]
-                c[2] = color[2]
-                vcol_data[loop_index].color = c
-    else: # mask == 'NONE'
-        for loop_index, loop in enumerate(mesh.loops):
-            c = vcol_data[loop_index].color
+        mode = 'VERT'
+        select = np.empty(len(mesh.vertices), dtype=bool)
+        mesh.vertices.foreach_get('select', select)
+    else:
+        return None, None
+
+    fingerprint = (mode, len(mesh.vertices), len(mesh.edges), len(mesh.polygons), len(mesh.loops),
+                   hash(np.packbits(select).tobytes()))
+    return fingerprint, select
+
+
+def get_loop_selection_mask(mesh):
+    # boolean per loop mask of the loops affected by the face/vertex paint mask
+    # returns None when no paint mask is used (all loops are affected)
+    # the returned mask is shared with the cache, so it is read only
+    with profile_phase('selection'):
+        fingerprint, select = get_selection_state(mesh)
+        if fingerprint is None:
+            return None
+
+        key = mesh.as_pointer()
+        cached = selection_mask_cache.get(key)
+        if cached is not None and cached[0] == fingerprint:
+            return cached[1]
+
+        if fingerprint[0] == 'FACE':
+            loop_indices, loop_faces = get_face_loop_indices(mesh)
+            mask = np.zeros(len(mesh.loops), dtype=bool)
+            mask[loop_indices] = select[loop_faces]
+        else:
+            mask = select[get_loop_vertex_indices(mesh)]
+        mask.flags.writeable = False
+
+    selection_mask_cache[key] = (fingerprint, mask)
+    return mask
+
+
+def get_selection_mask(mesh, domain='CORNER'):
+    # selection mask in the domain of a color layer, or None when no paint mask is used
+    # in the point domain, these are the vertices of the selected loops
+    with profile_phase('selection'):
+        loop_mask = get_loop_selection_mask(mesh)
+        if loop_mask is None or domain == 'CORNER':
+            return loop_mask
+        vertex_mask = np.zeros(len(mesh.vertices), dtype=bool)
+        vertex_mask[get_loop_vertex_indices(mesh)[loop_mask]] = True
+    return vertex_mask
+
+
+def get_selected_loop_indices(mesh, domain='CORNER'):
+    mask = get_selection_mask(mesh, domain)
+    element_count = len(mesh.loops) if domain == 'CORNER' else len(mesh.vertices)
+    return range(element_count) if mask is None else np.flatnonzero(mask).tolist()
+
+
+def get_fill_op(color, active_channels):
+    # color may be RGB only, in which case alpha is not active anyway
+    fill_color = np.zeros(4, dtype=np.float32)
+    fill_color[:len(color[:4])] = color[:4]
+    rgba_mask = get_active_channel_mask(active_channels)
+    fill_values = fill_color[np.flatnonzero(rgba_mask)]
+    return lambda values: np.broadcast_to(fill_values, values.shape)
+
+
+def modify_selected(mesh, vcol, op, active_channels):
+    modify_selected_batch([(mesh, vcol)], op, active_channels)
+
+
+def modify_selected_batch(targets, op, active_channels):
+    # targets is a list of (mesh, vcol) pairs
+    rgba_mask = get_active_channel_mask(active_channels)
+
+    def read(target):
+        mesh, vcol = target
+        return get_color_array(vcol), get_selection_mask(mesh, get_layer_domain(vcol))
+
+    def compute(data):
+        colors, loop_mask = data
+        return apply_channel_op(colors, op, rgba_mask, loop_mask)
+
+    def write(target, colors):
+        mesh, vcol = target
+        set_color_array(vcol, colors)
+        update_mesh(mesh)
+
+    run_batched(targets, read, compute, write)
+
+
+# Pipelines apply a list of channel ops with a single read and write of the layer.
+# Each step is a dict with the op type, the channels it affects and its parameters:
+# {'op': 'POSTERIZE', 'channels': {'A'}, 'steps': 4}
+def get_pipeline_step_op(step):
+    op_type = step['op']
+    if op_type == 'FILL':
+        return get_fill_op([step.get('value', 1.0)] * 4, step['channels'])
+    if op_type == 'INVERT':
+        return invert_array
+    if op_type == 'POSTERIZE':
+        # as in the posterize operator, n steps gives n tones
+        return partial(posterize_array, steps=max(step.get('steps', 2) - 1, 1))
+    if op_type == 'REMAP':
+        return partial(remap_array, min0=step.get('min0', 0.0), max0=step.get('max0', 1.0),
+                       min1=step.get('min1', 0.0), max1=step.get('max1', 1.0))
+    raise ValueError("Unknown pipeline op '{0}'".format(op_type))
+
+
+def run_pipeline(mesh, vcol, steps):
+    run_pipeline_batch([(mesh, vcol)], steps)
+
+
+def run_pipeline_batch(targets, steps):
+    # targets is a list of (mesh, vcol) pairs
+    ops = [(get_pipeline_step_op(step), get_active_channel_mask(step['channels'])) for step in steps]
+    if not ops:
+        return
+
+    def read(target):
+        mesh, vcol = target
+        return get_color_array(vcol), get_selection_mask(mesh, get_layer_domain(vcol))
+
+    def compute(data):
+        # gather the selected loops once, run every step on them and scatter them back
+        colors, loop_mask = data
+        loop_indices = None if loop_mask is None else np.flatnonzero(loop_mask)
+        selected = colors if loop_indices is None else colors[loop_indices]
+        for op, rgba_mask in ops:
+            apply_channel_op(selected, op, rgba_mask)
+        if loop_indices is not None:
+            colors[loop_indices] = selected
+        return colors
+
+    def write(target, colors):
+        mesh, vcol = target
+        set_color_array(vcol, colors)
+        update_mesh(mesh)
+
+    run_batched(targets, read, compute, write)
+
+
+# no channel checking. Designed to more efficiently apply a color to mesh
+def quick_fill_selected(mesh, vcol, color):
+    fill_values = np.array(color[:3], dtype=np.float32)
+    colors = get_color_array(vcol)
+    apply_channel_op(colors, lambda values: np.broadcast_to(fill_values, values.shape),
+                     [True, True, True, False], get_selection_mask(mesh, get_layer_domain(vcol)))
+    set_color_array(vcol, colors)
+
+
+# backend
+# 'NUMPY' - read the layer into an array and process all loops at once
+# 'PYTHON' - process one loop at a time (original implementation)
+def fill_selected(mesh, vcol, color, active_channels, backend='NUMPY'):
+    if backend == 'PYTHON':
+        return fill_selected_python(mesh, vcol, color, active_channels)
+
+    modify_selected(mesh, vcol, get_fill_op(color, active_channels), active_channels)
+
+
+def invert_selected(mesh, vcol, active_channels, backend='NUMPY'):
+    if backend == 'PYTHON':
+        return invert_selected_python(mesh, vcol, active_channels)
+
+    modify_selected(mesh, vcol, invert_array, active_channels)
+
+
+def posterize_selected(mesh, vcol, steps, active_channels, backend='NUMPY'):
+    if backend == 'PYTHON':
+        return posterize_selected_python(mesh, vcol, steps, active_channels)
+
+    modify_selected(mesh, vcol, partial(posterize_array, steps=steps), active_channels)
+
+
+def remap_selected(mesh, vcol, min0, max0, min1, max1, active_channels, backend='NUMPY'):
+    if backend == 'PYTHON':
+        return remap_selected_python(mesh, vcol, min0, max0, min1, max1, active_channels)
+
+    modify_selected(mesh, vcol, partial(remap_array, min0=min0, max0=max0, min1=min1, max1=max1),
+                    active_channels)
+
+
+def fill_selected_python(mesh, vcol, color, active_channels):
+    prop = get_color_property(vcol)
+    for loop_index in get_selected_loop_indices(mesh, get_layer_domain(vcol)):
+        c = getattr(vcol.data[loop_index], prop)
+        if red_id in active_channels:
             c[0] = color[0]
+        if green_id in active_channels:
             c[1] = color[1]
+        if blue_id in active_channels:
             c[2] = color[2]
-            vcol_data[loop_index].color = c
+        if alpha_id in active_channels:
+            c[3] = color[3]
+        setattr(vcol.data[loop_index], prop, c)
+
+    update_mesh(mesh)
+
+
+def invert_selected_python(mesh, vcol, active_channels):
+    prop = get_color_property(vcol)
+    for loop_index in get_selected_loop_indices(mesh, get_layer_domain(vcol)):
+        c = getattr(vcol.data[loop_index], prop)
+        if red_id in active_channels:
+            c[0] = 1 - c[0]
+        if green_id in active_channels:
+            c[1] = 1 - c[1]
+        if blue_id in active_channels:
+            c[2] = 1 - c[2]
+        if alpha_id in active_channels:
+            c[3] = 1 - c[3]
+        setattr(vcol.data[loop_index], prop, c)
+
+    update_mesh(mesh)
+
+
+def posterize_selected_python(mesh, vcol, steps, active_channels):
+    prop = get_color_property(vcol)
+    for loop_index in get_selected_loop_indices(mesh, get_layer_domain(vcol)):
+        c = getattr(vcol.data[loop_index], prop)
+        if red_id in active_channels:
+            c[0] = posterize(c[0], steps)
+        if green_id in active_channels:
+            c[1] = posterize(c[1], steps)
+        if blue_id in active_channels:
+            c[2] = posterize(c[2], steps)
+        if alpha_id in active_channels:
+            c[3] = posterize(c[3], steps)
+        setattr(vcol.data[loop_index], prop, c)
+
+    update_mesh(mesh)
+
+
+def remap_selected_python(mesh, vcol, min0, max0, min1, max1, active_channels):
+    prop = get_color_property(vcol)
+    for loop_index in get_selected_loop_indices(mesh, get_layer_domain(vcol)):
+        c = getattr(vcol.data[loop_index], prop)
+        if red_id in active_channels:
+            c[0] = remap(c[0], min0, max0, min1, max1)
+        if green_id in active_channels:
+            c[1] = remap(c[1], min0, max0, min1, max1)
+        if blue_id in active_channels:
+            c[2] = remap(c[2], min0, max0, min1, max1)
+        if alpha_id in active_channels:
+            c[3] = remap(c[3], min0, max0, min1, max1)
+        setattr(vcol.data[loop_index], prop, c)
+
+    update_mesh(mesh)
+
+
+def adjust_hsv(mesh, vcol, h_offset, s_offset, v_offset, colorize, backend='NUMPY'):
+    if backend == 'PYTHON':
+        return adjust_hsv_python(mesh, vcol, h_offset, s_offset, v_offset, colorize)
+
+    # RGB are converted together, alpha is left untouched
+    modify_selected(mesh, vcol, get_adjust_hsv_op(h_offset, s_offset, v_offset, colorize), ['R', 'G', 'B'])
+
+
+def get_adjust_hsv_op(h_offset, s_offset, v_offset, colorize):
+    return partial(adjust_hsv_array, h_offset=h_offset, s_offset=s_offset, v_offset=v_offset,
+                   colorize=colorize)
+
+
+def adjust_hsv_python(mesh, vcol, h_offset, s_offset, v_offset, colorize):
+    prop = get_color_property(vcol)
+    for loop_index in get_selected_loop_indices(mesh, get_layer_domain(vcol)):
+        c = Color(getattr(vcol.data[loop_index], prop)[:3])
+        if colorize:
+            c.h = fmod(0.5 + h_offset, 1.0)
+        else:
+            c.h = fmod(1.0 + c.h + h_offset, 1.0)
+        c.s = max(0.0, min(c.s + s_offset, 1.0))
+        c.v = max(0.0, min(c.v + v_offset, 1.0))
 
+        new_color = getattr(vcol.data[loop_index], prop)
+        new_color[:3] = c
+        setattr(vcol.data[loop_index], prop, new_color)
 
-def fill_selected(mesh, vcol, color, active_channels):
-    if mesh.use_paint_mask:
-        selected_faces = [face for face in mesh.polygons if face.select]
-        for face in selected_faces:
-            for loop_index in face.loop_indices:
-                c = vcol.data[loop_index].color
-                if red_id in active_channels:
-                    c[0] = color[0]
-                if green_id in active_channels:
-                    c[1] = color[1]
-                if blue_id in active_channels:
-                    c[2] = color[2]
-                if alpha_id in active_channels:
-                    c[3] = color[3]
-                vcol.data[loop_index].color = c
+    update_mesh(mesh)
+
+
+def get_face_selection_mask(mesh):
+    # faces affected by the face/vertex paint mask, or None when no mask is used
+    if not (mesh.use_paint_mask or mesh.use_paint_mask_vertex):
+        return None
+    face_select = np.empty(len(mesh.polygons), dtype=bool)
+    with profile_phase('selection'):
+        mesh.polygons.foreach_get('select', face_select)
+    return face_select
+
+
+# Data derived from the mesh topology (islands, adjacency) is cached per mesh and only
+# recalculated when the topology fingerprint (element counts and a hash of the loop
+# vertex indices) changes. Cached arrays are shared, so they are read only.
+# mesh pointer : (fingerprint, {data name : data})
+topology_cache = {}
+
+
+def clear_topology_cache():
+    topology_cache.clear()
+
+
+def get_topology_fingerprint(mesh, loop_verts=None):
+    if loop_verts is None:
+        loop_verts = get_loop_vertex_indices(mesh)
+    return (len(mesh.vertices), len(mesh.edges), len(mesh.polygons), len(mesh.loops),
+            hash(loop_verts.tobytes()))
+
+
+def get_cached_topology_data(mesh, name, build, loop_verts=None):
+    # returns build(), calling it only if name is not cached for the current topology
+    fingerprint = get_topology_fingerprint(mesh, loop_verts)
+
+    key = mesh.as_pointer()
+    cached = topology_cache.get(key)
+    if cached is None or cached[0] != fingerprint:
+        cached = (fingerprint, {})
+        topology_cache[key] = cached
+
+    data = cached[1]
+    if name not in data:
+        data[name] = build()
+    return data[name]
+
+
+def get_mesh_islands(mesh):
+    # label groups of faces connected by shared vertices, without using edit mode
+    # returns the island index of each face, numbered in face order, the island count
+    # and the face index of each loop
+    loop_verts = get_loop_vertex_indices(mesh)
+
+    def build():
+        loop_indices, loop_faces = get_face_loop_indices(mesh)
+        face_islands, island_count = label_face_islands(len(mesh.vertices), loop_verts[loop_indices],
+                                                        loop_faces, len(mesh.polygons))
+
+        loop_face = np.empty(len(mesh.loops), dtype=np.int32)
+        loop_face[loop_indices] = loop_faces
+
+        for array in (face_islands, loop_face):
+            array.flags.writeable = False
+        return face_islands, island_count, loop_face
+
+    return get_cached_topology_data(mesh, 'islands', build, loop_verts)
+
+
+def get_vertex_adjacency(mesh):
+    # CSR adjacency of the vertices connected by edges
+    # returns indptr and indices, such that the neighbours of vertex i are
+    # indices[indptr[i]:indptr[i + 1]]
+    def build():
+        edge_verts = np.empty(len(mesh.edges) * 2, dtype=np.int32)
+        mesh.edges.foreach_get('vertices', edge_verts)
+        indptr, indices = build_vertex_adjacency(len(mesh.vertices), edge_verts.reshape(-1, 2))
+
+        for array in (indptr, indices):
+            array.flags.writeable = False
+        return indptr, indices
+
+    return get_cached_topology_data(mesh, 'adjacency', build)
+
+
+def blur_channels(mesh, vcol, rgba_mask, factor=0.5, iterations=1, expand=0.0, keep_seams=False):
+    # blur the active channels over the mesh in one pass, respecting the selection mask
+    # loop values are averaged per vertex and smoothed over the edge adjacency. With
+    # keep_seams, each loop keeps its offset from the vertex average, so color
+    # differences between faces sharing a vertex are not blended away
+    channels = np.flatnonzero(rgba_mask)
+    if len(channels) == 0:
+        return
+
+    domain = get_layer_domain(vcol)
+    colors = get_color_array(vcol)
+    element_mask = get_selection_mask(mesh, domain)
+    element_values = colors[:, channels].astype(np.float64)
+
+    if domain == 'POINT':
+        # point colors are already per vertex, so there are no seams to keep
+        vertex_values = element_values
+        vertex_mask = element_mask
     else:
-        vertex_mask = True if mesh.use_paint_mask_vertex else False
-        verts = mesh.vertices
-
-        for loop_index, loop in enumerate(mesh.loops):
-            if not vertex_mask or verts[loop.vertex_index].select:
-                c = vcol.data[loop_index].color
-                if red_id in active_channels:
-                    c[0] = color[0]
-                if green_id in active_channels:
-                    c[1] = color[1]
-                if blue_id in active_channels:
-                    c[2] = color[2]
-                if alpha_id in active_channels:
-                    c[3] = color[3]
-                vcol.data[loop_index].color = c
-
-    mesh.update()
-
-
-def invert_selected(mesh, vcol, active_channels):
-    if mesh.use_paint_mask:
-        selected_faces = [face for face in mesh.polygons if face.select]
-        for face in selected_faces:
-            for loop_index in face.loop_indices:
-                c = vcol.data[loop_index].color
-                if red_id in active_channels:
-                    c[0] = 1 - c[0]
-                if green_id in active_channels:
-                    c[1] = 1 - c[1]
-                if blue_id in active_channels:
-                    c[2] = 1 - c[2]
-                if alpha_id in active_channels:
-                    c[3] = 1 - c[3]
-                vcol.data[loop_index].color = c
+        loop_verts = get_loop_vertex_indices(mesh)
+        vertex_values = get_vertex_average(mesh, element_values)
+        vertex_mask = None
+        if element_mask is not None:
+            vertex_mask = np.zeros(len(mesh.vertices), dtype=bool)
+            vertex_mask[loop_verts[element_mask]] = True
+
+    smoothed = smooth_vertex_values(get_vertex_adjacency(mesh), vertex_values,
+                                    factor, iterations, expand, vertex_mask)
+
+    if domain == 'POINT':
+        result = smoothed
+    elif keep_seams:
+        result = np.clip(element_values + (smoothed - vertex_values)[loop_verts], 0.0, 1.0)
     else:
-        vertex_mask = True if mesh.use_paint_mask_vertex else False
-        verts = mesh.vertices
-
-        for loop_index, loop in enumerate(mesh.loops):
-            if not vertex_mask or verts[loop.vertex_index].select:
-                c = vcol.data[loop_index].color
-                if red_id in active_channels:
-                    c[0] = 1 - c[0]
-                if green_id in active_channels:
-                    c[1] = 1 - c[1]
-                if blue_id in active_channels:
-                    c[2] = 1 - c[2]
-                if alpha_id in active_channels:
-                    c[3] = 1 - c[3]
-                vcol.data[loop_index].color = c
-
-    mesh.update()
-
-
-def posterize_selected(mesh, vcol, steps, active_channels):
-    if mesh.use_paint_mask:
-        selected_faces = [face for face in mesh.polygons if face.select]
-        for face in selected_faces:
-            for loop_index in face.loop_indices:
-                c = vcol.data[loop_index].color
-                if red_id in active_channels:
-                    c[0] = posterize(c[0], steps)
-                if green_id in active_channels:
-                    c[1] = posterize(c[1], steps)
-                if blue_id in active_channels:
-                    c[2] = posterize(c[2], steps)
-                if alpha_id in active_channels:
-                    c[3] = posterize(c[3], steps)
-                vcol.data[loop_index].color = c
+        result = smoothed[loop_verts]
+
+    if element_mask is None:
+        colors[:, channels] = result
     else:
-        vertex_mask = True if mesh.use_paint_mask_vertex else False
-        verts = mesh.vertices
-
-        for loop_index, loop in enumerate(mesh.loops):
-            if not vertex_mask or verts[loop.vertex_index].select:
-                c = vcol.data[loop_index].color
-                if red_id in active_channels:
-                    c[0] = posterize(c[0], steps)
-                if green_id in active_channels:
-                    c[1] = posterize(c[1], steps)
-                if blue_id in active_channels:
-                    c[2] = posterize(c[2], steps)
-                if alpha_id in active_channels:
-                    c[3] = posterize(c[3], steps)
-                vcol.data[loop_index].color = c
-
-    mesh.update()
-
-
-def remap_selected(mesh, vcol, min0, max0, min1, max1, active_channels):
-    if mesh.use_paint_mask:
-        selected_faces = [face for face in mesh.polygons if face.select]
-        for face in selected_faces:
-            for loop_index in face.loop_indices:
-                c = vcol.data[loop_index].color
-                if red_id in active_channels:
-                    c[0] = remap(c[0], min0, max0, min1, max1)
-                if green_id in active_channels:
-                    c[1] = remap(c[1], min0, max0, min1, max1)
-                if blue_id in active_channels:
-                    c[2] = remap(c[2], min0, max0, min1, max1)
-                if alpha_id in active_channels:
-                    c[3] = remap(c[3], min0, max0, min1, max1)
-                vcol.data[loop_index].color = c
+        element_indices = np.flatnonzero(element_mask)
+        colors[np.ix_(element_indices, channels)] = result[element_indices]
+    set_color_array(vcol, colors)
+    update_mesh(mesh)
+
+
+def get_selected_islands(mesh):
+    # islands of the faces affected by the paint mask, numbered in face order
+    # returns the affected loop indices, the island of each of those loops and
+    # the number of affected faces in each island
+    face_islands, island_count, loop_face = get_mesh_islands(mesh)
+
+    face_mask = get_face_selection_mask(mesh)
+    if face_mask is None:
+        loop_indices = np.arange(len(mesh.loops))
+        return loop_indices, face_islands[loop_face], np.bincount(face_islands, minlength=island_count)
+
+    # renumber so only islands with selected faces are counted
+    selected_islands, selected_count = number_by_first_occurrence(face_islands[face_mask])
+    island_map = np.full(island_count, -1, dtype=np.int32)
+    island_map[face_islands[face_mask]] = selected_islands
+
+    loop_indices = np.flatnonzero(face_mask[loop_face])
+    loop_islands = island_map[face_islands[loop_face[loop_indices]]]
+    return loop_indices, loop_islands, np.bincount(selected_islands, minlength=selected_count)
+
+
+def set_island_colors(mesh, vcol, loop_indices, loop_islands, island_colors, rgba_mask):
+    # scatter an (islands, 4) color table to the active channels of the given loops
+    # (or their vertices, which always belong to the same island, in the point domain)
+    channels = np.flatnonzero(rgba_mask)
+    colors = get_color_array(vcol)
+    island_colors = np.asarray(island_colors, dtype=np.float32).reshape(-1, 4)
+    if get_layer_domain(vcol) == 'POINT':
+        loop_indices = get_loop_vertex_indices(mesh)[loop_indices]
+    colors[np.ix_(loop_indices, channels)] = island_colors[np.ix_(loop_islands, channels)]
+    set_color_array(vcol, colors)
+    update_mesh(mesh)
+
+
+# check isolate mode (shouldn't work in isolate mode...)
+# set random seed in parent function
+def set_island_colors_per_channel(mesh, vcol, rgba_mask, merge_similar, vmin, vmax):
+    loop_indices, loop_islands, face_counts = get_selected_islands(mesh)
+
+    island_colors = [] # rgba values per island
+    colors_by_face_count = {} # Island face count : Random color pairs
+    vrange = abs(vmax - vmin)
+
+    for face_count in face_counts.tolist():
+        if merge_similar and face_count in colors_by_face_count:
+            rgba_values = colors_by_face_count[face_count]
+        else:
+            rgba_values = [(vmin + random.random() * vrange) for i in range(4)]
+            colors_by_face_count[face_count] = rgba_values
+        island_colors.append(rgba_values)
+
+    set_island_colors(mesh, vcol, loop_indices, loop_islands, island_colors, rgba_mask)
+
+
+def get_vertex_positions(mesh):
+    coords = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+    with profile_phase('read'):
+        mesh.vertices.foreach_get('co', coords)
+    return coords.reshape(-1, 3)
+
+
+def get_gradient_targets(mesh, matrix, region_width, region_height, domain='CORNER'):
+    # project the vertices whose loops are painted by a gradient (visible and not masked)
+    # returns the 2d points of those vertices, the painted loop indices and the
+    # index into points of each painted loop. In the point domain, the painted
+    # elements are the vertices themselves
+    points, visible = project_to_region(get_vertex_positions(mesh), matrix, region_width, region_height)
+
+    if domain == 'POINT':
+        vertex_mask = visible
+        selection_mask = get_selection_mask(mesh, domain)
+        if selection_mask is not None:
+            vertex_mask &= selection_mask
+        verts = np.flatnonzero(vertex_mask)
+        return points[verts], verts, np.arange(len(verts))
+
+    loop_verts = get_loop_vertex_indices(mesh)
+    loop_mask = visible[loop_verts]
+    selection_mask = get_loop_selection_mask(mesh)
+    if selection_mask is not None:
+        loop_mask &= selection_mask
+    loop_indices = np.flatnonzero(loop_mask)
+
+    verts, loop_points = np.unique(loop_verts[loop_indices], return_inverse=True)
+    return points[verts], loop_indices, loop_points.ravel()
+
+
+def get_vertex_normals(mesh):
+    normals = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+    with profile_phase('read'):
+        mesh.vertices.foreach_get('normal', normals)
+    return normals.reshape(-1, 3)
+
+
+# BVH trees for occlusion rays are cached by mesh name and only rebuilt when the
+# topology or vertex positions change, so re-running a bake from the redo panel
+# doesn't rebuild the tree. Names are used as undo can reallocate the mesh.
+# mesh name : (fingerprint, tree)
+occlusion_tree_cache = {}
+# rays cast per chunk, to limit the memory used for ray origins and directions
+occlusion_chunk_size = 1 << 18
+
+
+def clear_occlusion_tree_cache():
+    occlusion_tree_cache.clear()
+
+
+def get_occlusion_tree(mesh, coords):
+    fingerprint = (get_topology_fingerprint(mesh), hash(coords.tobytes()))
+    cached = occlusion_tree_cache.get(mesh.name_full)
+    if cached is not None and cached[0] == fingerprint:
+        return cached[1]
+
+    mesh.calc_loop_triangles()
+    triangles = np.empty(len(mesh.loop_triangles) * 3, dtype=np.int32)
+    mesh.loop_triangles.foreach_get('vertices', triangles)
+    tree = BVHTree.FromPolygons(coords.tolist(), triangles.reshape(-1, 3).tolist(), all_triangles=True)
+
+    occlusion_tree_cache[mesh.name_full] = (fingerprint, tree)
+    return tree
+
+
+def get_ambient_occlusion(tree, origins, normals, samples=8, distance=1.0, bias=0.001, seed=0):
+    # fraction of cosine weighted rays from each origin, in the hemisphere around its
+    # normal, that travel distance without hitting the mesh (1 is unoccluded)
+    # elements without a normal are unoccluded. ray_cast holds the GIL, so rays are
+    # cast in a single loop per chunk, with everything else done in numpy. Rays are
+    # passed as tuples zipped from flat lists, as tolist of an (n, 3) array is slow,
+    # and each origin is only converted once and repeated for its samples
+    rng = np.random.default_rng(seed)
+    directions = get_hemisphere_samples(samples, rng)
+    lengths = np.linalg.norm(normals, axis=1)
+    elements = np.flatnonzero(lengths > 0.0)
+    unit_normals = normals[elements] / lengths[elements, np.newaxis]
+    angles = rng.random(len(elements)) * 2.0 * np.pi
+
+    occlusion = np.ones(len(origins))
+    ray_cast = tree.ray_cast
+    chunk_size = max(1, occlusion_chunk_size // samples)
+    for start in range(0, len(elements), chunk_size):
+        end = start + chunk_size
+        chunk_normals = unit_normals[start:end]
+        ray_origins = iter((origins[elements[start:end]] + chunk_normals * bias).ravel().tolist())
+        ray_origins = chain.from_iterable(map(repeat, zip(ray_origins, ray_origins, ray_origins), repeat(samples)))
+        ray_directions = iter(orient_samples(directions, chunk_normals, angles[start:end]).ravel().tolist())
+        ray_directions = zip(ray_directions, ray_directions, ray_directions)
+        hits = np.fromiter((hit[0] is not None for hit in map(ray_cast, ray_origins, ray_directions, repeat(distance))),
+                           dtype=bool, count=len(chunk_normals) * samples)
+        occlusion[elements[start:end]] = 1.0 - hits.reshape(-1, samples).mean(axis=1)
+    return occlusion
+
+
+def bake_ambient_occlusion(obj, vcol, rgba_mask, samples=8, distance=1.0, bias=0.001, per_loop=False,
+                           smooth_iterations=3, seed=0):
+    # bake the occlusion of the mesh by itself to the active channels, respecting the
+    # selection mask. Rays are cast from the vertices (smoothed over the edges), or from
+    # each face corner with its split normal when per_loop is used on a corner layer
+    channels = np.flatnonzero(rgba_mask)
+    if len(channels) == 0:
+        return
+
+    mesh = obj.data
+    domain = get_layer_domain(vcol)
+    coords = get_vertex_positions(mesh)
+    tree = get_occlusion_tree(mesh, coords)
+    loop_verts = get_loop_vertex_indices(mesh)
+    element_mask = get_selection_mask(mesh, domain)
+
+    if per_loop and domain == 'CORNER':
+        elements = np.arange(len(mesh.loops)) if element_mask is None else np.flatnonzero(element_mask)
+        values = np.ones(len(mesh.loops))
+        values[elements] = get_ambient_occlusion(tree, coords[loop_verts[elements]],
+                                                 get_custom_normals(obj)[elements], samples, distance, bias, seed)
     else:
-        vertex_mask = True if mesh.use_paint_mask_vertex else False
-        verts = mesh.vertices
-
-        for loop_index, loop in enumerate(mesh.loops):
-            if not vertex_mask or verts[loop.vertex_index].select:
-                c = vcol.data[loop_index].color
-                if red_id in active_channels:
-                    c[0] = remap(c[0], min0, max0, min1, max1)
-                if green_id in active_channels:
-                    c[1] = remap(c[1], min0, max0, min1, max1)
-                if blue_id in active_channels:
-                    c[2] = remap(c[2], min0, max0, min1, max1)
-                if alpha_id in active_channels:
-                    c[3] = remap(c[3], min0, max0, min1, max1)
-                vcol.data[loop_index].color = c
-
-    mesh.update()
-
-
-def adjust_hsv(mesh, vcol, h_offset, s_offset, v_offset, colorize):
-    if mesh.use_paint_mask:
-        selected_faces = [face for face in mesh.polygons if face.select]
-        for face in selected_faces:
-            for loop_index in face.loop_indices:
-                c = Color(vcol.data[loop_index].color[:3])
-                if colorize:
-                    c.h = fmod(0.5 + h_offset, 1.0)
-                else:
-                    c.h = fmod(1.0 + c.h + h_offset, 1.0)
-                c.s = max(0.0, min(c.s + s_offset, 1.0))
-                c.v = max(0.0, min(c.v + v_offset, 1.0))
-
-                new_color = vcol.data[loop_index].color
-                new_color[:3] = c
-                vcol.data[loop_index].color = new_color
+        # rays are only cast from the vertices being written, unless smoothing needs all of them
+        verts = np.arange(len(mesh.vertices))
+        if element_mask is not None and smooth_iterations == 0:
+            verts = np.flatnonzero(element_mask) if domain == 'POINT' else np.unique(loop_verts[element_mask])
+        values = np.ones(len(mesh.vertices))
+        values[verts] = get_ambient_occlusion(tree, coords[verts], get_vertex_normals(mesh)[verts],
+                                              samples, distance, bias, seed)
+        if smooth_iterations > 0:
+            values = smooth_vertex_values(get_vertex_adjacency(mesh), values, 0.5, smooth_iterations)
+        if domain == 'CORNER':
+            values = values[loop_verts]
+
+    set_channel_values(mesh, vcol, channels, values, element_mask)
+
+
+def bake_curvature(mesh, vcol, rgba_mask, mode='CONVEXITY', output='BOTH', angle_range=pi / 2.0,
+                   smooth_iterations=1):
+    # bake the convexity or mean curvature of each vertex to the active channels,
+    # respecting the selection mask. Edges without exactly two faces are ignored
+    channels = np.flatnonzero(rgba_mask)
+    if len(channels) == 0:
+        return
+
+    vertex_count = len(mesh.vertices)
+    face_count = len(mesh.polygons)
+    face_normals = np.empty(face_count * 3, dtype=np.float32)
+    face_centers = np.empty(face_count * 3, dtype=np.float32)
+    edge_verts = np.empty(len(mesh.edges) * 2, dtype=np.int32)
+    loop_edges = np.empty(len(mesh.loops), dtype=np.int32)
+    with profile_phase('read'):
+        mesh.polygons.foreach_get('normal', face_normals)
+        mesh.polygons.foreach_get('center', face_centers)
+        mesh.edges.foreach_get('vertices', edge_verts)
+        mesh.loops.foreach_get('edge_index', loop_edges)
+    coords = get_vertex_positions(mesh)
+    loop_verts = get_loop_vertex_indices(mesh)
+    loop_indices, loop_faces = get_face_loop_indices(mesh)
+
+    edges, edge_faces = get_edge_faces(len(mesh.edges), loop_edges[loop_indices], loop_faces)
+    edge_verts = edge_verts.reshape(-1, 2)[edges]
+    edge_angles = get_dihedral_angles(face_normals.reshape(-1, 3), face_centers.reshape(-1, 3), edge_faces)
+    edge_lengths = np.linalg.norm(coords[edge_verts[:, 0]] - coords[edge_verts[:, 1]], axis=1)
+
+    if mode == 'CONVEXITY':
+        values = get_vertex_convexity(vertex_count, edge_verts, edge_angles, edge_lengths) / angle_range
+    else:
+        # the area around each vertex is an equal share of the area of its faces
+        face_areas = np.empty(face_count, dtype=np.float32)
+        with profile_phase('read'):
+            mesh.polygons.foreach_get('area', face_areas)
+        corner_areas = (face_areas / np.bincount(loop_faces, minlength=face_count))[loop_faces]
+        vertex_areas = np.bincount(loop_verts[loop_indices], weights=corner_areas, minlength=vertex_count)
+        values = get_vertex_mean_curvature(vertex_count, edge_verts, edge_angles, edge_lengths, vertex_areas)
+        # curvature depends on scale, so it is normalized to ignore a few extreme values
+        scale = np.percentile(np.abs(values), 99.0) if vertex_count > 0 else 0.0
+        if scale > 0.0:
+            values /= scale
+    values = np.clip(values, -1.0, 1.0)
+
+    if output == 'CONVEX':
+        values = np.maximum(values, 0.0)
+    elif output == 'CONCAVE':
+        values = np.maximum(-values, 0.0)
     else:
-        vertex_mask = True if mesh.use_paint_mask_vertex else False
-        verts = mesh.vertices
+        values = values * 0.5 + 0.5
 
-        for loop_index, loop in enumerate(mesh.loops):
-            if not vertex_mask or verts[loop.vertex_index].select:
-                c = Color(vcol.data[loop_index].color[:3])
-                if colorize:
-                    c.h = fmod(0.5 + h_offset, 1.0)
-                else:
-                    c.h = fmod(1.0 + c.h + h_offset, 1.0)
-                c.s = max(0.0, min(c.s + s_offset, 1.0))
-                c.v = max(0.0, min(c.v + v_offset, 1.0))
+    if smooth_iterations > 0:
+        values = smooth_vertex_values(get_vertex_adjacency(mesh), values, 0.5, smooth_iterations)
 
-                new_color = vcol.data[loop_index].color
-                new_color[:3] = c
-                vcol.data[loop_index].color = new_color
+    domain = get_layer_domain(vcol)
+    if domain == 'CORNER':
+        values = values[loop_verts]
+    set_channel_values(mesh, vcol, channels, values, get_selection_mask(mesh, domain))
 
-    mesh.update()
 
+# Distances from the selection are cached by mesh name, and only recalculated when the
+# mode, topology, vertex positions or selection change. Changing only the falloff
+# settings in the redo panel then just remaps the cached distances.
+# mesh name : (fingerprint, distances)
+distance_field_cache = {}
 
-# check isolate mode (shouldn't work in isolate mode...)
-# set random seed in parent function
-def set_island_colors_per_channel(mesh, rgba_mask, merge_similar, vmin, vmax):
-    bpy.ops.object.mode_set(mode='EDIT', toggle=False)
-
-    bm = bmesh.from_edit_mesh(mesh)
-    bm.faces.ensure_lookup_table()
-    color_layer = bm.loops.layers.color.active
-
-    # Find all islands in the mesh
-    mesh_islands = []
-    selected_faces = ([f for f in bm.faces if f.select])
-    faces = selected_faces if mesh.use_paint_mask or mesh.use_paint_mask_vertex else bm.faces
-    bpy.ops.mesh.select_all(action="DESELECT")
-
-    while len(faces) > 0:
-        # Select linked faces to find island
-        faces[0].select_set(True)
-        bpy.ops.mesh.select_linked()
-        mesh_islands.append([f for f in faces if f.select])
-        # Hide the island and update faces
-        bpy.ops.mesh.hide(unselected=False)
-        faces = [f for f in faces if not f.hide]
-
-    bpy.ops.mesh.reveal()  
-
-    island_colors = {} # Island face count : Random color pairs
-
-    for index, island in enumerate(mesh_islands):
-        rgba_values = []
-
-        face_count = len(island)
-        if merge_similar and face_count in island_colors.keys():
-            rgba_values = island_colors[face_count]
-        else:
-            vrange = abs(vmax - vmin)
-            rgba_values = [(vmin + random.random() * vrange) for i in range(4)]
-            island_colors[face_count] = rgba_values
 
-        # Set island face colors (probably quite slow, due to list comprehension per face loop)
-        for face in island:
-            for loop in face.loops:
-                c = loop[color_layer]
-                c = [v if rgba_mask[i] else c[i] for i, v in enumerate(rgba_values)]
-                loop[color_layer] = c
+def clear_distance_field_cache():
+    distance_field_cache.clear()
 
-    # Restore selection
-    for f in selected_faces:
-        f.select = True
 
-    bm.free()
-    bpy.ops.object.mode_set(mode='VERTEX_PAINT', toggle=False)
+def get_euclidean_distances(coords, seeds):
+    # straight line distance from the nearest seed vertex to each vertex
+    tree = KDTree(len(seeds))
+    for index, co in zip(seeds.tolist(), coords[seeds].tolist()):
+        tree.insert(co, index)
+    tree.balance()
+    return np.fromiter((hit[2] for hit in map(tree.find, coords.tolist())), dtype=np.float64, count=len(coords))
+
+
+def get_distance_field(mesh, seeds, mode='EDGES'):
+    # distance of each vertex from the nearest seed vertex, shared with the cache so read only
+    coords = get_vertex_positions(mesh).astype(np.float64)
+    fingerprint = (mode, get_topology_fingerprint(mesh), hash(coords.tobytes()), hash(seeds.tobytes()))
+    cached = distance_field_cache.get(mesh.name_full)
+    if cached is not None and cached[0] == fingerprint:
+        return cached[1]
+
+    if mode == 'EUCLIDEAN':
+        distances = get_euclidean_distances(coords, seeds)
+    else:
+        distances = get_edge_distances(get_vertex_adjacency(mesh), coords, seeds)
+    distances.flags.writeable = False
+
+    distance_field_cache[mesh.name_full] = (fingerprint, distances)
+    return distances
+
+
+def paint_distance_falloff(mesh, vcol, rgba_mask, mode='EDGES', radius=1.0, falloff='SMOOTH', invert=False):
+    # paint the active channels of the whole mesh by distance from the paint mask
+    # selection, from 1 at the selection to 0 at radius. Returns False if no face or
+    # vertex mask is used, or nothing is selected
+    channels = np.flatnonzero(rgba_mask)
+    vertex_mask = get_selection_mask(mesh, 'POINT')
+    if vertex_mask is None or not vertex_mask.any():
+        return False
+    seeds = np.flatnonzero(vertex_mask)
+    if len(channels) == 0:
+        return True
+
+    distances = get_distance_field(mesh, seeds, mode)
+    values = get_falloff_values(distances / radius, falloff)
+    if invert:
+        values = 1.0 - values
+    if get_layer_domain(vcol) == 'CORNER':
+        values = values[get_loop_vertex_indices(mesh)]
+    set_channel_values(mesh, vcol, channels, values)
+    return True
+
+
+def set_channel_values(mesh, vcol, channels, values, element_mask=None):
+    # write per element values to the given channels of the elements in element_mask
+    colors = get_color_array(vcol)
+    if element_mask is None:
+        colors[:, channels] = values[:, np.newaxis]
+    else:
+        element_indices = np.flatnonzero(element_mask)
+        colors[np.ix_(element_indices, channels)] = values[element_indices, np.newaxis]
+    set_color_array(vcol, colors)
+    update_mesh(mesh)
 
 
 def get_layer_info(context):
@@ -554,9 +1346,9 @@ def get_layer_info(context):
     return [src_type, src_id, dst_type, dst_id]
 
 
-def get_validated_input(context, get_src, get_dst):
+def get_validated_input(context, get_src, get_dst, obj=None):
     settings = context.scene.vertex_color_master_settings
-    obj = context.active_object
+    obj = context.active_object if obj is None else obj
     mesh = obj.data
 
     rv = {}
@@ -570,7 +1362,7 @@ def get_validated_input(context, get_src, get_dst):
 
     # are these conditions actually possible?
     if message is None:
-        if (src_type == type_vcol or dst_type == type_vcol) and mesh.vertex_colors is None:
+        if (src_type == type_vcol or dst_type == type_vcol) and get_color_layers(mesh) is None:
             message = "Object has no vertex colors."
         if (src_type == type_vgroup or dst_type == type_vgroup) and obj.vertex_groups is None:
             message = "Object has no vertex groups."
@@ -580,8 +1372,8 @@ def get_validated_input(context, get_src, get_dst):
     # validate src
     if get_src and message is None:
         if src_type == type_vcol:
-            if src_id in mesh.vertex_colors:
-                rv['src_vcol'] = mesh.vertex_colors[src_id]
+            if src_id in get_color_layers(mesh):
+                rv['src_vcol'] = get_color_layers(mesh)[src_id]
                 rv['src_channel_idx'] = channel_id_to_idx(settings.src_channel_id)
             else:
                 message = "Src color layer is not valid."
@@ -603,8 +1395,8 @@ def get_validated_input(context, get_src, get_dst):
     # validate dst
     if get_dst and message is None:
         if dst_type == type_vcol:
-            if dst_id in mesh.vertex_colors:
-                rv['dst_vcol'] = mesh.vertex_colors[dst_id]
+            if dst_id in get_color_layers(mesh):
+                rv['dst_vcol'] = get_color_layers(mesh)[dst_id]
                 rv['dst_channel_idx'] = channel_id_to_idx(settings.dst_channel_id)
             else:
                 message = "Dst color layer is not valid."
@@ -625,3 +1417,71 @@ def get_validated_input(context, get_src, get_dst):
 
     rv['error'] = message
     return rv
+
+
+# Batch execution over several objects. Objects sharing a mesh are only processed
+# once. Blender data is read and written on the main thread, while the array work
+# in between runs on a thread pool, as NumPy releases the GIL for it.
+batch_max_workers = min(8, os.cpu_count() or 1)
+
+
+def run_batched(items, read, compute, write, max_workers=None):
+    # read(item) -> data, compute(data) -> result, write(item, result)
+    # items are handled in chunks so only a few meshes worth of arrays are held at once
+    if len(items) < 2:
+        for item in items:
+            write(item, compute(read(item)))
+        return
+
+    max_workers = batch_max_workers if max_workers is None else max_workers
+    chunk_size = max_workers * 2
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        for start in range(0, len(items), chunk_size):
+            chunk = items[start:start + chunk_size]
+            futures = [pool.submit(compute, read(item)) for item in chunk]
+            for item, future in zip(chunk, futures):
+                write(item, future.result())
+
+
+def get_batch_objects(context, use_selected=True):
+    # the active object first, then the other selected mesh objects (sorted by name so
+    # results don't depend on selection order), skipping objects whose mesh is shared
+    active = context.active_object
+    objects = [active]
+    if use_selected:
+        others = [obj for obj in context.selected_objects if obj.type == 'MESH' and obj != active]
+        objects.extend(sorted(others, key=lambda obj: obj.name))
+
+    batch = []
+    seen_meshes = set()
+    for obj in objects:
+        key = obj.data.as_pointer()
+        if key not in seen_meshes:
+            seen_meshes.add(key)
+            batch.append(obj)
+    return batch
+
+
+def get_batch_targets(context, use_selected=True):
+    # (mesh, active vcol) of every object in the batch, creating a layer where needed
+    targets = []
+    for obj in get_batch_objects(context, use_selected):
+        mesh = obj.data
+        targets.append((mesh, get_or_create_active_color_layer(mesh)))
+    return targets
+
+
+def get_validated_batch_input(context, get_src, get_dst, use_selected=True):
+    # returns the validated input of each object in the batch and the error of the
+    # active object, if any. Other objects without the src/dst layers are skipped
+    objects = get_batch_objects(context, use_selected)
+    active_input = get_validated_input(context, get_src, get_dst, objects[0])
+    if active_input['error'] is not None:
+        return [], active_input['error']
+
+    inputs = [(objects[0], active_input)]
+    for obj in objects[1:]:
+        vi = get_validated_input(context, get_src, get_dst, obj)
+        if vi['error'] is None:
+            inputs.append((obj, vi))
+    return inputs, None
@@ -0,0 +1,599 @@
+#  ***** GPL LICENSE BLOCK *****
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#  All rights reserved.
+#  ***** GPL LICENSE BLOCK *****
+
+# <pep8 compliant>
+
+# Color math used by the add-on, working on plain NumPy arrays. This module must
+# not import bpy (or anything from this package), so it can be imported, tested
+# and profiled with ordinary Python by adding this directory to sys.path.
+# The helpers in vcm_helpers read mesh data into arrays and call these.
+
+import numpy as np
+
+
+# Scalar versions, used by the per loop Python backend
+def posterize(value, steps):
+    return round(value * steps) / steps
+
+
+def remap(value, min0, max0, min1, max1):
+    r0 = max0 - min0
+    if r0 == 0:
+        return min1
+    r1 = max1 - min1
+    return ((value - min0) * r1) / r0 + min1
+
+
+def rgb_to_luminosity(color):
+    # Y = 0.299 R + 0.587 G + 0.114 B
+    return color[0] * 0.299 + color[1] * 0.587 + color[2] * 0.114
+
+
+def apply_channel_op(colors, op, rgba_mask, loop_mask=None):
+    # apply op to the active channels of the selected loops of an (N, 4) array
+    channels = np.flatnonzero(rgba_mask)
+    if len(channels) == 0:
+        return colors
+    if loop_mask is None:
+        colors[:, channels] = op(colors[:, channels])
+    else:
+        index = np.ix_(np.flatnonzero(loop_mask), channels)
+        colors[index] = op(colors[index])
+    return colors
+
+
+def posterize_array(values, steps):
+    return np.round(values * steps) / steps
+
+
+def remap_array(values, min0, max0, min1, max1):
+    r0 = max0 - min0
+    if r0 == 0:
+        return np.full_like(values, min1)
+    r1 = max1 - min1
+    return ((values - min0) * r1) / r0 + min1
+
+
+def invert_array(values):
+    return 1 - values
+
+
+# Blend kernels operate on whole channel arrays
+# src is the blend layer and dst the base layer, both with values in the 0-1 range
+def blend_add(src, dst):
+    return np.clip(src + dst, 0.0, 1.0)
+
+
+def blend_sub(src, dst):
+    return np.clip(src - dst, 0.0, 1.0)
+
+
+def blend_mul(src, dst):
+    return src * dst
+
+
+def blend_div(src, dst):
+    safe_dst = np.where(dst == 0.0, 1.0, dst)
+    return np.where(src == 0.0, 0.0, np.where(dst == 0.0, 1.0, src / safe_dst))
+
+
+def blend_lighten(src, dst):
+    return np.maximum(src, dst)
+
+
+def blend_darken(src, dst):
+    return np.minimum(src, dst)
+
+
+def blend_mix(src, dst):
+    return src.copy()
+
+
+def blend_screen(src, dst):
+    return 1.0 - (1.0 - src) * (1.0 - dst)
+
+
+def blend_overlay(src, dst):
+    return np.where(dst < 0.5, 2.0 * src * dst, 1.0 - 2.0 * (1.0 - src) * (1.0 - dst))
+
+
+def blend_soft_light(src, dst):
+    return (1.0 - dst) * src * dst + dst * blend_screen(src, dst)
+
+
+def blend_hard_light(src, dst):
+    return blend_overlay(dst, src)
+
+
+def blend_color_dodge(src, dst):
+    safe_src = np.where(src >= 1.0, 0.0, src)
+    return np.where(src >= 1.0, 1.0, np.minimum(dst / (1.0 - safe_src), 1.0))
+
+
+def blend_color_burn(src, dst):
+    safe_src = np.where(src <= 0.0, 1.0, src)
+    return np.where(src <= 0.0, 0.0, np.maximum(1.0 - (1.0 - dst) / safe_src, 0.0))
+
+
+def blend_linear_burn(src, dst):
+    return np.maximum(src + dst - 1.0, 0.0)
+
+
+def blend_linear_light(src, dst):
+    return np.clip(dst + 2.0 * src - 1.0, 0.0, 1.0)
+
+
+def blend_vivid_light(src, dst):
+    return np.where(src < 0.5,
+                    blend_color_burn(2.0 * src, dst),
+                    blend_color_dodge(2.0 * (src - 0.5), dst))
+
+
+def blend_pin_light(src, dst):
+    return np.where(src < 0.5, np.minimum(dst, 2.0 * src), np.maximum(dst, 2.0 * src - 1.0))
+
+
+def blend_difference(src, dst):
+    return np.abs(dst - src)
+
+
+def blend_exclusion(src, dst):
+    return src + dst - 2.0 * src * dst
+
+
+blend_kernels = {
+    'ADD': blend_add,
+    'SUB': blend_sub,
+    'MUL': blend_mul,
+    'DIV': blend_div,
+    'LIGHTEN': blend_lighten,
+    'DARKEN': blend_darken,
+    'MIX': blend_mix,
+    'SCREEN': blend_screen,
+    'OVERLAY': blend_overlay,
+    'SOFTLIGHT': blend_soft_light,
+    'HARDLIGHT': blend_hard_light,
+    'COLORDODGE': blend_color_dodge,
+    'COLORBURN': blend_color_burn,
+    'LINEARBURN': blend_linear_burn,
+    'LINEARLIGHT': blend_linear_light,
+    'VIVIDLIGHT': blend_vivid_light,
+    'PINLIGHT': blend_pin_light,
+    'DIFFERENCE': blend_difference,
+    'EXCLUSION': blend_exclusion,
+}
+
+
+def blend_values(src, dst, operation='ADD', factor=1.0):
+    # blend two channel arrays, then mix the result with dst by factor
+    kernel = blend_kernels.get(operation)
+    if kernel is None:
+        return None
+    result = kernel(src, dst)
+    if factor < 1.0:
+        result = dst + (result - dst) * factor
+    return result
+
+
+# sRGB transfer functions, as Blender uses for byte colors. Negative values map to 0
+def srgb_to_linear(values):
+    values = np.maximum(values, 0.0)
+    return np.where(values < 0.04045, values / 12.92, ((values + 0.055) / 1.055) ** 2.4)
+
+
+def linear_to_srgb(values):
+    values = np.maximum(values, 0.0)
+    return np.where(values < 0.0031308, values * 12.92, 1.055 * values ** (1.0 / 2.4) - 0.055)
+
+
+# HSV conversion of (N, 3) RGB arrays. Hue, saturation and value are in the 0-1 range
+def rgb_to_hsv_array(rgb):
+    r, g, b = rgb[:, 0], rgb[:, 1], rgb[:, 2]
+    maxc = rgb.max(axis=1)
+    minc = rgb.min(axis=1)
+    delta = maxc - minc
+
+    has_chroma = delta > 0.0
+    safe_delta = np.where(has_chroma, delta, 1.0)
+    s = np.where(maxc > 0.0, delta / np.where(maxc > 0.0, maxc, 1.0), 0.0)
+
+    rc = (maxc - r) / safe_delta
+    gc = (maxc - g) / safe_delta
+    bc = (maxc - b) / safe_delta
+    h = np.where(r == maxc, bc - gc, np.where(g == maxc, 2.0 + rc - bc, 4.0 + gc - rc))
+    h = np.where(has_chroma, (h / 6.0) % 1.0, 0.0)
+
+    return np.stack((h, s, maxc), axis=1).astype(rgb.dtype, copy=False)
+
+
+def hsv_to_rgb_array(hsv):
+    h, s, v = hsv[:, 0], hsv[:, 1], hsv[:, 2]
+    h6 = (h % 1.0) * 6.0
+    sector = np.floor(h6)
+    f = h6 - sector
+    sector = sector.astype(np.int32) % 6
+
+    p = v * (1.0 - s)
+    q = v * (1.0 - s * f)
+    t = v * (1.0 - s * (1.0 - f))
+
+    r = np.choose(sector, (v, q, p, p, t, v))
+    g = np.choose(sector, (t, v, v, q, p, p))
+    b = np.choose(sector, (p, p, t, v, v, q))
+
+    return np.stack((r, g, b), axis=1).astype(hsv.dtype, copy=False)
+
+
+def adjust_hsv_array(rgb, h_offset, s_offset, v_offset, colorize):
+    hsv = rgb_to_hsv_array(rgb)
+    if colorize:
+        hsv[:, 0] = (0.5 + h_offset) % 1.0
+    else:
+        hsv[:, 0] = (1.0 + hsv[:, 0] + h_offset) % 1.0
+    hsv[:, 1] = np.clip(hsv[:, 1] + s_offset, 0.0, 1.0)
+    hsv[:, 2] = np.clip(hsv[:, 2] + v_offset, 0.0, 1.0)
+    return hsv_to_rgb_array(hsv)
+
+
+# wrap_mode
+# 'WRAP' - repeat the 0-1 range (fractional part of the coordinate)
+# 'CLAMP' - clamp to the 0-1 range
+# 'BOUNDS' - remap the bounding box of the UVs to the 0-1 range
+def wrap_uvs(uvs, wrap_mode='WRAP'):
+    if wrap_mode == 'CLAMP':
+        return np.clip(uvs, 0.0, 1.0)
+    elif wrap_mode == 'BOUNDS':
+        if len(uvs) == 0:
+            return uvs
+        uv_min = uvs.min(axis=0)
+        uv_range = uvs.max(axis=0) - uv_min
+        return np.divide(uvs - uv_min, uv_range, out=np.zeros_like(uvs), where=uv_range > 0.0)
+    return np.mod(uvs, 1.0)
+
+
+# Compact snapshots of a channel: float32 when exact, otherwise uint8 when the values
+# are bytes and float16 if they aren't
+def pack_channel(values, exact=False):
+    if exact:
+        return values.astype(np.float32)
+    quantized = np.rint(values * 255.0)
+    if np.abs(quantized / 255.0 - values).max(initial=0.0) < 1e-4:
+        return quantized.astype(np.uint8)
+    return values.astype(np.float16)
+
+
+def unpack_channel(snapshot):
+    if snapshot.dtype == np.uint8:
+        return snapshot.astype(np.float32) / 255.0
+    return snapshot.astype(np.float32)
+
+
+def get_snapshot_tolerance(snapshot):
+    # differences below this are rounding in the snapshot, not edits
+    if snapshot.dtype == np.float32:
+        return 0.0
+    return 1e-4 if snapshot.dtype == np.uint8 else 1e-3
+
+
+def label_components(count, a, b):
+    # array based union-find. a and b are arrays of connected element indices
+    # returns the root (lowest connected index) of each of the count elements
+    labels = np.arange(count)
+    while len(a) > 0:
+        # hook the higher root of each unresolved pair onto the lower one
+        la = labels[a]
+        lb = labels[b]
+        unresolved = la != lb
+        a, b = a[unresolved], b[unresolved]
+        la, lb = la[unresolved], lb[unresolved]
+        labels[np.maximum(la, lb)] = np.minimum(la, lb)
+
+        # compress paths until every element points directly at its root
+        while True:
+            parents = labels[labels]
+            if np.array_equal(parents, labels):
+                break
+            labels = parents
+    return labels
+
+
+def number_by_first_occurrence(labels):
+    # renumber labels to 0..n-1 in order of first occurrence, returns (numbers, n)
+    unique_labels, first, inverse = np.unique(labels, return_index=True, return_inverse=True)
+    order = np.empty(len(unique_labels), dtype=np.int32)
+    order[np.argsort(first)] = np.arange(len(unique_labels), dtype=np.int32)
+    return order[inverse.ravel()], len(unique_labels)
+
+
+def label_face_islands(vertex_count, face_verts, loop_faces, face_count):
+    # label groups of faces connected by shared vertices. face_verts are the vertex
+    # indices of all face corners in face order, and loop_faces the face of each
+    # returns the island index of each face, numbered in face order, and the island count
+
+    # connect every vertex of a face to the first vertex of that face
+    face_starts = np.searchsorted(loop_faces, np.arange(face_count))
+    first_verts = face_verts[face_starts]
+    vertex_roots = label_components(vertex_count, face_verts, first_verts[loop_faces])
+    return number_by_first_occurrence(vertex_roots[first_verts])
+
+
+def build_vertex_adjacency(vertex_count, edge_verts):
+    # CSR adjacency of the vertices connected by (E, 2) edges
+    # returns indptr and indices, such that the neighbours of vertex i are
+    # indices[indptr[i]:indptr[i + 1]]
+    rows = np.concatenate((edge_verts[:, 0], edge_verts[:, 1]))
+    cols = np.concatenate((edge_verts[:, 1], edge_verts[:, 0]))
+    order = np.argsort(rows, kind='stable')
+
+    indptr = np.zeros(vertex_count + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=vertex_count), out=indptr[1:])
+    return indptr, cols[order]
+
+
+def average_per_vertex(loop_verts, values, vertex_count):
+    # average per loop values, (N,) or (N, channels), for each vertex
+    # vertices without loops are 0
+    counts = np.bincount(loop_verts, minlength=vertex_count)
+    if values.ndim == 1:
+        totals = np.bincount(loop_verts, weights=values, minlength=vertex_count)
+    else:
+        totals = np.stack([np.bincount(loop_verts, weights=values[:, i], minlength=vertex_count)
+                           for i in range(values.shape[1])], axis=1)
+        counts = counts[:, np.newaxis]
+    return np.divide(totals, counts, out=np.zeros(totals.shape), where=counts > 0)
+
+
+def segment_sums(values, starts, connected):
+    # sum the (channels, E) neighbour values of each vertex, 0 for vertices without neighbours
+    if len(starts) == len(connected):
+        return np.add.reduceat(values, starts, axis=-1, dtype=np.float64)
+    sums = np.zeros(values.shape[:-1] + connected.shape)
+    sums[..., connected] = np.add.reduceat(values, starts, axis=-1, dtype=np.float64)
+    return sums
+
+
+def smooth_vertex_values(adjacency, values, factor=0.5, iterations=1, expand=0.0, vertex_mask=None):
+    # smooth per vertex values, (V,) or (V, channels), by averaging with their neighbours
+    # in the same way as the vertex group smooth operator. A positive expand biases the
+    # result towards higher values (neighbours below a vertex count less), a negative one
+    # towards lower. Only vertices in vertex_mask are changed, if it is given
+    indptr, indices = adjacency
+    values = np.asarray(values, dtype=np.float64)
+    if len(indices) == 0:
+        return values.copy()
+
+    # channels are processed as contiguous rows of a (channels, V) array, so the gather
+    # and neighbour sums for all channels are done together along the last axis
+    single_channel = values.ndim == 1
+    values = np.ascontiguousarray(np.atleast_2d(values) if single_channel else values.T)
+
+    vertex_count = len(indptr) - 1
+    degree = np.diff(indptr)
+    # reduceat only runs over vertices with neighbours, as it can't express an empty
+    # segment. Their segments are contiguous, so each one sums exactly its own neighbours
+    connected = degree > 0
+    starts = indptr[:-1][connected]
+    has_neighbours = connected.copy()
+    if vertex_mask is not None:
+        has_neighbours &= vertex_mask
+    inv_degree = np.divide(1.0, degree, out=np.zeros(vertex_count), where=degree > 0)
+    expand_amount = abs(expand)
+
+    for i in range(iterations):
+        others = np.take(values, indices, axis=1)
+        if expand == 0.0:
+            average = segment_sums(others, starts, connected)
+            average *= inv_degree
+            valid = has_neighbours
+        else:
+            # a biased neighbour counts (1 - a) times, with its value moved a towards the
+            # vertex (a = expand_amount). As the vertex value is the same for all of its
+            # neighbours, the weighted sums only need the sum and count of the biased
+            # neighbours, rather than per neighbour weights
+            current = np.repeat(values, degree, axis=1)
+            biased = np.less(others, current) if expand > 0.0 else np.greater(others, current)
+            total = segment_sums(others, starts, connected)
+            biased_count = segment_sums(biased, starts, connected)
+            np.multiply(others, biased, out=others)
+            biased_total = segment_sums(others, starts, connected)
+
+            kept = 1.0 - expand_amount
+            weight = total + (kept * kept - 1.0) * biased_total + kept * expand_amount * values * biased_count
+            weight_tot = degree - expand_amount * biased_count
+            valid = (weight_tot != 0.0) & has_neighbours
+            average = np.divide(weight, weight_tot, out=np.zeros_like(weight), where=valid)
+
+        smoothed = values * (1.0 - factor)
+        smoothed += average * factor
+        np.clip(smoothed, 0.0, 1.0, out=smoothed)
+        values = np.where(valid, smoothed, values)
+
+    return values[0] if single_channel else values.T
+
+
+# Ambient occlusion
+def get_hemisphere_samples(count, rng):
+    # (count, 3) cosine weighted directions around +Z. Elevation is stratified and the
+    # azimuths are spread by the golden ratio, so few samples still cover the hemisphere
+    u = (np.arange(count) + rng.random(count)) / count
+    phi = 2.0 * np.pi * ((np.arange(count) * 0.618033988749895 + rng.random()) % 1.0)
+    r = np.sqrt(u)
+    return np.stack((r * np.cos(phi), r * np.sin(phi), np.sqrt(np.maximum(1.0 - u, 0.0))), axis=1)
+
+
+def orient_samples(samples, normals, angles):
+    # (N, S, 3) directions of the (S, 3) samples around each of the (N, 3) unit normals
+    # the samples are rotated about each normal by angles, so neighbouring elements
+    # don't all cast rays in the same directions
+    axis = np.where(np.abs(normals[:, :1]) < 0.9, (1.0, 0.0, 0.0), (0.0, 1.0, 0.0))
+    tangents = np.cross(normals, axis)
+    tangents /= np.linalg.norm(tangents, axis=1, keepdims=True)
+    bitangents = np.cross(normals, tangents)
+
+    cos_a = np.cos(angles)[:, np.newaxis]
+    sin_a = np.sin(angles)[:, np.newaxis]
+    x = (samples[:, 0] * cos_a - samples[:, 1] * sin_a)[:, :, np.newaxis]
+    y = (samples[:, 0] * sin_a + samples[:, 1] * cos_a)[:, :, np.newaxis]
+    z = samples[np.newaxis, :, 2, np.newaxis]
+    return x * tangents[:, np.newaxis] + y * bitangents[:, np.newaxis] + z * normals[:, np.newaxis]
+
+
+# Curvature
+def get_edge_faces(edge_count, loop_edges, loop_faces):
+    # the faces on either side of each manifold edge (edges with exactly two faces)
+    # returns the manifold edge indices and their (E, 2) faces
+    order = np.argsort(loop_edges, kind='stable')
+    counts = np.bincount(loop_edges, minlength=edge_count)
+    starts = np.cumsum(counts) - counts
+    edges = np.flatnonzero(counts == 2)
+    return edges, loop_faces[order][starts[edges, np.newaxis] + np.arange(2)]
+
+
+def get_dihedral_angles(face_normals, face_centers, edge_faces):
+    # angle between the normals of the two faces of each edge, positive where the
+    # surface is convex and negative where it is concave
+    normals_a = face_normals[edge_faces[:, 0]]
+    normals_b = face_normals[edge_faces[:, 1]]
+    angles = np.arccos(np.clip((normals_a * normals_b).sum(axis=1), -1.0, 1.0))
+    # concave where the second face lies in front of the first
+    offsets = face_centers[edge_faces[:, 1]] - face_centers[edge_faces[:, 0]]
+    concave = (offsets * normals_a).sum(axis=1) > 0.0
+    return np.where(concave, -angles, angles)
+
+
+def get_vertex_convexity(vertex_count, edge_verts, edge_angles, edge_lengths):
+    # edge length weighted average of the dihedral angles of the edges at each vertex
+    verts = edge_verts.ravel()
+    totals = np.bincount(verts, weights=np.repeat(edge_angles * edge_lengths, 2), minlength=vertex_count)
+    weights = np.bincount(verts, weights=np.repeat(edge_lengths, 2), minlength=vertex_count)
+    return np.divide(totals, weights, out=np.zeros(vertex_count), where=weights > 0.0)
+
+
+def get_vertex_mean_curvature(vertex_count, edge_verts, edge_angles, edge_lengths, vertex_areas):
+    # discrete mean curvature, the sum of angle * length over the edges at each vertex
+    # divided by 4 times the area around the vertex
+    verts = edge_verts.ravel()
+    totals = np.bincount(verts, weights=np.repeat(edge_angles * edge_lengths, 2), minlength=vertex_count)
+    return np.divide(totals, 4.0 * vertex_areas, out=np.zeros(vertex_count), where=vertex_areas > 0.0)
+
+
+# Distance falloff
+def get_edge_distances(adjacency, coords, seeds):
+    # shortest distance along the edges from the nearest seed vertex to each vertex
+    # (inf where no seed can be reached). Each round relaxes the edges of all vertices
+    # whose distance changed in the last round, until no distance changes
+    indptr, indices = adjacency
+    vertex_count = len(indptr) - 1
+    degree = np.diff(indptr)
+    rows = np.repeat(np.arange(vertex_count), degree)
+    lengths = np.linalg.norm(coords[indices] - coords[rows], axis=1)
+
+    distances = np.full(vertex_count, np.inf)
+    distances[seeds] = 0.0
+    frontier = np.unique(seeds)
+    while len(frontier):
+        # the CSR entries of the frontier vertices
+        counts = degree[frontier]
+        offsets = np.cumsum(counts) - counts
+        entries = np.repeat(indptr[frontier] - offsets, counts) + np.arange(counts.sum())
+        targets = indices[entries]
+        candidates = np.repeat(distances[frontier], counts) + lengths[entries]
+
+        shorter = candidates < distances[targets]
+        targets = targets[shorter]
+        np.minimum.at(distances, targets, candidates[shorter])
+        frontier = np.unique(targets)
+    return distances
+
+
+def get_falloff_values(t, falloff='SMOOTH'):
+    # falloff weights, 1 at t = 0 and 0 from t = 1, like proportional editing
+    f = 1.0 - np.clip(t, 0.0, 1.0)
+    if falloff == 'SMOOTH':
+        return f * f * (3.0 - 2.0 * f)
+    if falloff == 'SPHERE':
+        return np.sqrt(f * (2.0 - f))
+    if falloff == 'ROOT':
+        return np.sqrt(f)
+    if falloff == 'INVERSE_SQUARE':
+        return f * (2.0 - f)
+    if falloff == 'SHARP':
+        return f * f
+    if falloff == 'CONSTANT':
+        return (f > 0.0).astype(f.dtype)
+    return f
+
+
+# Gradient
+def project_to_region(coords, matrix, region_width, region_height):
+    # project (N, 3) coordinates to region pixel space with a 4x4 matrix (such as the view
+    # perspective matrix multiplied by the object matrix), like location_3d_to_region_2d
+    # returns the (N, 2) region coordinates and a mask of points in front of the view
+    matrix = np.asarray(matrix, dtype=np.float64)
+    clip = coords @ matrix[:3, :3].T + matrix[:3, 3]
+    w = coords @ matrix[3, :3] + matrix[3, 3]
+    visible = w > 0.0
+
+    ndc = clip[:, :2] / np.where(visible, w, 1.0)[:, np.newaxis]
+    half_size = np.array((region_width, region_height), dtype=np.float64) * 0.5
+    return half_size + half_size * ndc, visible
+
+
+def get_gradient_factors(points, start_point, end_point, circular=False):
+    # gradient position (0-1) of (N, 2) points for a line drawn from start to end
+    start = np.asarray(start_point[:2], dtype=np.float64)
+    direction = np.asarray(end_point[:2], dtype=np.float64) - start
+    length_sq = direction.dot(direction)
+    if length_sq == 0.0:
+        return np.zeros(len(points))
+
+    offsets = points - start
+    if circular:
+        t = np.sqrt((offsets * offsets).sum(axis=1) / length_sq)
+    else:
+        t = offsets @ direction / length_sq
+    return np.clip(t, 0.0, 1.0)
+
+
+def get_gradient_colors(t, start_color, end_color, use_hue_blend=False):
+    # (N, 3) colors at gradient positions t between the start and end colors
+    start_rgb = np.asarray(start_color[:3], dtype=np.float32)
+    end_rgb = np.asarray(end_color[:3], dtype=np.float32)
+    t = np.asarray(t, dtype=np.float32)[:, np.newaxis]
+
+    if not use_hue_blend:
+        return start_rgb + (end_rgb - start_rgb) * t
+
+    start_hsv, end_hsv = rgb_to_hsv_array(np.stack((start_rgb, end_rgb)))
+    hsv_separation = end_hsv - start_hsv
+    # blend hue the shortest way around the hue circle
+    if hsv_separation[0] > 0.5:
+        hsv_separation[0] -= 1.0
+    elif hsv_separation[0] < -0.5:
+        hsv_separation[0] += 1.0
+    hsv = start_hsv + hsv_separation * t
+    hsv[:, 0] %= 1.0
+    return hsv_to_rgb_array(hsv)
+
+
+def paint_gradient(colors, points, loop_indices, loop_points, start_point, end_point,
+                   start_color, end_color, circular=False, use_hue_blend=False):
+    # paint the RGB of an (N, 4) color array using targets from get_gradient_targets
+    t = get_gradient_factors(points, start_point, end_point, circular)
+    point_colors = get_gradient_colors(t, start_color, end_color, use_hue_blend)
+    colors[loop_indices, :3] = point_colors[loop_points]
+    return colors
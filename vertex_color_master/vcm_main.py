@@ -21,7 +21,59 @@ import bpy
 from bpy.props import *
 from mathutils import Color
 from .vcm_globals import *
-from .vcm_helpers import rgb_to_luminosity
+from .vcm_helpers import get_color_layers, rgb_to_luminosity
+
+# A single channel operation of a saved pipeline
+class VertexColorMasterPipelineStep(bpy.types.PropertyGroup):
+    op: EnumProperty(
+        name="Operation",
+        items=pipeline_op_items,
+        description="Channel operation to apply."
+    )
+
+    channels: EnumProperty(
+        name="Channels",
+        options={'ENUM_FLAG'},
+        items=channel_items,
+        description="Channels the operation is applied to.",
+        default={'R', 'G', 'B'}
+    )
+
+    value: FloatProperty(
+        name="Value",
+        description="Value to fill the channels with.",
+        default=1.0,
+        min=0.0, max=1.0
+    )
+
+    steps: IntProperty(
+        name="Steps",
+        description="Number of different values after posterization.",
+        default=2,
+        min=2, max=256
+    )
+
+    min0: FloatProperty(name="Input Min", default=0.0, min=0.0, max=1.0)
+    max0: FloatProperty(name="Input Max", default=1.0, min=0.0, max=1.0)
+    min1: FloatProperty(name="Output Min", default=0.0, min=0.0, max=1.0)
+    max1: FloatProperty(name="Output Max", default=1.0, min=0.0, max=1.0)
+
+    # step in the format used by run_pipeline
+    def to_dict(self):
+        return {'op': self.op, 'channels': set(self.channels), 'value': self.value, 'steps': self.steps,
+                'min0': self.min0, 'max0': self.max0, 'min1': self.min1, 'max1': self.max1}
+
+
+class VertexColorMasterPipeline(bpy.types.PropertyGroup):
+    name: StringProperty(
+        name="Name",
+        default="Pipeline"
+    )
+
+    steps: CollectionProperty(
+        type=VertexColorMasterPipelineStep
+    )
+
 
 # VERTEXCOLORMASTER_Properties
 class VertexColorMasterProperties(bpy.types.PropertyGroup):
@@ -128,9 +180,9 @@ class VertexColorMasterProperties(bpy.types.PropertyGroup):
         obj = context.active_object
         mesh = obj.data
 
-        items = [] if mesh.vertex_colors is None else [
+        items = [] if get_color_layers(mesh) is None else [
             ("{0} {1}".format(type_vcol, vcol.name), 
-             vcol.name, "") for vcol in mesh.vertex_colors]
+             vcol.name, "") for vcol in get_color_layers(mesh)]
         ext = [] if obj.vertex_groups is None else [
             ("{0} {1}".format(type_vgroup, group.name),
              "W: " + group.name, "") for group in obj.vertex_groups]
@@ -175,4 +227,53 @@ class VertexColorMasterProperties(bpy.types.PropertyGroup):
         items=channel_blend_mode_items,
         description="Channel blending operation.",
     )
-   
\ No newline at end of file
+
+    helper_backend: EnumProperty(
+        name="Backend",
+        items=backend_items,
+        default='NUMPY',
+        description="Method used to process vertex color data."
+    )
+
+    batch_selected_objects: BoolProperty(
+        name="All Selected Objects",
+        default=False,
+        description="Apply operations to all selected mesh objects instead of only the active object."
+    )
+
+    pipelines: CollectionProperty(
+        type=VertexColorMasterPipeline,
+        description="Saved channel operation pipelines."
+    )
+
+    active_pipeline_index: IntProperty(
+        name="Active Pipeline",
+        default=0
+    )
+
+    profile_operations: BoolProperty(
+        name="Profile Operations",
+        default=False,
+        description="Record the time and memory used by each operation, split into selection, read, compute, write and update phases."
+    )
+
+    profile_log_path: StringProperty(
+        name="Profile Log",
+        subtype='FILE_PATH',
+        default="",
+        description="Append profile records to this JSON lines file (leave empty to only keep them in the session)."
+    )
+
+    gradient_live_preview: BoolProperty(
+        name="Live Gradient Preview",
+        default=False,
+        description="Update the mesh colors while the gradient line is being drawn."
+    )
+
+    gradient_preview_frame_time: FloatProperty(
+        name="Preview Frame Time",
+        description="Minimum time in seconds between live gradient preview updates.",
+        default=1.0 / 30.0,
+        min=0.0,
+        max=1.0
+    )
@@ -23,8 +23,11 @@ from bpy.props import *
 
 from .vcm_globals import *
 from .vcm_helpers import (
+    get_active_color_layer,
     get_isolated_channel_ids,
     get_layer_info,
+    profile_log,
+    profile_phases,
 )
 
 
@@ -43,13 +46,13 @@ class VERTEXCOLORMASTER_PT_MainPanel(bpy.types.Panel):
         obj = context.active_object
         settings = context.scene.vertex_color_master_settings
 
-        if not obj.data.vertex_colors.active:
+        if not get_active_color_layer(obj.data):
             layout.label(text="No active vertex color layer")
             return
 
         # use active mesh active vcol layer name to determine whether or not
         # should we be in isolate mode or not
-        isolate = get_isolated_channel_ids(obj.data.vertex_colors.active)
+        isolate = get_isolated_channel_ids(get_active_color_layer(obj.data))
         if isolate is not None:
             return self.draw_isolate_mode_layout(context, obj, isolate[0], isolate[1], settings)
 
@@ -63,9 +66,13 @@ class VERTEXCOLORMASTER_PT_MainPanel(bpy.types.Panel):
         layout.separator()
         draw_active_channel_operations(context, layout, obj, settings)
         layout.separator()
+        draw_pipeline_operations(context, layout, obj, settings)
+        layout.separator()
         draw_src_dst_operations(context, layout, obj, settings)
         layout.separator()
         draw_misc_operations(context, layout, obj, settings)
+        layout.separator()
+        draw_profile_readout(context, layout, settings)
 
 
     def draw_isolate_mode_layout(self, context, obj, vcol_id, channel_id, settings):
@@ -85,7 +92,11 @@ class VERTEXCOLORMASTER_PT_MainPanel(bpy.types.Panel):
         layout.separator()
         draw_active_channel_operations(context, layout, obj, settings, mode='ISOLATE')
         layout.separator()
+        draw_pipeline_operations(context, layout, obj, settings, mode='ISOLATE')
+        layout.separator()
         draw_misc_operations(context, layout, obj, settings, mode='ISOLATE')
+        layout.separator()
+        draw_profile_readout(context, layout, settings)
 
 
 class VERTEXCOLORMASTER_MT_PieMain(Menu):
@@ -103,7 +114,7 @@ class VERTEXCOLORMASTER_MT_PieMain(Menu):
         layout = self.layout
         obj = context.active_object
         settings = context.scene.vertex_color_master_settings
-        isolate = get_isolated_channel_ids(obj.data.vertex_colors.active)
+        isolate = get_isolated_channel_ids(get_active_color_layer(obj.data))
         mode = 'STANDARD' if isolate is None else 'ISOLATE'
 
         # create top level pie layout
@@ -226,6 +237,66 @@ def draw_active_channel_operations(context, layout, obj, settings, mode='STANDAR
     row.operator('vertexcolormaster.remap', text='Remap')
     if mode == 'STANDARD':
         row.operator('vertexcolormaster.randomize_mesh_island_colors_per_channel', text='Islands')
+    if not pie:
+        row = col.row(align=True)
+        row.prop(settings, 'helper_backend', expand=True)
+        row = col.row(align=True)
+        row.prop(settings, 'batch_selected_objects', toggle=True)
+
+
+def draw_pipeline_operations(context, layout, obj, settings, mode='STANDARD'):
+    col = layout.column(align=True)
+    row = col.row()
+    row.label(text="Pipelines")
+
+    row = col.row()
+    row.template_list('UI_UL_list', 'vcm_pipelines', settings, 'pipelines',
+                      settings, 'active_pipeline_index', rows=2)
+    sub = row.column(align=True)
+    sub.operator('vertexcolormaster.edit_pipeline', text="", icon='ADD').action = 'ADD'
+    sub.operator('vertexcolormaster.edit_pipeline', text="", icon='REMOVE').action = 'REMOVE'
+
+    index = settings.active_pipeline_index
+    if not 0 <= index < len(settings.pipelines):
+        return None
+    pipeline = settings.pipelines[index]
+
+    for step_index, step in enumerate(pipeline.steps):
+        box = layout.box()
+        col = box.column(align=True)
+        row = col.row(align=True)
+        row.prop(step, 'op', text="")
+        op = row.operator('vertexcolormaster.edit_pipeline', text="", icon='TRIA_UP')
+        op.action = 'MOVE_STEP_UP'
+        op.step_index = step_index
+        op = row.operator('vertexcolormaster.edit_pipeline', text="", icon='TRIA_DOWN')
+        op.action = 'MOVE_STEP_DOWN'
+        op.step_index = step_index
+        op = row.operator('vertexcolormaster.edit_pipeline', text="", icon='X')
+        op.action = 'REMOVE_STEP'
+        op.step_index = step_index
+
+        # channels are ignored in isolate mode
+        if mode == 'STANDARD':
+            row = col.row(align=True)
+            row.prop(step, 'channels', expand=True)
+        if step.op == 'FILL':
+            col.prop(step, 'value', slider=True)
+        elif step.op == 'POSTERIZE':
+            col.prop(step, 'steps')
+        elif step.op == 'REMAP':
+            row = col.row(align=True)
+            row.prop(step, 'min0', text="In Min", slider=True)
+            row.prop(step, 'max0', text="In Max", slider=True)
+            row = col.row(align=True)
+            row.prop(step, 'min1', text="Out Min", slider=True)
+            row.prop(step, 'max1', text="Out Max", slider=True)
+
+    col = layout.column(align=True)
+    row = col.row(align=True)
+    row.operator('vertexcolormaster.edit_pipeline', text="Add Step", icon='ADD').action = 'ADD_STEP'
+    row = col.row(align=True)
+    row.operator('vertexcolormaster.run_pipeline', text="Run Pipeline").pipeline_index = -1
 
 
 def draw_src_dst_operations(context, layout, obj, settings):
@@ -311,7 +382,9 @@ def draw_misc_operations(context, layout, obj, settings, mode='STANDARD', pie=Fa
     col = layout.column(align=True)
     if mode == 'STANDARD':
         row = col.row(align=True)
-        row.operator('paint.vertex_color_hsv', text="Adjust HSV")
+        row.operator('vertexcolormaster.adjust_hsv', text="Adjust HSV")
+        row = col.row(align=True)
+        row.operator('vertexcolormaster.blur_channel', text="Blur Active Channels")
     else:
         row = col.row(align=True)
         row.operator('vertexcolormaster.blur_channel', text="Blur Channel Values")
@@ -321,9 +394,48 @@ def draw_misc_operations(context, layout, obj, settings, mode='STANDARD', pie=Fa
     row.operator('paint.vertex_color_brightness_contrast', text="Brightness/Contrast")
     row = col.row(align=True)
     row.operator('paint.vertex_color_dirt', text="Dirty Vertex Colors")
+    row = col.row(align=True)
+    row.operator('vertexcolormaster.bake_ambient_occlusion', text="Bake Ambient Occlusion")
+    row = col.row(align=True)
+    row.operator('vertexcolormaster.bake_curvature', text="Bake Curvature")
 
     col = layout.column(align=True)
     row = col.row(align=True)
     row.operator('vertexcolormaster.gradient', text="Linear Gradient").circular_gradient = False
     row = col.row(align=True)
     row.operator('vertexcolormaster.gradient', text="Circular Gradient").circular_gradient = True
+    row = col.row(align=True)
+    row.operator('vertexcolormaster.selection_distance_gradient', text="Selection Distance Gradient")
+    if not pie:
+        row = col.row(align=True)
+        row.prop(settings, 'gradient_live_preview', text="Live Preview")
+
+
+def draw_profile_readout(context, layout, settings):
+    col = layout.column(align=True)
+    row = col.row(align=True)
+    row.prop(settings, 'profile_operations', toggle=True)
+    if not settings.profile_operations:
+        return
+    row = col.row(align=True)
+    row.prop(settings, 'profile_log_path', text="")
+
+    if not profile_log:
+        col.label(text="No operations recorded")
+        return
+
+    # the most recent operation
+    record = profile_log[-1]
+    col = layout.column(align=True)
+    col.label(text="{0}: {1:.1f} ms".format(record['operation'], record['seconds'] * 1000.0))
+    col.label(text="{0:,} loops, {1:,} verts, {2:,.0f} loops/s".format(
+        record['loops'], record['vertices'], record['loops_per_second']))
+    for phase in profile_phases:
+        seconds = record['phases'][phase]
+        share = seconds / record['seconds'] if record['seconds'] > 0.0 else 0.0
+        row = col.row(align=True)
+        row.label(text=phase.capitalize())
+        row.label(text="{0:.1f} ms ({1:.0%})".format(seconds * 1000.0, share))
+    if record['peak_bytes'] is not None:
+        col.label(text="Peak memory: {0:.1f} MB".format(record['peak_bytes'] / (1024.0 * 1024.0)))
+    col.label(text="{0} operations in log".format(len(profile_log)))
@@ -25,22 +25,36 @@ from .vcm_helpers import *
 from mathutils import Color, Vector, Matrix
 
 # import copy # for copying data structures
-import bmesh # for random color to mesh islands
 import random # for random color to mesh islands
+from functools import partial, wraps
+import time # for throttling the gradient preview
 
-# # for gradient tool
-import gpu # used for drawing lines
-from gpu_extras.batch import batch_for_shader
-from bpy_extras import view3d_utils
+# Shaders for drawing the gradient line. gpu is only imported and the shaders created
+# the first time the line is drawn, as there is no GPU context when running in the
+# background, and registering the add-on shouldn't have to wait for shader compilation
+gradient_shaders = {}
+
+
+def get_gradient_shaders():
+    if not gradient_shaders:
+        import gpu
+        new_names = bpy.app.version >= (4, 0)
+        gradient_shaders['line'] = gpu.shader.from_builtin('SMOOTH_COLOR' if new_names else '2D_SMOOTH_COLOR')
+        gradient_shaders['circle'] = gpu.shader.from_builtin('UNIFORM_COLOR' if new_names else '2D_UNIFORM_COLOR')
+    return gradient_shaders['line'], gradient_shaders['circle']
+
+
+def draw_gradient_callback(self, context, line_params, circular):
+    from gpu_extras.batch import batch_for_shader
+    line_shader, circle_shader = get_gradient_shaders()
 
-def draw_gradient_callback(self, context, line_params, line_shader, circle_shader):
     line_batch = batch_for_shader(line_shader, 'LINES', {
         "pos": line_params["coords"],
         "color": line_params["colors"]})
     line_shader.bind()
     line_batch.draw(line_shader)
 
-    if circle_shader is not None:
+    if circular:
         a = line_params["coords"][0]
         b = line_params["coords"][1]
         radius = (b - a).length
@@ -58,6 +72,26 @@ def draw_gradient_callback(self, context, line_params, line_shader, circle_shade
         circle_batch.draw(circle_shader)
 
 
+def profiled(func):
+    # record an operator method in the profile log, when profiling is enabled
+    @wraps(func)
+    def wrapper(self, context, *args, **kwargs):
+        settings = context.scene.vertex_color_master_settings
+        if not settings.profile_operations:
+            return func(self, context, *args, **kwargs)
+
+        with profile_operation(self.bl_label) as record:
+            result = func(self, context, *args, **kwargs)
+        if settings.profile_log_path:
+            try:
+                write_profile_record(settings.profile_log_path, record)
+            except OSError as e:
+                self.report({'WARNING'}, "Could not write profile log: {0}".format(e))
+        return result
+
+    return wrapper
+
+
 # This function from a script by Bartosz Styperek with modifications by me
 # Circular gradient based on code submitted by RylauChelmi
 class VERTEXCOLORMASTER_OT_Gradient(bpy.types.Operator):
@@ -68,9 +102,7 @@ class VERTEXCOLORMASTER_OT_Gradient(bpy.types.Operator):
     bl_options = {"REGISTER", "UNDO"}
 
     _handle = None
-
-    line_shader = gpu.shader.from_builtin('SMOOTH_COLOR' if bpy.app.version >= (4,0) else '2D_SMOOTH_COLOR')
-    circle_shader = gpu.shader.from_builtin('UNIFORM_COLOR' if bpy.app.version >= (4,0) else '2D_UNIFORM_COLOR')
+    _preview = None
 
     start_color: FloatVectorProperty(
         name="Start Color",
@@ -103,100 +135,87 @@ class VERTEXCOLORMASTER_OT_Gradient(bpy.types.Operator):
         obj = context.active_object
         return obj is not None and obj.mode == 'VERTEX_PAINT' and obj.type == 'MESH'
 
+    @profiled
     def paintVerts(self, context, start_point, end_point, start_color, end_color, circular_gradient=False, use_hue_blend=False):
         region = context.region
         rv3d = context.region_data
 
         obj = context.active_object
         mesh = obj.data
+        vcol = get_or_create_active_color_layer(mesh)
 
-        # Create a new bmesh to work with
-        bm = bmesh.new()
-        bm.from_mesh(mesh)
-        bm.verts.ensure_lookup_table()
+        # Project all vertices to 2d view space at once and find the loops to paint
+        matrix = rv3d.perspective_matrix @ obj.matrix_world
+        points, loop_indices, loop_points = get_gradient_targets(mesh, matrix, region.width, region.height,
+                                                                 get_layer_domain(vcol))
 
-        # List of structures containing 3d vertex and project 2d position of vertex
-        vertex_data = None # Will contain vert, and vert coordinates in 2d view space
-        if mesh.use_paint_mask_vertex: # Face masking not currently supported
-            vertex_data = [(v, view3d_utils.location_3d_to_region_2d(region, rv3d, obj.matrix_world @ v.co)) for v in bm.verts if v.select]
-        else:
-            vertex_data = [(v, view3d_utils.location_3d_to_region_2d(region, rv3d, obj.matrix_world @ v.co)) for v in bm.verts]
-
-        # Vertex transformation math
-        down_vector = Vector((0, -1, 0))
-        direction_vector = Vector((end_point.x - start_point.x, end_point.y - start_point.y, 0)).normalized()
-        rotation = direction_vector.rotation_difference(down_vector)
-
-        translation_matrix = Matrix.Translation(Vector((-start_point.x, -start_point.y, 0)))
-        inverse_translation_matrix = translation_matrix.inverted()
-        rotation_matrix = rotation.to_matrix().to_4x4()
-        combinedMat = inverse_translation_matrix @ rotation_matrix @ translation_matrix
-
-        transStart = combinedMat @ start_point.to_4d() # Transform drawn line : rotate it to align to horizontal line
-        transEnd = combinedMat @ end_point.to_4d()
-        minY = transStart.y
-        maxY = transEnd.y
-        heightTrans = maxY - minY  # Get the height of transformed vector
-
-        transVector = transEnd - transStart
-        transLen = transVector.length
-
-        # Calculate hue, saturation and value shift for blending
-        if use_hue_blend:
-            start_color = Color(start_color[:3])
-            end_color = Color(end_color[:3])
-            c1_hue = start_color.h
-            c2_hue = end_color.h
-            hue_separation = c2_hue - c1_hue
-            if hue_separation > 0.5:
-                hue_separation = hue_separation - 1
-            elif hue_separation < -0.5:
-                hue_separation = hue_separation + 1
-            c1_sat = start_color.s
-            sat_separation = end_color.s - c1_sat
-            c1_val = start_color.v
-            val_separation = end_color.v - c1_val
-
-        color_layer = bm.loops.layers.color.active
-
-        for data in vertex_data:
-            vertex = data[0]
-            vertCo4d = Vector((data[1].x, data[1].y, 0))
-            transVec = combinedMat @ vertCo4d
-
-            t = 0
-
-            if circular_gradient:
-                curVector = transVec.to_4d() - transStart
-                curLen = curVector.length
-                t = abs(max(min(curLen / transLen, 1), 0))
-            else:
-                t = abs(max(min((transVec.y - minY) / heightTrans, 1), 0))
-
-            color = Color((1, 0, 0))
-            if use_hue_blend:
-                # Hue wraps, and fmod doesn't work with negative values
-                color.h = fmod(1.0 + c1_hue + hue_separation * t, 1.0) 
-                color.s = c1_sat + sat_separation * t
-                color.v = c1_val + val_separation * t
-            else:
-                color.r = start_color[0] + (end_color[0] - start_color[0]) * t
-                color.g = start_color[1] + (end_color[1] - start_color[1]) * t
-                color.b = start_color[2] + (end_color[2] - start_color[2]) * t
+        colors = get_color_array(vcol)
+        paint_gradient(colors, points, loop_indices, loop_points, start_point, end_point,
+                       start_color, end_color, circular_gradient, use_hue_blend)
+        set_color_array(vcol, colors)
+        update_mesh(mesh)
 
-            if mesh.use_paint_mask: # Masking by face
-                face_loops = [loop for loop in vertex.link_loops if loop.face.select] # Get only loops that belong to selected faces
-            else: # Masking by verts or no masking at all
-                face_loops = [loop for loop in vertex.link_loops] # Get remaining vert loops
-
-            for loop in face_loops:
-                new_color = loop[color_layer]
-                new_color[:3] = color
-                loop[color_layer] = new_color
+    def get_paint_colors(self, context, start_color, end_color):
+        # Use color gradient or force grayscale in isolate mode
+        isolate = get_isolated_channel_ids(get_active_color_layer(context.active_object.data))
+        use_hue_blend = self.use_hue_blend
+        if isolate is not None:
+            start_color = [rgb_to_luminosity(start_color)] * 3
+            end_color = [rgb_to_luminosity(end_color)] * 3
+            use_hue_blend = False
+        return start_color, end_color, use_hue_blend
 
-        bm.to_mesh(mesh)
-        bm.free()
-        bpy.ops.object.mode_set(mode='VERTEX_PAINT')
+    def begin_preview(self, context):
+        # The original colors are kept so they can be restored on cancel, and the
+        # vertex projection is cached so mouse moves only recalculate the gradient
+        mesh = context.active_object.data
+        vcol = get_or_create_active_color_layer(mesh)
+        original_colors = get_color_array(vcol)
+        self._preview = {
+            "mesh": mesh,
+            "vcol": vcol,
+            "original_colors": original_colors,
+            "colors": original_colors.copy(),
+            "targets": None,
+            "last_update": 0.0,
+        }
+
+    def update_preview(self, context, force=False):
+        preview = self._preview
+        settings = context.scene.vertex_color_master_settings
+        now = time.perf_counter()
+        if not force and now - preview["last_update"] < settings.gradient_preview_frame_time:
+            return
+
+        if preview["targets"] is None:
+            region = context.region
+            matrix = context.region_data.perspective_matrix @ context.active_object.matrix_world
+            preview["targets"] = get_gradient_targets(preview["mesh"], matrix, region.width, region.height,
+                                                      get_layer_domain(preview["vcol"]))
+
+        start_point, end_point = self.line_params["coords"]
+        if end_point != start_point:
+            start_color, end_color, use_hue_blend = self.get_paint_colors(
+                context, self.line_params["colors"][0], self.line_params["colors"][1])
+            points, loop_indices, loop_points = preview["targets"]
+            paint_gradient(preview["colors"], points, loop_indices, loop_points, start_point, end_point,
+                           start_color, end_color, self.circular_gradient, use_hue_blend)
+            set_color_array(preview["vcol"], preview["colors"])
+            update_mesh(preview["mesh"])
+
+        preview["last_update"] = time.perf_counter()
+
+    @profiled
+    def finish_preview(self, context):
+        self.update_preview(context, force=True)
+        self.end_preview()
+
+    def end_preview(self, restore=False):
+        preview = self._preview
+        self._preview = None
+        if preview is not None and restore:
+            set_color_array(preview["vcol"], preview["original_colors"])
+            update_mesh(preview["mesh"])
 
     def axis_snap(self, start, end, delta):
         if start.x - delta < end.x < start.x + delta:
@@ -224,9 +243,11 @@ class VERTEXCOLORMASTER_OT_Gradient(bpy.types.Operator):
                                brush.secondary_color[:] + (1.0,)],
                     "width": 1, # currently does nothing
                 }
-                args = (self, context, self.line_params, self.line_shader,
-                    (self.circle_shader if self.circular_gradient else None))
+                args = (self, context, self.line_params, self.circular_gradient)
                 self._handle = bpy.types.SpaceView3D.draw_handler_add(draw_gradient_callback, args, 'WINDOW', 'POST_PIXEL')
+
+                if context.scene.vertex_color_master_settings.gradient_live_preview:
+                    self.begin_preview(context)
         else:
             # Update or confirm gradient end point
             if event.type in {'MOUSEMOVE', 'LEFTMOUSE'}:
@@ -248,27 +269,34 @@ class VERTEXCOLORMASTER_OT_Gradient(bpy.types.Operator):
                     if end_point == start_point:
                         return {'CANCELLED'}
 
-                    # Use color gradient or force grayscale in isolate mode
-                    start_color = line_params["colors"][0]
-                    end_color = line_params["colors"][1]
-                    isolate = get_isolated_channel_ids(context.active_object.data.vertex_colors.active)
-                    use_hue_blend = self.use_hue_blend
-                    if isolate is not None:
-                        start_color = [rgb_to_luminosity(start_color)] * 3
-                        end_color = [rgb_to_luminosity(end_color)] * 3
-                        use_hue_blend = False
+                    if self._preview is not None:
+                        # The preview already has the projected vertices, so just do a final update
+                        self.finish_preview(context)
+                        return {'FINISHED'}
 
+                    start_color, end_color, use_hue_blend = self.get_paint_colors(
+                        context, line_params["colors"][0], line_params["colors"][1])
                     self.paintVerts(context, start_point, end_point, start_color, end_color, self.circular_gradient, use_hue_blend)
-                    return {'FINISHED'}            
+                    return {'FINISHED'}
+
+                if self._preview is not None:
+                    self.update_preview(context)
 
         # Allow camera navigation
         if event.type in {'MIDDLEMOUSE', 'WHEELUPMOUSE', 'WHEELDOWNMOUSE'}:
+            # The view changes, so the cached vertex projection is no longer valid. The
+            # gradient is repainted from the original colors, as loops that are no longer
+            # targets would otherwise keep the old preview colors
+            if self._preview is not None:
+                self._preview["targets"] = None
+                self._preview["colors"][:] = self._preview["original_colors"]
             return {'PASS_THROUGH'}
 
         if event.type in {'RIGHTMOUSE', 'ESC'}:
             if self._handle is not None:
                 bpy.types.SpaceView3D.draw_handler_remove(self._handle, 'WINDOW')
                 self._handle = None
+            self.end_preview(restore=True)
             return {'CANCELLED'}
 
         # Keep running until completed or cancelled
@@ -277,16 +305,7 @@ class VERTEXCOLORMASTER_OT_Gradient(bpy.types.Operator):
     def execute(self, context):
         start_point = self.line_params["coords"][0]
         end_point = self.line_params["coords"][1]
-        start_color = self.start_color
-        end_color = self.end_color
-
-        # Use color gradient or force grayscale in isolate mode
-        isolate = get_isolated_channel_ids(context.active_object.data.vertex_colors.active)
-        use_hue_blend = self.use_hue_blend
-        if isolate is not None:
-            start_color = [rgb_to_luminosity(start_color)] * 3
-            end_color = [rgb_to_luminosity(end_color)] * 3
-            use_hue_blend = False
+        start_color, end_color, use_hue_blend = self.get_paint_colors(context, self.start_color, self.end_color)
 
         self.paintVerts(context, start_point, end_point, start_color, end_color, self.circular_gradient, use_hue_blend)
 
@@ -294,6 +313,7 @@ class VERTEXCOLORMASTER_OT_Gradient(bpy.types.Operator):
 
     def invoke(self, context, event):
         if context.area.type == 'VIEW_3D':
+            self._preview = None
             context.window_manager.modal_handler_add(self)
             return {'RUNNING_MODAL'}
         else:
@@ -400,60 +420,47 @@ class VERTEXCOLORMASTER_OT_RandomizeMeshIslandColors(bpy.types.Operator):
         obj = context.active_object
         return obj is not None and obj.mode == 'VERTEX_PAINT' and obj.type == 'MESH'
 
+    @profiled
     def execute(self, context):
-        mesh = context.active_object.data
+        settings = context.scene.vertex_color_master_settings
         random.seed(self.random_seed)
 
-        bpy.ops.object.mode_set(mode='EDIT', toggle=False)
+        for mesh, vcol in get_batch_targets(context, settings.batch_selected_objects):
+            self.randomize_island_colors(mesh, vcol)
 
-        bm = bmesh.from_edit_mesh(mesh)
-        bm.faces.ensure_lookup_table()
-        color_layer = bm.loops.layers.color.active
+        return {'FINISHED'}
 
+    def randomize_island_colors(self, mesh, vcol):
         # Find all islands in the mesh
-        mesh_islands = []
-        selected_faces = ([f for f in bm.faces if f.select])
-        faces = selected_faces if mesh.use_paint_mask or mesh.use_paint_mask_vertex else bm.faces
-
-        bpy.ops.mesh.select_all(action="DESELECT")
-
-        while len(faces) > 0:
-            # Select linked faces to find island
-            faces[0].select_set(True)
-            bpy.ops.mesh.select_linked()
-            mesh_islands.append([f for f in faces if f.select])
-            # Hide the island and update faces
-            bpy.ops.mesh.hide(unselected=False)
-            faces = [f for f in faces if not f.hide]
-
-        bpy.ops.mesh.reveal()  
+        loop_indices, loop_islands, face_counts = get_selected_islands(mesh)
+        island_count = len(face_counts)
 
-        island_colors = {} # Island face count : Random color pairs
+        island_colors = [] # Color per island
+        colors_by_face_count = {} # Island face count : Random color pairs
 
         # Used for setting hue with order based color assignment
-        separationDiff = 1.0 if len(mesh_islands) == 0 else 1.0 / len(mesh_islands)
+        separationDiff = 1.0 if island_count == 0 else 1.0 / island_count
 
         # If we are in isolate mode, this is used to force greyscale
-        isolate = get_isolated_channel_ids(context.active_object.data.vertex_colors.active)
+        isolate = get_isolated_channel_ids(vcol)
 
-        for index, island in enumerate(mesh_islands):
+        for index, face_count in enumerate(face_counts.tolist()):
             color = Color((1, 0, 0)) # (0, 1, 1) HSV
 
             # Determine color based on settings
             if self.merge_similar:
-                face_count = len(island)
-                if face_count in island_colors.keys():
-                    color = island_colors[face_count]
+                if face_count in colors_by_face_count:
+                    color = colors_by_face_count[face_count]
                 else:
                     if isolate is not None:
                         v = random.random()
                         color = Color((v, v, v))
-                        island_colors[face_count] = color
+                        colors_by_face_count[face_count] = color
                     else:
                         color.h = random.random() if self.randomize_hue else self.base_hue
                         color.s = random.random() if self.randomize_saturation else self.base_saturation
                         color.v = random.random() if self.randomize_value else self.base_value
-                        island_colors[face_count] = color
+                        colors_by_face_count[face_count] = color
             else:
                 if isolate is not None:
                     v = index * separationDiff if self.order_based else random.random()
@@ -468,21 +475,10 @@ class VERTEXCOLORMASTER_OT_RandomizeMeshIslandColors(bpy.types.Operator):
                         color.s = random.random() if self.randomize_saturation else self.base_saturation
                         color.v = random.random() if self.randomize_value else self.base_value
 
-            # Set island face colors
-            for face in island:
-                for loop in face.loops:
-                    new_color = loop[color_layer]
-                    new_color[:3] = color
-                    loop[color_layer] = new_color
-
-        # Restore selection
-        for f in selected_faces:
-            f.select = True
-
-        bm.free()
-        bpy.ops.object.mode_set(mode='VERTEX_PAINT', toggle=False)
+            island_colors.append(color[:] + (1.0,))
 
-        return {'FINISHED'}
+        # Set island face colors (alpha is preserved)
+        set_island_colors(mesh, vcol, loop_indices, loop_islands, island_colors, [True, True, True, False])
 
 
 class VERTEXCOLORMASTER_OT_RandomizeMeshIslandColorsPerChannel(bpy.types.Operator):
@@ -554,27 +550,41 @@ class VERTEXCOLORMASTER_OT_RandomizeMeshIslandColorsPerChannel(bpy.types.Operato
         self.active_channels = settings.active_channels
         return self.execute(context)
 
+    @profiled
     def execute(self, context):
-        obj = context.active_object
-        mesh = obj.data
-        isolate = get_isolated_channel_ids(mesh.vertex_colors.active)
+        settings = context.scene.vertex_color_master_settings
+        mesh = context.active_object.data
+        vcol = get_active_color_layer(mesh)
+        isolate = get_isolated_channel_ids(vcol) if vcol is not None else None
         if isolate is not None:
             self.report({'ERROR'}, "Randomise Islands Per Channel does not work in isolate mode")
             return {'CANCELLED'}
 
         rgba_mask = get_active_channel_mask(self.active_channels)
         random.seed(self.random_seed)
-        set_island_colors_per_channel(mesh, rgba_mask, self.merge_similar, self.value_min, self.value_max)
+        for mesh, vcol in get_batch_targets(context, settings.batch_selected_objects):
+            # other objects may have an isolated layer active as well
+            if get_isolated_channel_ids(vcol) is None:
+                set_island_colors_per_channel(mesh, vcol, rgba_mask, self.merge_similar,
+                                              self.value_min, self.value_max)
 
         return {'FINISHED'}
 
 
 class VERTEXCOLORMASTER_OT_BlurChannel(bpy.types.Operator):
-    """Blur values of a particular channel"""
+    """Blur values of the active channel(s)"""
     bl_idname = 'vertexcolormaster.blur_channel'
     bl_label = 'VCM Blur Channel'
     bl_options = {'REGISTER', 'UNDO'}
 
+    active_channels: EnumProperty(
+        name="Active Channels",
+        options={'ENUM_FLAG'},
+        items=channel_items,
+        description="Which channels to enable.",
+        default={'R', 'G', 'B'},
+    )
+
     factor: FloatProperty(
         name="Factor",
         description="Amount of blur to apply.",
@@ -599,40 +609,336 @@ class VERTEXCOLORMASTER_OT_BlurChannel(bpy.types.Operator):
         max=1.0
     ) 
 
+    keep_seams: BoolProperty(
+        name="Keep Seams",
+        description="Keep the color differences between faces that share a vertex instead of blending them.",
+        default=False
+    )
+
+    isolate_mode: BoolProperty(
+        default=False,
+    )
+
+    def draw(self, context):
+        layout = self.layout
+
+        if not self.isolate_mode:
+            col = layout.column()
+            row = col.row(align=True)
+            row.prop(self, 'active_channels')
+
+        layout.prop(self, 'factor', slider=True)
+        layout.prop(self, 'iterations')
+        layout.prop(self, 'expand', slider=True)
+        layout.prop(self, 'keep_seams')
+
+    @classmethod
+    def poll(cls, context):
+        obj = context.active_object
+        return obj is not None and obj.mode == 'VERTEX_PAINT' and obj.type == 'MESH'
+
+    def invoke(self, context, event):
+        settings = context.scene.vertex_color_master_settings
+
+        mesh = context.active_object.data
+        vcol = get_or_create_active_color_layer(mesh)
+        self.isolate_mode = True if get_isolated_channel_ids(vcol) is not None else False
+        self.active_channels = settings.active_channels if not self.isolate_mode else {'R', 'G', 'B'}
+
+        return self.execute(context)
+
+    @profiled
+    def execute(self, context):
+        mesh = context.active_object.data
+        vcol = get_or_create_active_color_layer(mesh)
+
+        rgba_mask = get_active_channel_mask(self.active_channels)
+        blur_channels(mesh, vcol, rgba_mask, self.factor, self.iterations, self.expand, self.keep_seams)
+
+        return {'FINISHED'}
+
+
+class VERTEXCOLORMASTER_OT_BakeAmbientOcclusion(bpy.types.Operator):
+    """Bake ambient occlusion of the mesh to the active channel(s)"""
+    bl_idname = 'vertexcolormaster.bake_ambient_occlusion'
+    bl_label = 'VCM Bake Ambient Occlusion'
+    bl_options = {'REGISTER', 'UNDO'}
+
+    active_channels: EnumProperty(
+        name="Active Channels",
+        options={'ENUM_FLAG'},
+        items=channel_items,
+        description="Which channels to enable.",
+        default={'R', 'G', 'B'},
+    )
+
+    samples: IntProperty(
+        name="Samples",
+        description="Number of rays cast from each vertex or face corner.",
+        default=8,
+        min=1,
+        max=256
+    )
+
+    distance: FloatProperty(
+        name="Distance",
+        description="Distance in object space within which geometry occludes.",
+        default=1.0,
+        min=0.0001,
+        subtype='DISTANCE'
+    )
+
+    bias: FloatProperty(
+        name="Bias",
+        description="Offset of the ray origins along the normal, to avoid the surface occluding itself.",
+        default=0.001,
+        min=0.0,
+        subtype='DISTANCE'
+    )
+
+    per_loop: BoolProperty(
+        name="Per Face Corner",
+        description="Cast rays from each face corner using split normals instead of from each vertex. Slower, but keeps hard edges.",
+        default=False
+    )
+
+    smooth_iterations: IntProperty(
+        name="Smooth",
+        description="Number of times the per vertex occlusion is blurred, to reduce noise from low sample counts.",
+        default=3,
+        min=0,
+        max=20
+    )
+
+    seed: IntProperty(
+        name="Seed",
+        description="Seed of the random ray rotations.",
+        default=0,
+        min=0
+    )
+
+    isolate_mode: BoolProperty(
+        default=False,
+    )
+
+    def draw(self, context):
+        layout = self.layout
+
+        if not self.isolate_mode:
+            col = layout.column()
+            row = col.row(align=True)
+            row.prop(self, 'active_channels')
+
+        layout.prop(self, 'samples')
+        layout.prop(self, 'distance')
+        layout.prop(self, 'bias')
+        layout.prop(self, 'per_loop')
+        row = layout.row()
+        row.prop(self, 'smooth_iterations')
+        row.enabled = not self.per_loop
+        layout.prop(self, 'seed')
+
     @classmethod
     def poll(cls, context):
         obj = context.active_object
         return obj is not None and obj.mode == 'VERTEX_PAINT' and obj.type == 'MESH'
 
+    def invoke(self, context, event):
+        settings = context.scene.vertex_color_master_settings
+
+        mesh = context.active_object.data
+        vcol = get_or_create_active_color_layer(mesh)
+        self.isolate_mode = True if get_isolated_channel_ids(vcol) is not None else False
+        self.active_channels = settings.active_channels if not self.isolate_mode else {'R', 'G', 'B'}
+
+        return self.execute(context)
+
+    @profiled
     def execute(self, context):
         obj = context.active_object
-        mesh = obj.data
-        vcol = mesh.vertex_colors.active if mesh.vertex_colors else mesh.vertex_colors.new()
-        isolate = get_isolated_channel_ids(vcol)
+        vcol = get_or_create_active_color_layer(obj.data)
 
-        if isolate is None:
-            self.report({'ERROR'}, "Blur only works with an isolated channel")
-            return {'CANCELLED'}
+        rgba_mask = get_active_channel_mask(self.active_channels)
+        bake_ambient_occlusion(obj, vcol, rgba_mask, self.samples, self.distance, self.bias, self.per_loop,
+                               self.smooth_iterations, self.seed)
+
+        return {'FINISHED'}
+
+
+class VERTEXCOLORMASTER_OT_BakeCurvature(bpy.types.Operator):
+    """Bake mesh convexity or curvature to the active channel(s)"""
+    bl_idname = 'vertexcolormaster.bake_curvature'
+    bl_label = 'VCM Bake Curvature'
+    bl_options = {'REGISTER', 'UNDO'}
+
+    active_channels: EnumProperty(
+        name="Active Channels",
+        options={'ENUM_FLAG'},
+        items=channel_items,
+        description="Which channels to enable.",
+        default={'R', 'G', 'B'},
+    )
+
+    mode: EnumProperty(
+        name="Mode",
+        items=curvature_mode_items,
+        description="How the curvature of each vertex is measured."
+    )
+
+    output: EnumProperty(
+        name="Output",
+        items=curvature_output_items,
+        description="Which parts of the curvature are written."
+    )
+
+    angle_range: FloatProperty(
+        name="Angle Range",
+        description="Angle between faces that gives the brightest (or darkest) value.",
+        default=math.pi / 2.0,
+        min=math.radians(1.0),
+        max=math.pi,
+        subtype='ANGLE'
+    )
+
+    smooth_iterations: IntProperty(
+        name="Smooth",
+        description="Number of times the result is blurred over the mesh.",
+        default=1,
+        min=0,
+        max=100
+    )
+
+    isolate_mode: BoolProperty(
+        default=False,
+    )
+
+    def draw(self, context):
+        layout = self.layout
+
+        if not self.isolate_mode:
+            col = layout.column()
+            row = col.row(align=True)
+            row.prop(self, 'active_channels')
+
+        layout.prop(self, 'mode')
+        row = layout.row()
+        row.prop(self, 'output', expand=True)
+        row = layout.row()
+        row.prop(self, 'angle_range')
+        row.enabled = self.mode == 'CONVEXITY'
+        layout.prop(self, 'smooth_iterations')
+
+    @classmethod
+    def poll(cls, context):
+        obj = context.active_object
+        return obj is not None and obj.mode == 'VERTEX_PAINT' and obj.type == 'MESH'
+
+    def invoke(self, context, event):
+        settings = context.scene.vertex_color_master_settings
+
+        mesh = context.active_object.data
+        vcol = get_or_create_active_color_layer(mesh)
+        self.isolate_mode = True if get_isolated_channel_ids(vcol) is not None else False
+        self.active_channels = settings.active_channels if not self.isolate_mode else {'R', 'G', 'B'}
+
+        return self.execute(context)
+
+    @profiled
+    def execute(self, context):
+        mesh = context.active_object.data
+        vcol = get_or_create_active_color_layer(mesh)
+
+        rgba_mask = get_active_channel_mask(self.active_channels)
+        bake_curvature(mesh, vcol, rgba_mask, self.mode, self.output, self.angle_range, self.smooth_iterations)
+
+        return {'FINISHED'}
+
+
+class VERTEXCOLORMASTER_OT_SelectionDistanceGradient(bpy.types.Operator):
+    """Paint a gradient based on the distance from the faces or vertices selected with the paint mask"""
+    bl_idname = 'vertexcolormaster.selection_distance_gradient'
+    bl_label = 'VCM Selection Distance Gradient'
+    bl_options = {'REGISTER', 'UNDO'}
+
+    active_channels: EnumProperty(
+        name="Active Channels",
+        options={'ENUM_FLAG'},
+        items=channel_items,
+        description="Which channels to enable.",
+        default={'R', 'G', 'B'},
+    )
+
+    distance_mode: EnumProperty(
+        name="Distance",
+        items=distance_mode_items,
+        description="How the distance from the selection is measured."
+    )
+
+    radius: FloatProperty(
+        name="Radius",
+        description="Distance from the selection at which the gradient reaches 0.",
+        default=1.0,
+        min=0.0001,
+        subtype='DISTANCE'
+    )
+
+    falloff: EnumProperty(
+        name="Falloff",
+        items=falloff_items,
+        description="Shape of the gradient between the selection and the radius."
+    )
 
-        vgroup_id = 'vcm_temp_weights'
-        vgroup = obj.vertex_groups.new(name=vgroup_id)
-        obj.vertex_groups.active_index = vgroup.index
+    invert: BoolProperty(
+        name="Invert",
+        description="Paint 0 at the selection and 1 from the radius.",
+        default=False
+    )
 
-        channel_idx = channel_id_to_idx(isolate[1])
-        color_to_weights(obj, vcol, channel_idx, vgroup.index)
+    isolate_mode: BoolProperty(
+        default=False,
+    )
 
-        bpy.ops.object.mode_set(mode='WEIGHT_PAINT', toggle=False)
-        bpy.ops.object.vertex_group_smooth(
-            group_select_mode='ACTIVE',
-            factor=self.factor,
-            repeat=self.iterations,
-            expand=self.expand
-        )
-        bpy.ops.object.mode_set(mode='VERTEX_PAINT', toggle=False)
+    def draw(self, context):
+        layout = self.layout
 
-        weights_to_color(mesh, vgroup.index, vcol, channel_idx, all_channels=True)
+        if not self.isolate_mode:
+            col = layout.column()
+            row = col.row(align=True)
+            row.prop(self, 'active_channels')
 
-        obj.vertex_groups.remove(vgroup)
+        layout.prop(self, 'distance_mode')
+        layout.prop(self, 'radius')
+        layout.prop(self, 'falloff')
+        layout.prop(self, 'invert')
+
+    @classmethod
+    def poll(cls, context):
+        obj = context.active_object
+        return obj is not None and obj.mode == 'VERTEX_PAINT' and obj.type == 'MESH'
+
+    def invoke(self, context, event):
+        settings = context.scene.vertex_color_master_settings
+
+        mesh = context.active_object.data
+        vcol = get_or_create_active_color_layer(mesh)
+        self.isolate_mode = True if get_isolated_channel_ids(vcol) is not None else False
+        self.active_channels = settings.active_channels if not self.isolate_mode else {'R', 'G', 'B'}
+
+        return self.execute(context)
+
+    @profiled
+    def execute(self, context):
+        mesh = context.active_object.data
+        vcol = get_or_create_active_color_layer(mesh)
+
+        if not (mesh.use_paint_mask or mesh.use_paint_mask_vertex):
+            self.report({'ERROR'}, "Enable face or vertex selection masking to select where the gradient starts")
+            return {'CANCELLED'}
+
+        rgba_mask = get_active_channel_mask(self.active_channels)
+        if not paint_distance_falloff(mesh, vcol, rgba_mask, self.distance_mode, self.radius, self.falloff, self.invert):
+            self.report({'ERROR'}, "Nothing is selected to measure the distance from")
+            return {'CANCELLED'}
 
         return {'FINISHED'}
 
@@ -643,22 +949,39 @@ class VERTEXCOLORMASTER_OT_ColorToUVs(bpy.types.Operator):
     bl_label = 'VCM Color to UVs'
     bl_options = {'REGISTER', 'UNDO'}
 
+    u_channel_id: EnumProperty(
+        name="U Channel",
+        items=channel_items,
+        default=red_id,
+        description="Color channel copied to the U coordinate."
+    )
+
+    v_channel_id: EnumProperty(
+        name="V Channel",
+        items=channel_items,
+        default=green_id,
+        description="Color channel copied to the V coordinate."
+    )
+
     @classmethod
     def poll(cls, context):
         obj = context.active_object
         return obj is not None and obj.mode == 'VERTEX_PAINT' and obj.type == 'MESH'
 
+    @profiled
     def execute(self, context):
-        vi = get_validated_input(context, get_src=True, get_dst=True)
+        settings = context.scene.vertex_color_master_settings
+        inputs, error = get_validated_batch_input(context, get_src=True, get_dst=True,
+                                                  use_selected=settings.batch_selected_objects)
 
-        if vi['error'] is not None:
-            self.report({'ERROR'}, vi['error'])
+        if error is not None:
+            self.report({'ERROR'}, error)
             return {'FINISHED'}
 
-        mesh = context.active_object.data
-        u_idx = 0
-        v_idx = 1
-        color_to_uvs(mesh, vi['src_vcol'], vi['dst_uv'], u_idx, v_idx)
+        u_idx = channel_id_to_idx(self.u_channel_id)
+        v_idx = channel_id_to_idx(self.v_channel_id)
+        for obj, vi in inputs:
+            color_to_uvs(obj.data, vi['src_vcol'], vi['dst_uv'], u_idx, v_idx)
 
         return {'FINISHED'}
 
@@ -669,22 +992,46 @@ class VERTEXCOLORMASTER_OT_UVsToColor(bpy.types.Operator):
     bl_label = 'VCM UVs to Color'
     bl_options = {'REGISTER', 'UNDO'}
 
+    u_channel_id: EnumProperty(
+        name="U Channel",
+        items=channel_items,
+        default=red_id,
+        description="Color channel the U coordinate is copied to."
+    )
+
+    v_channel_id: EnumProperty(
+        name="V Channel",
+        items=channel_items,
+        default=green_id,
+        description="Color channel the V coordinate is copied to."
+    )
+
+    wrap_mode: EnumProperty(
+        name="Wrap Mode",
+        items=uv_wrap_mode_items,
+        default='WRAP',
+        description="How UVs outside the 0-1 range are converted to color values."
+    )
+
     @classmethod
     def poll(cls, context):
         obj = context.active_object
         return obj is not None and obj.mode == 'VERTEX_PAINT' and obj.type == 'MESH'
 
+    @profiled
     def execute(self, context):
-        vi = get_validated_input(context, get_src=True, get_dst=True)
+        settings = context.scene.vertex_color_master_settings
+        inputs, error = get_validated_batch_input(context, get_src=True, get_dst=True,
+                                                  use_selected=settings.batch_selected_objects)
 
-        if vi['error'] is not None:
-            self.report({'ERROR'}, vi['error'])
+        if error is not None:
+            self.report({'ERROR'}, error)
             return {'FINISHED'}
 
-        mesh = context.active_object.data
-        u_idx = 0
-        v_idx = 1
-        uvs_to_color(mesh, vi['src_uv'], vi['dst_vcol'], u_idx, v_idx)
+        u_idx = channel_id_to_idx(self.u_channel_id)
+        v_idx = channel_id_to_idx(self.v_channel_id)
+        for obj, vi in inputs:
+            uvs_to_color(obj.data, vi['src_uv'], vi['dst_vcol'], u_idx, v_idx, self.wrap_mode)
 
         return {'FINISHED'}
 
@@ -700,16 +1047,19 @@ class VERTEXCOLORMASTER_OT_NormalsToColor(bpy.types.Operator):
         obj = context.active_object
         return obj is not None and obj.mode == 'VERTEX_PAINT' and obj.type == 'MESH'
 
+    @profiled
     def execute(self, context):
-        vi = get_validated_input(context, get_src=False, get_dst=True)
+        settings = context.scene.vertex_color_master_settings
+        inputs, error = get_validated_batch_input(context, get_src=False, get_dst=True,
+                                                  use_selected=settings.batch_selected_objects)
 
-        if vi['error'] is not None:
-            self.report({'ERROR'}, vi['error'])
+        if error is not None:
+            self.report({'ERROR'}, error)
             return {'FINISHED'}
 
-        obj = context.active_object
-        normals = get_custom_normals(obj)
-        normals_to_color(obj.data, normals, vi['dst_vcol'])
+        for obj, vi in inputs:
+            normals = get_custom_normals(obj)
+            normals_to_color(obj.data, normals, vi['dst_vcol'])
 
         return {'FINISHED'}
 
@@ -725,15 +1075,18 @@ class VERTEXCOLORMASTER_OT_ColorToNormals(bpy.types.Operator):
         obj = context.active_object
         return obj is not None and obj.mode == 'VERTEX_PAINT' and obj.type == 'MESH'
 
+    @profiled
     def execute(self, context):
-        vi = get_validated_input(context, get_src=True, get_dst=False)
+        settings = context.scene.vertex_color_master_settings
+        inputs, error = get_validated_batch_input(context, get_src=True, get_dst=False,
+                                                  use_selected=settings.batch_selected_objects)
 
-        if vi['error'] is not None:
-            self.report({'ERROR'}, vi['error'])
+        if error is not None:
+            self.report({'ERROR'}, error)
             return {'FINISHED'}
 
-        mesh = context.active_object.data
-        color_to_normals(mesh, vi['src_vcol'])
+        for obj, vi in inputs:
+            color_to_normals(obj.data, vi['src_vcol'])
 
         return {'FINISHED'}
 
@@ -749,15 +1102,18 @@ class VERTEXCOLORMASTER_OT_ColorToWeights(bpy.types.Operator):
         obj = context.active_object
         return obj is not None and obj.mode == 'VERTEX_PAINT' and obj.type == 'MESH'
 
+    @profiled
     def execute(self, context):
-        vi = get_validated_input(context, get_src=True, get_dst=True)
+        settings = context.scene.vertex_color_master_settings
+        inputs, error = get_validated_batch_input(context, get_src=True, get_dst=True,
+                                                  use_selected=settings.batch_selected_objects)
 
-        if vi['error'] is not None:
-            self.report({'ERROR'}, vi['error'])
+        if error is not None:
+            self.report({'ERROR'}, error)
             return {'FINISHED'}
 
-        obj = context.active_object
-        color_to_weights(obj, vi['src_vcol'], vi['src_channel_idx'], vi['dst_vgroup_idx'])
+        for obj, vi in inputs:
+            color_to_weights(obj, vi['src_vcol'], vi['src_channel_idx'], vi['dst_vgroup_idx'])
 
         return {'FINISHED'}
 
@@ -773,16 +1129,19 @@ class VERTEXCOLORMASTER_OT_WeightsToColor(bpy.types.Operator):
         obj = context.active_object
         return obj is not None and obj.mode == 'VERTEX_PAINT' and obj.type == 'MESH'
 
+    @profiled
     def execute(self, context):
-        vi = get_validated_input(context, get_src=True, get_dst=True)
+        settings = context.scene.vertex_color_master_settings
+        inputs, error = get_validated_batch_input(context, get_src=True, get_dst=True,
+                                                  use_selected=settings.batch_selected_objects)
 
-        if vi['error'] is not None:
-            self.report({'ERROR'}, vi['error'])
+        if error is not None:
+            self.report({'ERROR'}, error)
             return {'FINISHED'}
 
-        mesh = context.active_object.data
-        weights_to_color(mesh, vi['src_vgroup_idx'],
-                         vi['dst_vcol'], vi['dst_channel_idx'])
+        for obj, vi in inputs:
+            weights_to_color(obj.data, vi['src_vgroup_idx'],
+                             vi['dst_vcol'], vi['dst_channel_idx'])
 
         return {'FINISHED'}
 
@@ -804,16 +1163,19 @@ class VERTEXCOLORMASTER_OT_RgbToGrayscale(bpy.types.Operator):
         obj = context.active_object
         return obj is not None and obj.mode == 'VERTEX_PAINT' and obj.type == 'MESH'
 
+    @profiled
     def execute(self, context):
-        vi = get_validated_input(context, get_src=True, get_dst=True)
+        settings = context.scene.vertex_color_master_settings
+        inputs, error = get_validated_batch_input(context, get_src=True, get_dst=True,
+                                                  use_selected=settings.batch_selected_objects)
 
-        if vi['error'] is not None:
-            self.report({'ERROR'}, vi['error'])
+        if error is not None:
+            self.report({'ERROR'}, error)
             return {'FINISHED'}
 
-        mesh = context.active_object.data
-        convert_rgb_to_luminosity(
-            mesh, vi['src_vcol'], vi['dst_vcol'], vi['dst_channel_idx'], self.all_channels)
+        for obj, vi in inputs:
+            convert_rgb_to_luminosity(
+                obj.data, vi['src_vcol'], vi['dst_vcol'], vi['dst_channel_idx'], self.all_channels)
 
         return {'FINISHED'}
 
@@ -841,16 +1203,19 @@ class VERTEXCOLORMASTER_OT_CopyChannel(bpy.types.Operator):
         obj = context.active_object
         return obj is not None and obj.mode == 'VERTEX_PAINT' and obj.type == 'MESH'
 
+    @profiled
     def execute(self, context):
-        vi = get_validated_input(context, get_src=True, get_dst=True)
+        settings = context.scene.vertex_color_master_settings
+        inputs, error = get_validated_batch_input(context, get_src=True, get_dst=True,
+                                                  use_selected=settings.batch_selected_objects)
 
-        if vi['error'] is not None:
-            self.report({'ERROR'}, vi['error'])
+        if error is not None:
+            self.report({'ERROR'}, error)
             return {'FINISHED'}
 
-        mesh = context.active_object.data
-        copy_channel(mesh, vi['src_vcol'], vi['dst_vcol'], vi['src_channel_idx'],
-                     vi['dst_channel_idx'], self.swap_channels, self.all_channels)
+        for obj, vi in inputs:
+            copy_channel(obj.data, vi['src_vcol'], vi['dst_vcol'], vi['src_channel_idx'],
+                         vi['dst_channel_idx'], self.swap_channels, self.all_channels)
 
         return {'FINISHED'}
 
@@ -874,6 +1239,14 @@ class VERTEXCOLORMASTER_OT_BlendChannels(bpy.types.Operator):
         description="Use this channel instead of the Dst."
     )
 
+    factor: FloatProperty(
+        name="Factor",
+        description="Amount of the blended result to mix with the Dst channel.",
+        default=1.0,
+        min=0.0,
+        max=1.0
+    )
+
     @classmethod
     def poll(cls, context):
         obj = context.active_object
@@ -884,17 +1257,22 @@ class VERTEXCOLORMASTER_OT_BlendChannels(bpy.types.Operator):
         self.result_channel_id = settings.dst_channel_id
         return self.execute(context)
 
+    @profiled
     def execute(self, context):
-        vi = get_validated_input(context, get_src=True, get_dst=True)
+        settings = context.scene.vertex_color_master_settings
+        inputs, error = get_validated_batch_input(context, get_src=True, get_dst=True,
+                                                  use_selected=settings.batch_selected_objects)
 
-        if vi['error'] is not None:
-            self.report({'ERROR'}, vi['error'])
+        if error is not None:
+            self.report({'ERROR'}, error)
             return {'FINISHED'}
 
-        mesh = context.active_object.data
+        # channel indices come from the shared settings, so they are the same for all objects
+        vi = inputs[0][1]
+        targets = [(obj.data, obj_vi['src_vcol'], obj_vi['dst_vcol']) for obj, obj_vi in inputs]
         result_channel_idx = channel_id_to_idx(self.result_channel_id)
-        blend_channels(mesh, vi['src_vcol'], vi['dst_vcol'], vi['src_channel_idx'],
-                       vi['dst_channel_idx'], result_channel_idx, self.blend_mode)
+        blend_channels_batch(targets, vi['src_channel_idx'], vi['dst_channel_idx'], result_channel_idx,
+                             self.blend_mode, self.factor)
 
         return {'FINISHED'}
 
@@ -931,21 +1309,27 @@ class VERTEXCOLORMASTER_OT_Fill(bpy.types.Operator):
         obj = context.active_object
         return obj is not None and obj.mode == 'VERTEX_PAINT' and obj.type == 'MESH'
 
+    @profiled
     def execute(self, context):
         settings = context.scene.vertex_color_master_settings
 
-        mesh = context.active_object.data
-        vcol = mesh.vertex_colors.active if mesh.vertex_colors else mesh.vertex_colors.new()
+        targets = get_batch_targets(context, settings.batch_selected_objects)
+        mesh, vcol = targets[0]
 
         isolate_mode = get_isolated_channel_ids(vcol) is not None
 
         if self.fill_with_color or isolate_mode:
             active_channels = ['R', 'G', 'B']
             color = [self.value] * 4 if isolate_mode else self.fill_color
-            fill_selected(mesh, vcol, color, active_channels)
         else:
+            active_channels = settings.active_channels
             color = [self.value] * 4
-            fill_selected(mesh, vcol, color, settings.active_channels)
+
+        # batches always use the array backend
+        if len(targets) > 1:
+            modify_selected_batch(targets, get_fill_op(color, active_channels), active_channels)
+        else:
+            fill_selected(mesh, vcol, color, active_channels, settings.helper_backend)
 
         return {'FINISHED'}
 
@@ -972,14 +1356,18 @@ class VERTEXCOLORMASTER_OT_Invert(bpy.types.Operator):
         obj = context.active_object
         return obj is not None and obj.mode == 'VERTEX_PAINT' and obj.type == 'MESH'
 
+    @profiled
     def execute(self, context):
         settings = context.scene.vertex_color_master_settings
 
-        mesh = context.active_object.data
-        vcol = mesh.vertex_colors.active if mesh.vertex_colors else mesh.vertex_colors.new()
+        targets = get_batch_targets(context, settings.batch_selected_objects)
+        mesh, vcol = targets[0]
         active_channels = settings.active_channels if get_isolated_channel_ids(vcol) is None else ['R', 'G', 'B']
 
-        invert_selected(mesh, vcol, active_channels)
+        if len(targets) > 1:
+            modify_selected_batch(targets, invert_array, active_channels)
+        else:
+            invert_selected(mesh, vcol, active_channels, settings.helper_backend)
 
         return {'FINISHED'}
 
@@ -1003,17 +1391,21 @@ class VERTEXCOLORMASTER_OT_Posterize(bpy.types.Operator):
         obj = context.active_object
         return obj is not None and obj.mode == 'VERTEX_PAINT' and obj.type == 'MESH'
 
+    @profiled
     def execute(self, context):
         settings = context.scene.vertex_color_master_settings
 
         # using posterize(), 2 steps -> 3 tones, but best to have 2 steps -> 2 tones
         steps = self.steps - 1
 
-        mesh = context.active_object.data
-        vcol = mesh.vertex_colors.active if mesh.vertex_colors else mesh.vertex_colors.new()
+        targets = get_batch_targets(context, settings.batch_selected_objects)
+        mesh, vcol = targets[0]
         active_channels = settings.active_channels if get_isolated_channel_ids(vcol) is None else ['R', 'G', 'B']
 
-        posterize_selected(mesh, vcol, steps, active_channels)
+        if len(targets) > 1:
+            modify_selected_batch(targets, partial(posterize_array, steps=steps), active_channels)
+        else:
+            posterize_selected(mesh, vcol, steps, active_channels, settings.helper_backend)
 
         return {'FINISHED'}
 
@@ -1085,17 +1477,181 @@ class VERTEXCOLORMASTER_OT_Remap(bpy.types.Operator):
         settings = context.scene.vertex_color_master_settings
 
         mesh = context.active_object.data
-        vcol = mesh.vertex_colors.active if mesh.vertex_colors else mesh.vertex_colors.new()
+        vcol = get_or_create_active_color_layer(mesh)
         self.isolate_mode = True if get_isolated_channel_ids(vcol) is not None else False
         self.active_channels = settings.active_channels if not self.isolate_mode else {'R', 'G', 'B'}
         
         return self.execute(context)
 
+    @profiled
     def execute(self, context):
-        mesh = context.active_object.data
-        vcol = mesh.vertex_colors.active if mesh.vertex_colors else mesh.vertex_colors.new()
+        settings = context.scene.vertex_color_master_settings
+
+        targets = get_batch_targets(context, settings.batch_selected_objects)
+        mesh, vcol = targets[0]
 
-        remap_selected(mesh, vcol, self.min0, self.max0, self.min1, self.max1, self.active_channels)
+        if len(targets) > 1:
+            op = partial(remap_array, min0=self.min0, max0=self.max0, min1=self.min1, max1=self.max1)
+            modify_selected_batch(targets, op, self.active_channels)
+        else:
+            remap_selected(mesh, vcol, self.min0, self.max0, self.min1, self.max1, self.active_channels,
+                           settings.helper_backend)
+
+        return {'FINISHED'}
+
+
+class VERTEXCOLORMASTER_OT_AdjustHSV(bpy.types.Operator):
+    """Adjust the hue, saturation and value of the vertex colors"""
+    bl_idname = 'vertexcolormaster.adjust_hsv'
+    bl_label = 'VCM Adjust HSV'
+    bl_options = {'REGISTER', 'UNDO'}
+
+    hue: FloatProperty(
+        name="Hue",
+        description="Amount to shift the hue by (or the hue to use when colorizing).",
+        default=0.0,
+        min=-0.5,
+        max=0.5
+    )
+
+    saturation: FloatProperty(
+        name="Saturation",
+        description="Amount to add to the saturation.",
+        default=0.0,
+        min=-1.0,
+        max=1.0
+    )
+
+    value: FloatProperty(
+        name="Value",
+        description="Amount to add to the value.",
+        default=0.0,
+        min=-1.0,
+        max=1.0
+    )
+
+    colorize: BoolProperty(
+        name="Colorize",
+        description="Set the hue of all colors instead of shifting it.",
+        default=False
+    )
+
+    @classmethod
+    def poll(cls, context):
+        obj = context.active_object
+        return obj is not None and obj.mode == 'VERTEX_PAINT' and obj.type == 'MESH'
+
+    @profiled
+    def execute(self, context):
+        settings = context.scene.vertex_color_master_settings
+
+        targets = get_batch_targets(context, settings.batch_selected_objects)
+        mesh, vcol = targets[0]
+
+        if len(targets) > 1:
+            op = get_adjust_hsv_op(self.hue, self.saturation, self.value, self.colorize)
+            modify_selected_batch(targets, op, ['R', 'G', 'B'])
+        else:
+            adjust_hsv(mesh, vcol, self.hue, self.saturation, self.value, self.colorize, settings.helper_backend)
+
+        return {'FINISHED'}
+
+    def draw(self, context):
+        layout = self.layout
+
+        layout.prop(self, 'hue', slider=True)
+        layout.prop(self, 'saturation', slider=True)
+        layout.prop(self, 'value', slider=True)
+        layout.prop(self, 'colorize')
+
+
+class VERTEXCOLORMASTER_OT_RunPipeline(bpy.types.Operator):
+    """Apply the channel operations of a saved pipeline in order, with a single update of the mesh"""
+    bl_idname = 'vertexcolormaster.run_pipeline'
+    bl_label = 'VCM Run Pipeline'
+    bl_options = {'REGISTER', 'UNDO'}
+
+    pipeline_index: IntProperty(
+        name="Pipeline",
+        description="Index of the saved pipeline to run (-1 runs the active pipeline).",
+        default=-1,
+        min=-1
+    )
+
+    @classmethod
+    def poll(cls, context):
+        obj = context.active_object
+        return obj is not None and obj.mode == 'VERTEX_PAINT' and obj.type == 'MESH'
+
+    @profiled
+    def execute(self, context):
+        settings = context.scene.vertex_color_master_settings
+
+        index = settings.active_pipeline_index if self.pipeline_index < 0 else self.pipeline_index
+        if not 0 <= index < len(settings.pipelines):
+            self.report({'ERROR'}, "There is no saved pipeline to run.")
+            return {'CANCELLED'}
+
+        steps = [step.to_dict() for step in settings.pipelines[index].steps]
+        targets = get_batch_targets(context, settings.batch_selected_objects)
+
+        # in isolate mode the channel is stored as grayscale
+        if get_isolated_channel_ids(targets[0][1]) is not None:
+            for step in steps:
+                step['channels'] = {'R', 'G', 'B'}
+
+        run_pipeline_batch(targets, steps)
+
+        return {'FINISHED'}
+
+
+class VERTEXCOLORMASTER_OT_EditPipeline(bpy.types.Operator):
+    """Add or remove saved pipelines and their steps"""
+    bl_idname = 'vertexcolormaster.edit_pipeline'
+    bl_label = 'VCM Edit Pipeline'
+    bl_options = {'UNDO', 'INTERNAL'}
+
+    action: EnumProperty(
+        name="Action",
+        items=pipeline_edit_action_items,
+        default='ADD'
+    )
+
+    step_index: IntProperty(
+        name="Step",
+        description="Index of the step in the active pipeline to edit.",
+        default=-1
+    )
+
+    def execute(self, context):
+        settings = context.scene.vertex_color_master_settings
+        pipelines = settings.pipelines
+
+        if self.action == 'ADD':
+            pipeline = pipelines.add()
+            pipeline.name = "Pipeline {0}".format(len(pipelines))
+            pipeline.steps.add()
+            settings.active_pipeline_index = len(pipelines) - 1
+            return {'FINISHED'}
+
+        index = settings.active_pipeline_index
+        if not 0 <= index < len(pipelines):
+            return {'CANCELLED'}
+
+        steps = pipelines[index].steps
+        step_index = self.step_index
+
+        if self.action == 'REMOVE':
+            pipelines.remove(index)
+            settings.active_pipeline_index = max(index - 1, 0)
+        elif self.action == 'ADD_STEP':
+            steps.add()
+        elif self.action == 'REMOVE_STEP' and 0 <= step_index < len(steps):
+            steps.remove(step_index)
+        elif self.action == 'MOVE_STEP_UP' and 0 < step_index < len(steps):
+            steps.move(step_index, step_index - 1)
+        elif self.action == 'MOVE_STEP_DOWN' and 0 <= step_index < len(steps) - 1:
+            steps.move(step_index, step_index + 1)
 
         return {'FINISHED'}
 
@@ -1157,11 +1713,12 @@ class VERTEXCOLORMASTER_OT_QuickFill(bpy.types.Operator):
         obj = context.active_object
         return obj is not None and obj.mode == 'VERTEX_PAINT' and obj.type == 'MESH'
 
+    @profiled
     def execute(self, context):
         settings = context.scene.vertex_color_master_settings
 
         mesh = context.active_object.data
-        vcol = mesh.vertex_colors.active if mesh.vertex_colors else mesh.vertex_colors.new()
+        vcol = get_or_create_active_color_layer(mesh)
 
         quick_fill_selected(mesh, vcol, self.fill_color)
 
@@ -1185,30 +1742,33 @@ class VERTEXCOLORMASTER_OT_IsolateChannel(bpy.types.Operator):
         obj = context.active_object
         return obj is not None and obj.mode == 'VERTEX_PAINT' and obj.type == 'MESH'
 
+    @profiled
     def execute(self, context):
         settings = context.scene.vertex_color_master_settings
         obj = context.active_object
         mesh = obj.data
 
-        if not mesh.vertex_colors:
+        vcol = get_active_color_layer(mesh)
+        if vcol is None:
             self.report({'ERROR'}, "Mesh has no vertex color layer to isolate.")
             return {'FINISHED'}
 
         # get the vcol and channel to isolate
         # create empty vcol using name template
-        vcol = mesh.vertex_colors.active
-        iso_vcol_id = "{0}_{1}_{2}".format(isolate_mode_name_prefix, self.src_channel_id, vcol.name)
-        if iso_vcol_id in mesh.vertex_colors:
+        vcol_id = vcol.name
+        iso_vcol_id = "{0}_{1}_{2}".format(isolate_mode_name_prefix, self.src_channel_id, vcol_id)
+        if iso_vcol_id in get_color_layers(mesh):
             error = "{0} Channel has already been isolated to {1}. Apply or Discard before isolating again.".format(self.src_channel_id, iso_vcol_id)
             self.report({'ERROR'}, error)
             return {'FINISHED'}
 
-        iso_vcol = mesh.vertex_colors.new()
-        iso_vcol.name = iso_vcol_id
+        # the isolated layer uses the same domain and type as the source layer
+        iso_vcol = new_color_layer(mesh, iso_vcol_id, get_layer_data_type(vcol), get_layer_domain(vcol))
+        vcol = get_color_layers(mesh)[vcol_id]
         channel_idx = channel_id_to_idx(self.src_channel_id)
 
-        copy_channel(mesh, vcol, iso_vcol, channel_idx, channel_idx, dst_all_channels=True, alpha_mode='FILL')
-        mesh.vertex_colors.active = iso_vcol
+        isolate_channel(mesh, vcol, iso_vcol, channel_idx)
+        set_active_color_layer(mesh, iso_vcol)
         brush = context.tool_settings.vertex_paint.brush
         settings.brush_color = brush.color
         settings.brush_secondary_color = brush.secondary_color
@@ -1233,40 +1793,39 @@ class VERTEXCOLORMASTER_OT_ApplyIsolatedChannel(bpy.types.Operator):
     @classmethod
     def poll(cls, context):
         obj = context.active_object
-        if obj is not None and obj.type == 'MESH' and obj.data.vertex_colors:
-            vcol = obj.data.vertex_colors.active
+        if obj is not None and obj.type == 'MESH' and get_active_color_layer(obj.data) is not None:
+            vcol = get_active_color_layer(obj.data)
             # operator will not work if the active vcol name doesn't match the right template
             vcol_info = get_isolated_channel_ids(vcol)
             return vcol_info is not None
 
+    @profiled
     def execute(self, context):
         settings = context.scene.vertex_color_master_settings
         mesh = context.active_object.data
 
-        iso_vcol = mesh.vertex_colors.active
+        iso_vcol = get_active_color_layer(mesh)
 
         brush = context.tool_settings.vertex_paint.brush
         brush.color = settings.brush_color
         brush.secondary_color = settings.brush_secondary_color
 
-        if self.discard:
-            mesh.vertex_colors.remove(iso_vcol)
-            return {'FINISHED'}
-
         vcol_info = get_isolated_channel_ids(iso_vcol)
 
-        vcol = mesh.vertex_colors[vcol_info[0]]
+        vcol = get_color_layers(mesh).get(vcol_info[0])
         channel_idx = channel_id_to_idx(vcol_info[1])
 
         if vcol is None:
+            if self.discard:
+                remove_color_layer(mesh, iso_vcol)
+                return {'FINISHED'}
             error = "Mesh has no vertex color layer named '{0}'. Was it renamed or deleted?".format(vcol_info[0])
             self.report({'ERROR'}, error)
             return {'FINISHED'}
 
-        # assuming iso_vcol has only grayscale data, RGB are equal, so copy from R
-        copy_channel(mesh, iso_vcol, vcol, 0, channel_idx)
-        mesh.vertex_colors.active = vcol
-        mesh.vertex_colors.remove(iso_vcol)
+        apply_isolated_channel(mesh, iso_vcol, vcol, channel_idx, self.discard)
+        set_active_color_layer(mesh, vcol)
+        remove_color_layer(mesh, iso_vcol)
 
         return {'FINISHED'}
 
@@ -1288,7 +1847,7 @@ class VERTEXCOLORMASTER_OT_FlipBrushColors(bpy.types.Operator):
 
         obj = context.active_object
         if context.object.mode == 'VERTEX_PAINT' and obj is not None and obj.type == 'MESH' \
-            and get_isolated_channel_ids(context.active_object.data.vertex_colors.active) is not None \
+            and get_isolated_channel_ids(get_active_color_layer(context.active_object.data)) is not None \
             or settings.use_grayscale:
                 v1 = settings.brush_value_isolate
                 v2 = settings.brush_secondary_value_isolate